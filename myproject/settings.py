@@ -21,6 +21,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Off unless REGISTRY_PROFILING is set; first, so it times everything below
+    'registry.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -47,11 +49,59 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'myproject.wsgi.application'
+# Serve with an ASGI server (e.g. uvicorn myproject.asgi:application) for live dashboard events
+ASGI_APPLICATION = 'myproject.asgi.application'
 
 DATABASES = {
     'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'db.sqlite3'}
 }
 
+
+def _postgres(host_variable, port_variable):
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ['POSTGRES_DB'],
+        'USER': os.environ.get('POSTGRES_USER', ''),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get(host_variable, ''),
+        'PORT': os.environ.get(port_variable, ''),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+    if os.environ.get('POSTGRES_POOL'):
+        # psycopg's connection pool (needs psycopg[pool]); Django requires
+        # CONN_MAX_AGE = 0 with it
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('POSTGRES_POOL_MIN', 2)),
+            'max_size': int(os.environ.get('POSTGRES_POOL_MAX', 10)),
+        }
+    else:
+        # Persistent connections, reused across requests
+        database['CONN_MAX_AGE'] = int(os.environ.get('POSTGRES_CONN_MAX_AGE', 60))
+    return database
+
+
+# PostgreSQL instead of SQLite when POSTGRES_DB is set; POSTGRES_REPLICA_HOST
+# adds a read replica that registry.routers sends report/dashboard reads to
+if os.environ.get('POSTGRES_DB'):
+    DATABASES['default'] = _postgres('POSTGRES_HOST', 'POSTGRES_PORT')
+    if os.environ.get('POSTGRES_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **_postgres('POSTGRES_REPLICA_HOST', 'POSTGRES_REPLICA_PORT'),
+            'TEST': {'MIRROR': 'default'},
+        }
+
+DATABASE_ROUTERS = ['registry.routers.ReplicaRouter']
+
+# PRAGMAs run on every new SQLite connection (registry.database); these
+# override its defaults (WAL, synchronous=NORMAL, busy_timeout=5000, ...)
+REGISTRY_SQLITE_PRAGMAS = {}
+
+# Run entry create/update/delete on one writer thread per process
+# (registry.writer); the lock is then queued for in Python, not SQLite
+REGISTRY_SERIALIZE_WRITES = False
+
 STATICFILES_DIRS = [
     BASE_DIR / 'myproject' / 'static',  # Points to myproject/static/
 ]
@@ -62,6 +112,30 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 AUTH_PASSWORD_VALIDATORS = []
 
+# Registry list pagination (?page_size= is clamped to the maximum)
+REGISTRY_PAGE_SIZE = 50
+REGISTRY_MAX_PAGE_SIZE = 500
+
+# Worker processes for background PDF jobs and signature thumbnails;
+# 0 leaves them to run_report_jobs / regenerate_thumbnails
+REGISTRY_JOB_WORKERS = 2
+
+# Rendered reports kept in MEDIA_ROOT/reports/; least recently used go first
+REGISTRY_REPORT_CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+# Signature thumbnails beside each signature_image: "PNG" or "WEBP"
+REGISTRY_THUMBNAIL_FORMAT = "PNG"
+
+# How often each ASGI process checks the registry for live dashboard deltas
+REGISTRY_LIVE_POLL_SECONDS = 1.0
+
+# Per-request timings, query counts and slow queries (registry.profiling),
+# one JSON line per request in REGISTRY_PROFILE_LOG; see manage.py perfreport
+REGISTRY_PROFILING = os.environ.get('REGISTRY_PROFILING') == '1'
+REGISTRY_PROFILE_LOG = BASE_DIR / 'perf.log'
+REGISTRY_PROFILE_MEMORY = True
+REGISTRY_SLOW_QUERY_MS = 100
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'Africa/Johannesburg'
 USE_I18N = True
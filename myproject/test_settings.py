@@ -0,0 +1,10 @@
+# Settings for the test suite:
+#   python manage.py test registry --settings=myproject.test_settings
+# (or DJANGO_SETTINGS_MODULE=myproject.test_settings for other runners)
+from myproject.settings import *  # noqa: F401,F403
+from myproject.settings import DATABASES
+
+# The replica router is tested against a mirror of default, unless a real
+# replica (already mirrored under test) is configured
+if 'replica' not in DATABASES:
+    DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
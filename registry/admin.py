@@ -3,7 +3,20 @@ from django.http import HttpResponse
 import csv
 from datetime import datetime, timedelta
 from django.utils import timezone
-from .models import RegistryEntry
+from .models import HEAVY_FIELDS, RegistryEntry
+from .search import search_entries
+from .stats import REPORT_DAYS, day_range, period_breakdown
+from .exports import queryset_rows, stream_csv, yes_no
+from .jobs import submit_report
+from .forms import ImportUploadForm
+from .importer import import_file
+from .routers import replica_reads
+from .writer import write_transaction
+from django.contrib import messages
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.shortcuts import redirect
 from django.contrib.admin import DateFieldListFilter
 from django.db.models import Count, Q
 from django.utils.html import format_html
@@ -29,78 +42,68 @@ from xhtml2pdf import pisa
 
 
 
+@replica_reads
 def export_as_pdf(modeladmin, request, queryset):
     """
-    Admin action: Export selected RegistryEntry objects to PDF.
-    Uses pdf_preview.html as the template.
+    Admin action: queue the selected RegistryEntry objects as a background
+    PDF render (pdf_preview.html) and open the job page.
     """
-    template = get_template("registry/pdf_preview.html")
-    context = {
-        "entries": queryset,
-        "total_count": queryset.count(),
-    }
-
-    # Render HTML
-    html = template.render(context)
-
-    # Decide whether to download or just view inline
-    download = request.GET.get("download", "false").lower() == "true"
-    response = HttpResponse(content_type="application/pdf")
-    if download:
-        response["Content-Disposition"] = 'attachment; filename="registry_report.pdf"'
-    else:
-        response["Content-Disposition"] = 'inline; filename="registry_report.pdf"'
-
-    # Create PDF
-    pisa_status = pisa.CreatePDF(html, dest=response)
-
-    if pisa_status.err:
-        return HttpResponse("Error generating PDF", status=500)
-    return response
+    ids = sorted(queryset.values_list('pk', flat=True))
+    job = submit_report("admin_selection", {"ids": ids})
+    return redirect('report_job', job_id=job.pk)
 
 
 export_as_pdf.short_description = "Export selected entries as PDF"
 
 
 
+@replica_reads
 def export_csv(modeladmin, request, queryset):
     """Export selected entries as CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="registry_entries.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
+    header = [
         'Names', 'Surname', 'ID/DOB', 'Gender', 'Disability', 
         'Physical Address', 'TISH Area', 'Ward No', 'Contact Number',
         'Race', 'Service User', 'Social Grant', 'Cooperative Member',
         'Created Date'
-    ])
-    
-    for entry in queryset:
-        writer.writerow([
-            entry.names, entry.surname, entry.id_no_or_dob or '',
-            entry.gender, 'Yes' if entry.disability else 'No',
-            entry.physical_address, entry.tish_area, entry.ward_no,
-            entry.contact_number, entry.race,
-            'Yes' if entry.recovering_service_user else 'No',
-            entry.social_grant,
-            'Yes' if entry.cooperative_member else 'No',
-            entry.created_at.strftime('%Y-%m-%d %H:%M') if entry.created_at else ''
-        ])
-    
-    return response
+    ]
+    fields = (
+        'names', 'surname', 'id_no_or_dob', 'gender', 'disability',
+        'physical_address', 'tish_area', 'ward_no', 'contact_number', 'race',
+        'recovering_service_user', 'social_grant', 'cooperative_member', 'created_at',
+    )
+
+    def rows():
+        yield header
+        for (names, surname, id_no, gender, disability, address, tish_area, ward_no,
+             contact, race, recovering, grant, cooperative, created_at) in queryset_rows(queryset, fields):
+            yield [
+                names, surname, id_no or '',
+                gender, yes_no(disability),
+                address, tish_area, ward_no,
+                contact, race,
+                yes_no(recovering),
+                grant,
+                yes_no(cooperative),
+                created_at.strftime('%Y-%m-%d %H:%M') if created_at else ''
+            ]
+
+    return stream_csv('registry_entries.csv', rows())
 
 export_csv.short_description = "Export selected entries to CSV"
 
+@replica_reads
 def generate_daily_report(modeladmin, request, queryset):
     return _generate_date_report(queryset, 'daily')
 
+@replica_reads
 def generate_weekly_report(modeladmin, request, queryset):
     return _generate_date_report(queryset, 'weekly')
 
+@replica_reads
 def generate_monthly_report(modeladmin, request, queryset):
     return _generate_date_report(queryset, 'monthly')
 
+@replica_reads
 def generate_yearly_report(modeladmin, request, queryset):
     return _generate_date_report(queryset, 'yearly')
 
@@ -114,60 +117,61 @@ def _generate_date_report(queryset, period_type):
     now = timezone.now()
     
     if period_type == 'daily':
-        start_date = now - timedelta(days=1)
         filename = f"daily_report_{now.strftime('%Y%m%d')}.csv"
     elif period_type == 'weekly':
-        start_date = now - timedelta(weeks=1)
         filename = f"weekly_report_{now.strftime('%Y%m%d')}.csv"
     elif period_type == 'monthly':
-        start_date = now - timedelta(days=30)
         filename = f"monthly_report_{now.strftime('%Y%m')}.csv"
     else:  # yearly
-        start_date = now - timedelta(days=365)
         filename = f"yearly_report_{now.strftime('%Y')}.csv"
     
-    # Filter by date range
-    date_filtered = queryset.filter(created_at__gte=start_date)
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    writer = csv.writer(response)
-    writer.writerow([f'{period_type.capitalize()} Registry Report'])
-    writer.writerow(['Period', f'{start_date.strftime("%Y-%m-%d")} to {now.strftime("%Y-%m-%d")}'])
-    writer.writerow(['Total Entries', date_filtered.count()])
-    writer.writerow([])
-    
-    # Summary statistics
-    writer.writerow(['Summary Statistics'])
-    writer.writerow(['Gender Distribution'])
-    for gender, count in date_filtered.values_list('gender').annotate(count=Count('id')):
-        writer.writerow([f'  {gender}', count])
-    
-    writer.writerow(['Race Distribution'])
-    for race, count in date_filtered.values_list('race').annotate(count=Count('id')):
-        writer.writerow([f'  {race}', count])
-    
-    writer.writerow(['Disability', date_filtered.filter(disability=True).count()])
-    writer.writerow(['Service Users', date_filtered.filter(recovering_service_user=True).count()])
-    writer.writerow(['Cooperative Members', date_filtered.filter(cooperative_member=True).count()])
-    
-    writer.writerow([])
-    writer.writerow(['Detailed Entries'])
-    writer.writerow([
-        'Names', 'Surname', 'Gender', 'Race', 'Ward', 'Disability', 
-        'Social Grant', 'Contact', 'Created'
-    ])
-    
-    for entry in date_filtered:
-        writer.writerow([
-            entry.names, entry.surname, entry.gender, entry.race,
-            entry.ward_no, 'Yes' if entry.disability else 'No',
-            entry.social_grant, entry.contact_number,
-            entry.created_at.strftime('%Y-%m-%d') if entry.created_at else ''
-        ])
-    
-    return response
+    # Whole local days ending today, so the totals can come from the
+    # daily rollups; a daily report is today alone
+    end_day = timezone.localdate(now)
+    start_day = end_day - timedelta(days=REPORT_DAYS[period_type] - 1)
+    date_filtered = queryset.filter(day_range(start_day, end_day))
+
+    def rows():
+        summary_fields = ['gender', 'race', 'disability', 'recovering_service_user', 'cooperative_member']
+        total, summaries = period_breakdown(queryset, start_day, end_day, summary_fields)
+
+        yield [f'{period_type.capitalize()} Registry Report']
+        yield ['Period', f'{start_day.strftime("%Y-%m-%d")} to {end_day.strftime("%Y-%m-%d")}']
+        yield ['Total Entries', total]
+        yield []
+
+        # Summary statistics
+        yield ['Summary Statistics']
+        yield ['Gender Distribution']
+        for gender, count in summaries['gender'].items():
+            yield [f'  {gender}', count]
+
+        yield ['Race Distribution']
+        for race, count in summaries['race'].items():
+            yield [f'  {race}', count]
+
+        yield ['Disability', summaries['disability'].get(True, 0)]
+        yield ['Service Users', summaries['recovering_service_user'].get(True, 0)]
+        yield ['Cooperative Members', summaries['cooperative_member'].get(True, 0)]
+
+        yield []
+        yield ['Detailed Entries']
+        yield [
+            'Names', 'Surname', 'Gender', 'Race', 'Ward', 'Disability', 
+            'Social Grant', 'Contact', 'Created'
+        ]
+
+        fields = ('names', 'surname', 'gender', 'race', 'ward_no', 'disability',
+                  'social_grant', 'contact_number', 'created_at')
+        for names, surname, gender, race, ward_no, disability, grant, contact, created_at in queryset_rows(date_filtered, fields):
+            yield [
+                names, surname, gender, race,
+                ward_no, yes_no(disability),
+                grant, contact,
+                created_at.strftime('%Y-%m-%d') if created_at else ''
+            ]
+
+    return stream_csv(filename, rows())
 
 # ==================== ADMIN CLASS (DEFINE LAST) ====================
 
@@ -188,6 +192,7 @@ class RegistryEntryAdmin(admin.ModelAdmin):
     )
 
     list_filter = (
+        'possible_duplicate',
         'gender',
         'social_grant',
         'tish_area',
@@ -197,26 +202,101 @@ class RegistryEntryAdmin(admin.ModelAdmin):
         'cooperative_member',
     )
 
+    # Shown in the search box; matching is done by get_search_results
     search_fields = (
         'names',
         'surname',
         'id_no_or_dob',
     )
 
-    actions = ['export_as_csv']
+    actions = [
+        'export_as_csv', 'clear_duplicate_flag',
+        generate_daily_report, generate_weekly_report, generate_monthly_report, generate_yearly_report,
+    ]
+
+    # The export_as_csv columns: the form's fields, without the signature
+    # payloads or the internal duplicate/batch bookkeeping
+    csv_export_fields = (
+        'id', 'created_at', 'names', 'surname', 'id_no_or_dob', 'physical_address',
+        'ward_no', 'contact_number', 'gender', 'race', 'tish_area', 'social_grant',
+        'disability', 'recovering_service_user', 'cooperative_member', 'signature_image',
+    )
 
+    # Adds the "Import spreadsheet" button
+    change_list_template = 'admin/registry/registryentry/change_list.html'
+    import_errors_shown = 500
+
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='registry_registryentry_import'),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        """Upload a CSV/XLSX spreadsheet through registry.importer."""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        result = None
+        form = ImportUploadForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['spreadsheet']
+            result = import_file(upload.file, upload.name, dry_run=form.cleaned_data['dry_run'])
+            prefix = "Dry run: " if form.cleaned_data['dry_run'] else ""
+            self.message_user(request, prefix + result.summary(), messages.WARNING if result.errors else messages.SUCCESS)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': "Import spreadsheet",
+            'opts': self.opts,
+            'form': form,
+            'result': result,
+            'errors': result.errors[:self.import_errors_shown] if result else [],
+            'errors_hidden': max(0, len(result.errors) - self.import_errors_shown) if result else 0,
+        }
+        return TemplateResponse(request, 'admin/registry/registryentry/import.html', context)
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # The changelist (and its actions) never show the signature payloads
+        changelist = f'{self.opts.app_label}_{self.opts.model_name}_changelist'
+        if request.resolver_match and request.resolver_match.url_name == changelist:
+            return queryset.defer(*HEAVY_FIELDS)
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        # Full-text index instead of OR'd icontains scans
+        return search_entries(queryset, search_term), False
+
+    # Admin saves read the entry before writing it; take the write lock up
+    # front (registry.writer) rather than fail when another desk commits
+    def changeform_view(self, request, *args, **kwargs):
+        if request.method != 'POST':
+            return super().changeform_view(request, *args, **kwargs)
+        with write_transaction():
+            return super().changeform_view(request, *args, **kwargs)
+
+    def delete_view(self, request, *args, **kwargs):
+        if request.method != 'POST':
+            return super().delete_view(request, *args, **kwargs)
+        with write_transaction():
+            return super().delete_view(request, *args, **kwargs)
+
+    @replica_reads
     def export_as_csv(self, request, queryset):
         meta = self.model._meta
-        field_names = [field.name for field in meta.fields]
+        field_names = list(self.csv_export_fields)
+
+        def rows():
+            yield field_names
+            yield from queryset_rows(queryset, field_names)
 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename={meta}.csv'
-        writer = csv.writer(response)
+        return stream_csv(f'{meta}.csv', rows())
 
-        writer.writerow(field_names)
-        for obj in queryset:
-            writer.writerow([getattr(obj, field) for field in field_names])
+    export_as_csv.short_description = "Export Selected Entries as CSV"
 
-        return response
+    def clear_duplicate_flag(self, request, queryset):
+        # A plain update: the flag is not counted anywhere and the version is not affected
+        cleared = queryset.filter(possible_duplicate=True).update(possible_duplicate=False)
+        self.message_user(request, f"Cleared the duplicate flag on {cleared} entr{'y' if cleared == 1 else 'ies'}.")
 
-    export_as_csv.short_description = "Export Selected Entries as CSV"
\ No newline at end of file
+    clear_duplicate_flag.short_description = "Mark selected entries as not duplicates"
\ No newline at end of file
@@ -0,0 +1,24 @@
+from django.apps import AppConfig
+
+
+class RegistryConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'registry'
+
+    def ready(self):
+        # Keep materialized counters in step with RegistryEntry writes
+        from . import signals  # noqa: F401
+        from django.db.backends.signals import connection_created
+        from .database import configure_sqlite
+        # WAL and the other SQLite PRAGMAs for concurrent desks
+        connection_created.connect(configure_sqlite, dispatch_uid="registry.configure_sqlite")
+        # Table rebuilds in later migrations drop the FTS triggers
+        from django.db.models.signals import post_migrate
+        post_migrate.connect(restore_search_index, sender=self, dispatch_uid="registry.restore_search_index")
+
+
+def restore_search_index(sender, using, **kwargs):
+    from django.db import connections
+    from .search import ensure_search_index
+
+    ensure_search_index(connections[using])
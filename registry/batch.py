@@ -0,0 +1,171 @@
+# registry/batch.py
+"""
+Batched submissions from field devices.
+
+A device that registers people offline queues each entry with a UUID it
+generates itself, then posts the queue as one JSON request (optionally
+gzip-compressed):
+
+    {"entries": [{"uuid": "...", "names": "...", "surname": "...",
+                  "signature_data": [[{"x": 1, "y": 2}, ...], ...], ...}]}
+
+Every entry is checked with the RegistryForm rules. The valid new ones
+are written together by importer.bulk_insert in one transaction, and
+the response gives a result per entry. The UUID is stored as
+client_uuid, so when a device resends a batch because the reply never
+arrived, entries already stored come back as "exists" and are not
+entered again.
+"""
+import json
+import uuid
+import zlib
+
+from django.db import IntegrityError
+
+from .forms import ReboundFormMixin, RegistryForm
+from .importer import bulk_insert
+from .models import RegistryEntry
+
+MAX_BATCH_ENTRIES = 1000
+# Decompressed request body; also what keeps a gzip bomb from filling memory
+MAX_BATCH_BYTES = 20 * 1024 * 1024
+# Stay under SQLite's bound-parameter limit in client_uuid__in lookups
+LOOKUP_CHUNK = 900
+
+BOOLEAN_FIELDS = ('disability', 'recovering_service_user', 'cooperative_member')
+
+
+class BatchError(ValueError):
+    """The request as a whole is unusable; status is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class BatchEntryForm(ReboundFormMixin, RegistryForm):
+    pass
+
+
+def read_body(body, encoding=''):
+    """The decoded JSON of a request body sent with Content-Encoding encoding."""
+    encoding = (encoding or '').strip().lower()
+    if len(body) > MAX_BATCH_BYTES:
+        raise BatchError(f"Batches are limited to {MAX_BATCH_BYTES} bytes.", status=413)
+    if encoding in ('gzip', 'deflate'):
+        wbits = 16 + zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS
+        decompressor = zlib.decompressobj(wbits)
+        try:
+            body = decompressor.decompress(body, MAX_BATCH_BYTES + 1)
+        except zlib.error:
+            raise BatchError("The body is not valid compressed data.")
+    elif encoding not in ('', 'identity'):
+        raise BatchError(f"Unsupported Content-Encoding {encoding!r}.", status=415)
+    if len(body) > MAX_BATCH_BYTES:
+        raise BatchError(f"Batches are limited to {MAX_BATCH_BYTES} bytes uncompressed.", status=413)
+    try:
+        return json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        raise BatchError("The body is not valid JSON.")
+
+
+def _form_data(item):
+    """The entry as form data, plus (field, message) for values the form would misread."""
+    data, problems = {}, []
+    for name, value in item.items():
+        if name == 'uuid':
+            continue
+        if name in BOOLEAN_FIELDS:
+            # CheckboxInput reads any non-empty string (even "false ") as True
+            if value is not None and not isinstance(value, bool):
+                problems.append((name, "Expected true or false."))
+        elif name == 'signature_data' and value is not None and not isinstance(value, str):
+            # The form field holds the JSON text the browser would post
+            value = json.dumps(value)
+        elif value is None:
+            value = ''
+        data[name] = value
+    return data, problems
+
+
+def _existing(uuids):
+    """{client_uuid: id} for the uuids already stored."""
+    found = {}
+    uuids = list(uuids)
+    for start in range(0, len(uuids), LOOKUP_CHUNK):
+        found.update(
+            RegistryEntry.objects
+            .filter(client_uuid__in=uuids[start:start + LOOKUP_CHUNK])
+            .values_list('client_uuid', 'id')
+        )
+    return found
+
+
+def ingest(payload):
+    """
+    Store the entries of a decoded batch and return the response payload:
+    {"results": [...], "created": n, "existing": n, "invalid": n}, with
+    one result per entry in the order sent.
+    """
+    items = payload.get('entries') if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        raise BatchError('Expected {"entries": [...]}.')
+    if len(items) > MAX_BATCH_ENTRIES:
+        raise BatchError(f"Batches are limited to {MAX_BATCH_ENTRIES} entries.", status=413)
+
+    results = [None] * len(items)
+    keys, repeats = {}, []
+    for index, item in enumerate(items):
+        try:
+            key = uuid.UUID(str(item['uuid']))
+        except (TypeError, KeyError, ValueError):
+            results[index] = {'status': 'invalid', 'errors': {'uuid': ["A UUID is required."]}}
+            continue
+        # An entry queued twice on the device is stored once
+        if key in keys:
+            repeats.append((index, keys[key]))
+        else:
+            keys[key] = index
+
+    # A second attempt covers another device's resend committing the same UUIDs first
+    for attempt in range(2):
+        existing = _existing(keys)
+        form = BatchEntryForm()
+        entries, created = [], []
+        for key, index in keys.items():
+            if key in existing:
+                results[index] = {'uuid': str(key), 'status': 'exists', 'id': existing[key]}
+                continue
+            data, problems = _form_data(items[index])
+            form.rebind(data)
+            for name, message in problems:
+                form.add_error(name, message)
+            if not form.is_valid():
+                results[index] = {'uuid': str(key), 'status': 'invalid', 'errors': {
+                    name: list(messages) for name, messages in form.errors.items()
+                }}
+                continue
+            form.instance.client_uuid = key
+            entries.append(form.instance)
+            created.append(index)
+        try:
+            if entries:
+                bulk_insert(entries)
+            break
+        except IntegrityError:
+            if attempt:
+                raise
+
+    for index, entry in zip(created, entries):
+        results[index] = {'uuid': str(entry.client_uuid), 'status': 'created', 'id': entry.pk}
+    for index, first in repeats:
+        results[index] = {**results[first], 'duplicate_of': first}
+
+    # Repeats share their first copy's result but are not counted again
+    statuses = [result['status'] for result in results if 'duplicate_of' not in result]
+    return {
+        'results': results,
+        'created': statuses.count('created'),
+        'existing': statuses.count('exists'),
+        'invalid': statuses.count('invalid'),
+    }
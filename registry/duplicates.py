@@ -0,0 +1,200 @@
+# registry/duplicates.py
+"""
+Likely-duplicate detection for beneficiaries.
+
+Every entry carries three match keys, kept current by registry.signals:
+id_key (the ID number or date of birth with punctuation and spacing
+removed; blank if too short to identify anyone), surname_key and
+names_key (Soundex codes of the surname and of the first given name).
+Two entries are only compared when they share a block, either the same
+id_key or the same surname_key and names_key, so no entry is ever
+compared against the whole registry. Candidates in a block are scored by
+character-trigram similarity of their names and ID.
+"""
+import re
+from collections import defaultdict
+
+from django.db.models import Q
+
+DUPLICATE_THRESHOLD = 0.65
+# Shorter IDs ("0", "N/A", a bare year) say nothing about who someone is
+MIN_ID_LENGTH = 6
+# Rows fetched as candidates for one new entry
+MAX_CANDIDATES = 200
+# In the batch scan each entry is compared with this many neighbours in
+# its block (sorted by name), which keeps huge blocks close to linear
+WINDOW = 20
+
+MATCH_KEY_FIELDS = ('id_key', 'surname_key', 'names_key')
+# What duplicate_pairs needs of each row
+PAIR_FIELDS = ('id', 'names', 'surname', 'id_no_or_dob') + MATCH_KEY_FIELDS
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys('BFPV', '1'), **dict.fromkeys('CGJKQSXZ', '2'),
+    **dict.fromkeys('DT', '3'), 'L': '4', **dict.fromkeys('MN', '5'), 'R': '6',
+}
+
+
+def normalize_id(value):
+    key = re.sub(r'[^0-9A-Z]', '', str(value or '').upper())
+    return key if len(key) >= MIN_ID_LENGTH else ''
+
+
+def normalize_name(value):
+    return ' '.join(re.sub(r'[^a-z ]', ' ', str(value or '').lower()).split())
+
+
+def soundex(value):
+    """American Soundex of the first word of value ("" if it has no letters)."""
+    first_word = (normalize_name(value).split() or [''])[0]
+    letters = re.sub(r'[^A-Z]', '', first_word.upper())
+    if not letters:
+        return ''
+    code, last = letters[0], _SOUNDEX_CODES.get(letters[0], '')
+    for letter in letters[1:]:
+        digit = _SOUNDEX_CODES.get(letter, '')
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        # H and W do not separate letters with the same code; vowels do
+        if letter not in 'HW':
+            last = digit
+    return code.ljust(4, '0')
+
+
+def set_match_keys(entry):
+    """Fill in entry's match keys from its current names and ID."""
+    entry.id_key = normalize_id(entry.id_no_or_dob)
+    entry.surname_key = soundex(entry.surname)
+    entry.names_key = soundex(entry.names)
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def _features(item):
+    """What score() compares: (name trigrams, id_key, id trigrams)."""
+    get = item.get if isinstance(item, dict) else lambda name: getattr(item, name)
+    name = normalize_name(f"{get('names')} {get('surname')}")
+    id_key = get('id_key')
+    name_grams = trigrams(name) if name else set()
+    return name_grams, id_key, trigrams(id_key) if id_key else set()
+
+
+def _score(a, b):
+    a_name, a_id, a_id_grams = a
+    b_name, b_id, b_id_grams = b
+    names = _jaccard(a_name, b_name)
+    if a_id and a_id == b_id:
+        return 0.6 + 0.4 * names
+    return names * (0.5 + 0.5 * _jaccard(a_id_grams, b_id_grams))
+
+
+def score(a, b):
+    """
+    How likely two entries are the same person, 0..1. a and b are dicts
+    (or objects) with names, surname and id_key. A shared ID counts for
+    most of the score; otherwise the names must match and the IDs
+    must be close, as with a mistyped digit.
+    """
+    return _score(_features(a), _features(b))
+
+
+def _block_filter(entry):
+    blocks = Q()
+    if entry.id_key:
+        blocks |= Q(id_key=entry.id_key)
+    if entry.surname_key and entry.names_key:
+        blocks |= Q(surname_key=entry.surname_key, names_key=entry.names_key)
+    return blocks
+
+
+def likely_duplicates(entry, threshold=DUPLICATE_THRESHOLD):
+    """
+    [(candidate dict, score)] for existing entries that are probably the
+    same person as entry, best first. Two indexed lookups at most.
+    """
+    from .models import RegistryEntry
+
+    set_match_keys(entry)
+    blocks = _block_filter(entry)
+    if not blocks:
+        return []
+    candidates = RegistryEntry.objects.filter(blocks)
+    if entry.pk is not None:
+        candidates = candidates.exclude(pk=entry.pk)
+    rows = candidates.values(*PAIR_FIELDS)[:MAX_CANDIDATES]
+    features = _features(entry)
+    matches = []
+    for row in rows:
+        similarity = _score(features, _features(row))
+        if similarity >= threshold:
+            matches.append((row, similarity))
+    return sorted(matches, key=lambda match: -match[1])
+
+
+def duplicate_pairs(rows, threshold=DUPLICATE_THRESHOLD, window=WINDOW):
+    """
+    Yield (a, b, score) for likely duplicate pairs among rows (dicts with
+    id, names, surname and the match keys), each pair once. Rows are
+    grouped into blocks in one pass; inside a block each row is compared
+    with its next `window` neighbours in name order.
+    """
+    blocks = defaultdict(list)
+    features = {}
+    for row in rows:
+        # Normalised once per row rather than once per comparison
+        features[row['id']] = _features(row)
+        if row['id_key']:
+            blocks['id', row['id_key']].append(row)
+        if row['surname_key'] and row['names_key']:
+            blocks['name', row['surname_key'], row['names_key']].append(row)
+
+    for block, members in blocks.items():
+        if len(members) < 2:
+            continue
+        members.sort(key=lambda row: (
+            normalize_name(f"{row['surname']} {row['names']}"), row['id'],
+        ))
+        for i, a in enumerate(members):
+            for b in members[i + 1:i + 1 + window]:
+                # Pairs sharing an ID are scored in their ID block
+                shared_id = a['id_key'] and a['id_key'] == b['id_key']
+                if block[0] == 'name' and shared_id:
+                    continue
+                pair_score = _score(features[a['id']], features[b['id']])
+                if pair_score >= threshold:
+                    yield a, b, pair_score
+
+
+def flag_batch(entries):
+    """
+    Set the match keys and possible_duplicate of unsaved entries about to
+    be bulk inserted (bulk_create skips the signals). One query fetches
+    existing rows sharing an ID with the batch; name-only matches against
+    older rows are left to the find_duplicates command.
+    """
+    from .models import RegistryEntry
+
+    rows = []
+    for number, entry in enumerate(entries):
+        set_match_keys(entry)
+        # Negative ids keep the new rows apart from saved ones
+        keys = {name: getattr(entry, name) for name in PAIR_FIELDS[1:]}
+        rows.append({'id': -1 - number, **keys})
+    id_keys = {row['id_key'] for row in rows if row['id_key']}
+    if id_keys:
+        existing = RegistryEntry.objects.filter(id_key__in=id_keys)
+        rows += existing.values(*PAIR_FIELDS)
+
+    for a, b, _ in duplicate_pairs(rows):
+        for row in (a, b):
+            if row['id'] < 0:
+                entries[-1 - row['id']].possible_duplicate = True
@@ -0,0 +1,44 @@
+# registry/exports.py
+import csv
+
+from django.http import StreamingHttpResponse
+
+# Rows fetched per database round trip while streaming
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """Pseudo-buffer for csv.writer: write() hands the line straight back."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(filename, rows):
+    """
+    Return a StreamingHttpResponse that writes rows (any iterable of
+    sequences) as CSV one line at a time, so the export never sits in
+    memory as a whole.
+    """
+    response = StreamingHttpResponse(csv_lines(rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def csv_lines(rows):
+    """Yield rows as encoded CSV lines."""
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def queryset_rows(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Iterate plain tuples for fields without caching the queryset or
+    building model instances.
+    """
+    return queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def yes_no(value):
+    return 'Yes' if value else 'No'
@@ -10,6 +10,23 @@ TISH_CHOICES = [
     ('Township', 'Township'),
     ]
 
+class ReboundFormMixin:
+    """For bulk writers that validate many rows with one form instance."""
+
+    def rebind(self, data):
+        """
+        Validate another row with this form. Building a form deep-copies
+        all of its fields, which took most of the import's time when done
+        per row; cleaning leaves the fields unchanged, so they can be shared.
+        """
+        self.data = data
+        self.is_bound = True
+        self.instance = self._meta.model()
+        self._errors = None
+        self._bound_fields_cache = {}
+        return self
+
+
 class RegistryEntryForm(forms.ModelForm):
     tish_area = forms.ChoiceField(
     choices=TISH_CHOICES,
@@ -90,4 +107,14 @@ class RegistryForm(forms.ModelForm):
         self.fields['signature_image'].required = False
         self.fields['signature_data'].required = False
         self.fields['social_grant'].empty_label = "Select Grant Type"
-        self.fields['social_grant'].required = False
\ No newline at end of file
+        self.fields['social_grant'].required = False
+
+class ImportUploadForm(forms.Form):
+    spreadsheet = forms.FileField(help_text="A .csv or .xlsx file with a header row.")
+    dry_run = forms.BooleanField(required=False, help_text="Only validate; import nothing.")
+
+    def clean_spreadsheet(self):
+        upload = self.cleaned_data['spreadsheet']
+        if not upload.name.lower().endswith(('.csv', '.xlsx', '.xlsm')):
+            raise forms.ValidationError("Upload a .csv or .xlsx file.")
+        return upload
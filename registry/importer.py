@@ -0,0 +1,225 @@
+# registry/importer.py
+"""
+Bulk import of registration spreadsheets (CSV or XLSX).
+
+Rows are read one at a time, checked with the same rules as the entry
+form (RegistryEntryForm) and written by bulk_insert in batches, one
+transaction per batch. bulk_create sends no signals, so bulk_insert also
+sets the duplicate match keys, updates the RegistryStat counters and the
+daily rollups, and bumps the registry version itself, the way
+registry.signals does for single saves. Rows that fail validation are
+skipped and reported with their spreadsheet row number.
+"""
+import csv
+import io
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from .duplicates import flag_batch
+from .forms import ReboundFormMixin, RegistryEntryForm
+from .models import RegistryEntry
+from .signatures import pack_signature
+from .stats import apply_daily_delta, apply_stat_delta, entry_daily_keys, entry_stat_keys
+from .version import bump_registry_version
+
+IMPORT_BATCH_SIZE = 1000
+
+# Columns a spreadsheet can fill; signatures are captured on the form only
+IMPORT_FIELDS = (
+    'names', 'surname', 'id_no_or_dob', 'physical_address', 'ward_no',
+    'contact_number', 'gender', 'race', 'tish_area', 'social_grant',
+    'disability', 'recovering_service_user', 'cooperative_member',
+)
+BOOLEAN_FIELDS = ('disability', 'recovering_service_user', 'cooperative_member')
+TRUE_VALUES = {'yes', 'y', 'true', 't', '1', 'x'}
+FALSE_VALUES = {'no', 'n', 'false', 'f', '0', ''}
+
+# Header spellings besides the field names and verbose names, including
+# the headings the CSV exports write, so an export can be re-imported
+HEADER_ALIASES = {
+    'id': None,
+    'iddob': 'id_no_or_dob',
+    'idnodob': 'id_no_or_dob',
+    'idnumber': 'id_no_or_dob',
+    'address': 'physical_address',
+    'ward': 'ward_no',
+    'contact': 'contact_number',
+    'phone': 'contact_number',
+    'grant': 'social_grant',
+    'area': 'tish_area',
+    'serviceuser': 'recovering_service_user',
+    'recovering': 'recovering_service_user',
+    'cooperative': 'cooperative_member',
+}
+
+
+class ImportForm(ReboundFormMixin, RegistryEntryForm):
+    class Meta(RegistryEntryForm.Meta):
+        fields = IMPORT_FIELDS
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    errors: list = field(default_factory=list)  # (row number, {field: [messages]})
+    unknown_columns: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def rows_per_minute(self):
+        return self.rows * 60 / self.seconds if self.seconds else 0
+
+    def summary(self):
+        return (
+            f"{self.rows} row(s) read, {self.created} imported, {len(self.errors)} rejected "
+            f"in {self.seconds:.1f}s ({self.rows_per_minute:,.0f} rows/min)"
+        )
+
+
+def _header_key(value):
+    return re.sub(r'[^a-z0-9]', '', str(value or '').lower())
+
+
+def column_map(header):
+    """Map each spreadsheet column index to a field name (or None to ignore it)."""
+    known = {}
+    for model_field in RegistryEntry._meta.fields:
+        if model_field.name in IMPORT_FIELDS:
+            known[_header_key(model_field.name)] = model_field.name
+            known[_header_key(model_field.verbose_name)] = model_field.name
+    known.update(HEADER_ALIASES)
+    return [known.get(_header_key(heading)) for heading in header]
+
+
+def _choice_lookup():
+    lookups = {}
+    for name in IMPORT_FIELDS:
+        choices = RegistryEntry._meta.get_field(name).choices
+        if choices:
+            lookups[name] = {str(value).lower(): value for value, _ in choices}
+    return lookups
+
+
+def read_rows(file, filename):
+    """Yield the header row and then each data row of a .csv or .xlsx file."""
+    if os.path.splitext(filename)[1].lower() in ('.xlsx', '.xlsm'):
+        from openpyxl import load_workbook
+        # read_only streams the sheet instead of loading every cell
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield ['' if value is None else value for value in row]
+        finally:
+            workbook.close()
+    else:
+        text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+        try:
+            yield from csv.reader(text)
+        finally:
+            text.detach()
+
+
+def _form_data(values, columns, choices):
+    """The row as form data, plus (field, message) for yes/no cells that are neither."""
+    data, problems = {}, []
+    for name, value in zip(columns, values):
+        if name is None:
+            continue
+        value = str(value).strip() if value is not None else ''
+        if name in BOOLEAN_FIELDS:
+            lowered = value.lower()
+            # CheckboxInput would read any non-empty string (even "No") as True
+            if lowered in TRUE_VALUES:
+                value = 'true'
+            elif lowered in FALSE_VALUES:
+                value = 'false'
+            else:
+                problems.append((name, f"Expected yes or no, not {value!r}."))
+        elif name in choices:
+            value = choices[name].get(value.lower(), value)
+        data[name] = value
+    return data, problems
+
+
+def import_rows(rows, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+    """
+    Validate and insert rows (an iterator whose first item is the header).
+    With dry_run nothing is written. Returns an ImportResult.
+    """
+    result = ImportResult()
+    started = time.perf_counter()
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return result
+    columns = column_map(header)
+    result.unknown_columns = [str(heading) for heading, name in zip(header, columns) if name is None and heading]
+    choices = _choice_lookup()
+    form = ImportForm()
+
+    batch = []
+    for number, values in enumerate(rows, start=2):
+        if not any(str(value).strip() for value in values):
+            continue
+        result.rows += 1
+        data, problems = _form_data(values, columns, choices)
+        form.rebind(data)
+        for name, message in problems:
+            form.add_error(name, message)
+        if not form.is_valid():
+            result.errors.append((number, {name: list(messages) for name, messages in form.errors.items()}))
+            continue
+        batch.append(form.instance)
+        if len(batch) >= batch_size:
+            result.created += _insert(batch, dry_run)
+            batch = []
+    if batch:
+        result.created += _insert(batch, dry_run)
+
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def _insert(entries, dry_run):
+    if not dry_run:
+        bulk_insert(entries)
+    return len(entries)
+
+
+def bulk_insert(entries):
+    """
+    bulk_create unsaved entries in one transaction, doing the work the
+    model signals would have done for each save. Shared with registry.batch.
+    """
+    flag_batch(entries)
+    delta = Counter()
+    for entry in entries:
+        pack_signature(entry)
+        delta.update(entry_stat_keys(entry))
+    with transaction.atomic():
+        RegistryEntry.objects.bulk_create(entries, batch_size=len(entries))
+        apply_stat_delta(delta)
+        # created_at is only filled in by the insert
+        apply_daily_delta(Counter(key for entry in entries for key in entry_daily_keys(entry)))
+        bump_registry_version()
+    return entries
+
+
+def import_file(file, filename, **kwargs):
+    return import_rows(read_rows(file, filename), **kwargs)
+
+
+def error_rows(result):
+    """The per-row error report as CSV rows: row number, field, message."""
+    yield ['row', 'field', 'message']
+    for number, errors in result.errors:
+        for name, messages in errors.items():
+            for message in messages:
+                yield [number, name, message]
+
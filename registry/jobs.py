@@ -0,0 +1,220 @@
+# registry/jobs.py
+"""
+Background PDF renders without a broker.
+
+Views record a ReportJob row and hand its id to a process pool; the
+worker process renders the xhtml2pdf report into the report cache
+(registry.report_cache) and marks the row done or failed. A job's
+params_hash is its report cache key, so a request with the same kind and
+params, against an unchanged registry, is given the existing job: still
+running, or done with its file still cached. If REGISTRY_JOB_WORKERS is
+0, or the web process dies with jobs still queued, the run_report_jobs
+command works through them instead.
+"""
+import multiprocessing
+import os
+import threading
+import traceback
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from datetime import date, timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.db import close_old_connections, transaction
+from django.template.loader import get_template
+from django.utils import timezone
+from xhtml2pdf import pisa
+
+from . import workers
+from .models import RegistryEntry, ReportJob
+from .report_cache import cache_name, lookup, report_key, store
+from .routers import read_from_replica
+from .search import search_entries
+from .writer import write_transaction
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def submit_report(kind, params):
+    """
+    Queue a render of kind with params and return its ReportJob. An
+    identical job that is pending, or done and still cached, is returned
+    as is.
+    """
+    if kind not in RENDERERS:
+        raise ValueError(f"Unknown report kind: {kind}")
+    # Keyed by the version of the database run_job renders from
+    with read_from_replica():
+        digest = report_key(kind, params)
+    # Reads the existing job before writing a new one
+    with write_transaction():
+        existing = ReportJob.objects.filter(
+            params_hash=digest, status__in=[ReportJob.QUEUED, ReportJob.RUNNING, ReportJob.DONE]
+        ).order_by("-created_at").first()
+        if existing and (existing.status != ReportJob.DONE or lookup(digest, "pdf")):
+            job = existing
+        else:
+            job = ReportJob.objects.create(kind=kind, params=params, params_hash=digest)
+        if job.status == ReportJob.QUEUED:
+            # Also re-sent for an existing queued job, in case the process
+            # that queued it went away; run_job only runs it once. The
+            # worker reads the row on its own connection, so wait for commit.
+            transaction.on_commit(lambda: _dispatch(job.pk))
+    return job
+
+
+def _dispatch(job_id):
+    try:
+        submit_task(workers.run_job, str(job_id))
+    except Exception:
+        # Run from a commit hook, so the job is already saved: fail it
+        # rather than leave it queued with nothing to run it
+        ReportJob.objects.filter(pk=job_id, status=ReportJob.QUEUED).update(
+            status=ReportJob.FAILED, error=traceback.format_exc(), finished_at=timezone.now()
+        )
+
+
+def submit_task(func, *args):
+    """
+    Run func(*args) in the pool; func must live in registry.workers. Does
+    nothing when the pool is disabled, leaving the work to the management
+    commands. Returns whether the task was submitted.
+    """
+    global _executor
+    executor = get_executor()
+    if executor is None:
+        return False
+    try:
+        executor.submit(func, *args)
+    except (BrokenExecutor, RuntimeError):
+        # A worker died, or the pool was shut down; start a fresh one.
+        # Whatever the task was for is still pending in the database, so
+        # the commands can pick it up if this fails too.
+        with _executor_lock:
+            if _executor is executor:
+                _executor = None
+        get_executor().submit(func, *args)
+    return True
+
+
+def get_executor():
+    """The shared process pool, started on first use; None when disabled."""
+    global _executor
+    pool_size = getattr(settings, "REGISTRY_JOB_WORKERS", 2)
+    if pool_size <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            # spawn: a forked child would inherit the parent's DB connections
+            _executor = ProcessPoolExecutor(
+                max_workers=pool_size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=workers.init_worker,
+                initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "myproject.settings"),),
+            )
+    return _executor
+
+
+def run_job(job_id):
+    """
+    Render one job. Safe to call twice for the same id: only the caller
+    that moves it from queued to running does the work.
+    """
+    close_old_connections()
+    claimed = ReportJob.objects.filter(pk=job_id, status=ReportJob.QUEUED).update(
+        status=ReportJob.RUNNING, started_at=timezone.now()
+    )
+    if not claimed:
+        return
+    job = ReportJob.objects.get(pk=job_id)
+    try:
+        with read_from_replica():
+            content = RENDERERS[job.kind](job.params)
+        store(job.params_hash, "pdf", lambda out: out.write(content))
+        job.result.name = cache_name(job.params_hash, "pdf")
+        job.status = ReportJob.DONE
+    except Exception:
+        job.status = ReportJob.FAILED
+        job.error = traceback.format_exc()
+    job.finished_at = timezone.now()
+    job.save(update_fields=["result", "status", "error", "finished_at"])
+    close_old_connections()
+
+
+def link_callback(uri, rel):
+    """Map static and media URLs in the template to files for xhtml2pdf."""
+    if uri.startswith(settings.MEDIA_URL):
+        return os.path.join(settings.MEDIA_ROOT, uri[len(settings.MEDIA_URL):])
+    if uri.startswith(settings.STATIC_URL):
+        path = uri[len(settings.STATIC_URL):]
+        return finders.find(path) or os.path.join(settings.STATIC_ROOT, path)
+    return uri
+
+
+def render_entries_pdf(entries, **context):
+    """Render entries through pdf_preview.html and return the PDF bytes."""
+    html = get_template("registry/pdf_preview.html").render({"entries": entries, **context})
+    result = BytesIO()
+    status = pisa.CreatePDF(html, dest=result, link_callback=link_callback)
+    if status.err:
+        raise RuntimeError(f"xhtml2pdf reported {status.err} error(s)")
+    return result.getvalue()
+
+
+def export_params(request):
+    """The registry_export filters a job needs, as JSON-safe params."""
+    params = {
+        key: request.GET.get(key, "")
+        for key in ("search", "gender", "grant", "tish_area")
+    }
+    params["export_format"] = request.GET.get("export_format", "pdf")
+    # Period filters are relative to the day the export was asked for
+    params["as_of"] = timezone.localdate().isoformat()
+    return params
+
+
+def export_entries(params):
+    """Apply registry_export's filters; shared by the view and the worker."""
+    entries = RegistryEntry.objects.for_export()
+    if params.get("search"):
+        entries = search_entries(entries, params["search"])
+    if params.get("gender"):
+        entries = entries.filter(gender=params["gender"])
+    if params.get("grant"):
+        entries = entries.filter(social_grant=params["grant"])
+    if params.get("tish_area"):
+        entries = entries.filter(tish_area=params["tish_area"])
+
+    as_of = date.fromisoformat(params["as_of"]) if params.get("as_of") else timezone.localdate()
+    period = params.get("export_format")
+    if period == "day":
+        entries = entries.filter(created_at__date=as_of)
+    elif period == "week":
+        entries = entries.filter(created_at__date__gte=as_of - timedelta(days=as_of.weekday()))
+    elif period == "month":
+        entries = entries.filter(created_at__month=as_of.month, created_at__year=as_of.year)
+    elif period == "year":
+        entries = entries.filter(created_at__year=as_of.year)
+    return entries
+
+
+def _render_pdf_preview(params):
+    return render_entries_pdf(RegistryEntry.objects.for_export().order_by("surname"))
+
+
+def _render_registry_export(params):
+    return render_entries_pdf(export_entries(params))
+
+
+def _render_admin_selection(params):
+    entries = RegistryEntry.objects.for_export().filter(pk__in=params.get("ids", []))
+    return render_entries_pdf(entries, total_count=entries.count())
+
+
+RENDERERS = {
+    "pdf_preview": _render_pdf_preview,
+    "registry_export": _render_registry_export,
+    "admin_selection": _render_admin_selection,
+}
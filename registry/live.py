@@ -0,0 +1,156 @@
+# registry/live.py
+"""
+Live dashboard updates over server-sent events (ASGI only).
+
+Each server process runs one watcher while anyone is listening. It reads
+the registry write counter every REGISTRY_LIVE_POLL_SECONDS and, when the
+counter moves, reads the RegistryStat counters once and sends every
+connected dashboard the difference from the last payload. However many
+dashboards are open, a process makes one cheap query per interval, and
+the counters only change through the registry's own save/delete signals
+and bulk writers, so the deltas cover creates, updates and deletes alike.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .routers import read_from_replica
+from .stats import stats_payload
+from .version import registry_version
+
+# Comment lines keep idle connections open through proxies
+KEEPALIVE_SECONDS = 15
+# Deltas a slow client may fall behind by before it is sent a fresh snapshot
+QUEUE_SIZE = 100
+# Longest wait between polls while reads keep failing
+MAX_BACKOFF_SECONDS = 30
+
+logger = logging.getLogger(__name__)
+
+
+def poll_seconds():
+    return getattr(settings, "REGISTRY_LIVE_POLL_SECONDS", 1.0)
+
+
+def payload_delta(old, new):
+    """
+    {key: change} between two dashboard payloads, leaving out what did
+    not change. Count dictionaries give {value: change} per value.
+    """
+    delta = {}
+    for key, value in new.items():
+        if isinstance(value, dict):
+            previous = old.get(key, {})
+            changes = {
+                name: value.get(name, 0) - previous.get(name, 0)
+                for name in set(value) | set(previous)
+                if value.get(name, 0) != previous.get(name, 0)
+            }
+            if changes:
+                delta[key] = changes
+        elif value != old.get(key, 0):
+            delta[key] = value - old.get(key, 0)
+    return delta
+
+
+def sse_event(event, data, event_id=None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _read():
+    # The counter first: a write landing in between is picked up next poll
+    with read_from_replica():
+        return registry_version(), stats_payload()
+
+
+def _read_version():
+    with read_from_replica():
+        return registry_version()
+
+
+class Broadcaster:
+    """Fans one process's view of the registry out to its SSE listeners."""
+
+    def __init__(self):
+        self.listeners = set()
+        self.version = None
+        self.payload = None
+        self._task = None
+
+    async def subscribe(self):
+        """A queue of (event, data, version) tuples, starting with a snapshot."""
+        if self.payload is None:
+            self.version, self.payload = await sync_to_async(_read)()
+        queue = asyncio.Queue(QUEUE_SIZE)
+        queue.put_nowait(("snapshot", self.payload, self.version))
+        self.listeners.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.listeners.discard(queue)
+
+    async def _watch(self):
+        failures = 0
+        while self.listeners:
+            # Back off while the database keeps failing, e.g. while it restarts
+            await asyncio.sleep(min(poll_seconds() * 2 ** failures, MAX_BACKOFF_SECONDS))
+            try:
+                await self._poll()
+            except Exception:
+                failures += 1
+                logger.exception("Live dashboard poll failed (%d in a row)", failures)
+                # Drop a connection the failure left broken, so the next poll reconnects
+                await sync_to_async(close_old_connections)()
+            else:
+                failures = 0
+        # Nobody is listening; the next subscriber starts from a fresh read
+        self.payload = None
+
+    async def _poll(self):
+        version = await sync_to_async(_read_version)()
+        if version == self.version:
+            return
+        version, payload = await sync_to_async(_read)()
+        delta = payload_delta(self.payload, payload)
+        self.version, self.payload = version, payload
+        if delta:
+            self._publish(("delta", delta, version))
+
+    def _publish(self, message):
+        for queue in list(self.listeners):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too far behind for deltas to be useful: start it over
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("snapshot", self.payload, self.version))
+
+
+broadcaster = Broadcaster()
+
+
+async def dashboard_events():
+    """The SSE stream for one dashboard: a snapshot, then deltas."""
+    queue = await broadcaster.subscribe()
+    try:
+        while True:
+            try:
+                event, data, version = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield sse_event(event, data, version)
+    finally:
+        broadcaster.unsubscribe(queue)
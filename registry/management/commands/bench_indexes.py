@@ -0,0 +1,89 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from registry.models import RegistryEntry
+
+
+class _Rollback(Exception):
+    pass
+
+
+def hot_queries():
+    """
+    The filters registry_list, registry_export, the admin list_filter and
+    the period reports run, as (label, queryset, kind) triples where kind
+    is 'page' (first 50 rows in list order) or 'count'.
+    """
+    entries = RegistryEntry.objects.all()
+    week_ago = timezone.now() - timedelta(days=7)
+    page, count = 'page', 'count'
+    return [
+        ("list: first page", entries, page),
+        ("list: tish_area + gender", entries.filter(tish_area='Hostel', gender='Female'), page),
+        ("list: gender + grant", entries.filter(gender='Male', social_grant='SRD'), page),
+        ("export: grant", entries.filter(social_grant='Disability Grant'), count),
+        ("admin: ward_no", entries.filter(ward_no='12'), count),
+        ("report: last 7 days", entries.filter(created_at__gte=week_ago), count),
+        ("report: disability, last 7 days", entries.filter(disability=True, created_at__gte=week_ago), count),
+        ("report: cooperative members", entries.filter(cooperative_member=True), count),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the registry's hot filters and print their query plans, with the "
+        "RegistryEntry indexes dropped (inside a rolled-back transaction) and in place."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per query; the best time is reported.")
+        parser.add_argument('--plans', action='store_true', help="Also print EXPLAIN output for each query.")
+
+    def _run(self, repeat, plans):
+        results = {}
+        for label, queryset, kind in hot_queries():
+            if kind == 'page':
+                queryset = queryset.order_by('surname', 'id')[:50]
+                evaluate, explained = (lambda qs: list(qs.all())), queryset
+            else:
+                evaluate, explained = (lambda qs: qs.count()), queryset.values('pk')
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                evaluate(queryset)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            plan = explained.explain() if plans else ''
+            results[label] = (best * 1000, plan)
+        return results
+
+    def handle(self, *args, **options):
+        repeat, plans = max(1, options['repeat']), options['plans']
+        index_names = [index.name for index in RegistryEntry._meta.indexes]
+
+        # DROP INDEX is transactional on SQLite and PostgreSQL
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for name in index_names:
+                        cursor.execute(f"DROP INDEX IF EXISTS {connection.ops.quote_name(name)}")
+                before = self._run(repeat, plans)
+                raise _Rollback
+        except _Rollback:
+            pass
+        after = self._run(repeat, plans)
+
+        total = RegistryEntry.objects.count()
+        self.stdout.write(f"{total} registry entries, best of {repeat} runs\n")
+        self.stdout.write(f"{'query':<36}{'no indexes':>14}{'indexed':>12}{'speed-up':>10}")
+        for label, (before_ms, before_plan) in before.items():
+            after_ms, after_plan = after[label]
+            speedup = before_ms / after_ms if after_ms else float('inf')
+            self.stdout.write(f"{label:<36}{before_ms:>11.2f} ms{after_ms:>9.2f} ms{speedup:>9.1f}x")
+            if plans:
+                self.stdout.write(f"    before: {' | '.join(before_plan.splitlines())}")
+                self.stdout.write(f"    after:  {' | '.join(after_plan.splitlines())}")
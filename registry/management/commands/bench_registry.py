@@ -0,0 +1,282 @@
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+
+from registry import report_cache
+from registry.jobs import export_entries, run_job
+from registry.models import RegistryEntry, ReportJob
+from registry.profiling import QueryRecorder
+from registry.seeding import seed_entries
+from registry.signatures import render_signature
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+SIGNATURE_SAMPLE = 200
+
+# (case, query string) for the register list
+LIST_CASES = [
+    ("registry_list", {}),
+    ("registry_list filtered", {"gender": "Female", "tish_area": "Informal Settlement"}),
+    ("registry_list grant", {"grant": "SRD"}),
+    ("registry_list search", {"search": "nkosi thand"}),
+    ("registry_list page 200", {"page": 200}),
+]
+# registry_export formats rendered by the job pool (xhtml2pdf)
+JOB_FORMATS = ["pdf", "day", "week", "month", "year"]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _consume(response):
+    """Read the whole body, as a browser would; returns its size."""
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    response.close()
+    return size
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed throwaway SQLite databases with N synthetic entries and time the dashboard, "
+        "the register list, every export format, the PDF reports and signature rendering "
+        "on each. Results are written as JSON; --compare prints the change from an earlier run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_SIZES, help="Register sizes to test.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per case; best and median are reported.")
+        parser.add_argument('--output', default='bench-registry.json', help="JSON results file.")
+        parser.add_argument(
+            '--workdir',
+            help="Keep the seeded databases here and reuse them on later runs "
+                 "(default: a temporary directory, removed afterwards).",
+        )
+        parser.add_argument(
+            '--pdf-max-rows', type=int, default=1_000,
+            help="Skip xhtml2pdf job renders covering more entries than this (0: no limit).",
+        )
+        parser.add_argument('--compare', help="An earlier --output file to compare against.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("This benchmark builds SQLite databases; run it with the SQLite settings.")
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read {options['compare']}: {exc}")
+
+        self.verbosity = options['verbosity']
+        # xhtml2pdf warns about the template's CSS on every render
+        logging.getLogger('xhtml2pdf').setLevel(logging.ERROR)
+        workdir = options['workdir'] or tempfile.mkdtemp(prefix='bench-registry-')
+        os.makedirs(workdir, exist_ok=True)
+        media = tempfile.mkdtemp(prefix='bench-media-')
+        original = {key: connection.settings_dict[key] for key in ('NAME', 'CONN_MAX_AGE')}
+        # One connection throughout, so query counts are the views' own
+        # rather than including each new connection's PRAGMAs
+        connection.settings_dict['CONN_MAX_AGE'] = None
+        results = {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "seed": options['seed'],
+            "repeat": options['repeat'],
+            "at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "sizes": {},
+        }
+        try:
+            with override_settings(
+                MEDIA_ROOT=media,
+                REGISTRY_JOB_WORKERS=0,
+                REGISTRY_PROFILING=False,
+                ALLOWED_HOSTS=['testserver'],
+            ):
+                for rows in options['rows']:
+                    self._use_database(workdir, rows, options['seed'])
+                    previous = (baseline or {}).get("sizes", {}).get(str(rows), {})
+                    results["sizes"][str(rows)] = self._bench(
+                        rows, options['repeat'], options['pdf_max_rows'], previous,
+                    )
+        finally:
+            connections.close_all()
+            connection.settings_dict.update(original)
+            shutil.rmtree(media, ignore_errors=True)
+            if not options['workdir']:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _use_database(self, workdir, rows, seed):
+        """Point the default connection at a seeded database of rows entries, building it if needed."""
+        path = os.path.join(workdir, f"bench-{rows}-seed{seed}.sqlite3")
+        connections.close_all()
+        connection.settings_dict['NAME'] = path
+        if os.path.exists(path) and RegistryEntry.objects.count() == rows:
+            self.stdout.write(f"Reusing {path}")
+            return
+        connections.close_all()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+        call_command('migrate', verbosity=0)
+        started = time.perf_counter()
+
+        def progress(done):
+            if self.verbosity > 1:
+                self.stdout.write(f"  {done:,}/{rows:,} entries")
+
+        seed_entries(rows, seed=seed, progress=progress)
+        self.stdout.write(f"Seeded {rows:,} entries in {time.perf_counter() - started:.0f}s ({path})")
+
+    def _bench(self, rows, repeat, pdf_max_rows, previous):
+        """Time every case against the current database, printing each as it finishes."""
+        client = Client()
+        cases = {}
+        self.stdout.write(f"\n{rows:,} entries")
+        self.stdout.write(f"{'case':<26}{'best ms':>10}{'median ms':>11}{'queries':>9}{'KB':>10}{'vs before':>11}")
+
+        def add(name, case):
+            cases[name] = case
+            self._line(name, case, previous.get(name, {}))
+
+        def url(name, query=None):
+            return reverse(name) + (f"?{urlencode(query)}" if query else "")
+
+        def get(path):
+            return lambda: _consume(self._ok(client.get(path)))
+
+        add("dashboard_data cold", self._time(repeat, get(url('dashboard_data'))))
+        add("dashboard_data warm", self._time(repeat, get(url('dashboard_data')), cold=False))
+        for name, query in LIST_CASES:
+            add(name, self._time(repeat, get(url('registry_list', query))))
+
+        # registry_export shares its URL name with pdf_preview; go by path
+        export_url = '/registry/export/'
+        add("registry_export csv", self._time(repeat, get(f"{export_url}?export_format=csv")))
+        for export_format in JOB_FORMATS:
+            params = {"export_format": export_format}
+            covered = export_entries(params).count()
+            if pdf_max_rows and covered > pdf_max_rows:
+                case = {"skipped": f"{covered:,} entries > --pdf-max-rows"}
+            else:
+                case = self._time(repeat, self._job(client, f"{export_url}?{urlencode(params)}"))
+                case["entries"] = covered
+            add(f"registry_export {export_format}", case)
+
+        add("export_pdf", self._time(repeat, get(url('export_pdf'))))
+        if pdf_max_rows and rows > pdf_max_rows:
+            add("pdf_preview", {"skipped": f"{rows:,} entries > --pdf-max-rows"})
+        else:
+            add("pdf_preview", self._time(repeat, self._job(client, '/export/pdf/preview/')))
+
+        signed = list(
+            RegistryEntry.objects.filter(signature_blob__isnull=False)
+            .only('signature_blob', 'signature_data')[:SIGNATURE_SAMPLE]
+        )
+        case = self._time(repeat, lambda: self._signatures(signed))
+        case["signatures"] = len(signed)
+        add("signature render", case)
+        return cases
+
+    def _job(self, client, path):
+        """A view that queues a PDF job, with the job then run inline."""
+        def run():
+            response = self._ok(client.get(path), redirect=True)
+            job_id = resolve(response.url).kwargs['job_id']
+            run_job(job_id)
+            job = ReportJob.objects.get(pk=job_id)
+            if job.status != ReportJob.DONE:
+                raise CommandError(f"{path}: job {job.status}: {job.error}")
+            return job.result.size
+        return run
+
+    def _signatures(self, entries):
+        size = 0
+        for entry in entries:
+            image = render_signature(entry.signature_strokes(), padding=10)
+            buffer = BytesIO()
+            image.save(buffer, format='PNG')
+            size += buffer.tell()
+        return size
+
+    def _ok(self, response, redirect=False):
+        expected = (302,) if redirect else (200,)
+        if response.status_code not in expected:
+            raise CommandError(f"{response.request['PATH_INFO']} returned {response.status_code}")
+        return response
+
+    def _cold(self):
+        """Forget every cached report and job, so the next run does the full work."""
+        with report_cache._memory_lock:
+            report_cache._memory.clear()
+        shutil.rmtree(report_cache.cache_dir(), ignore_errors=True)
+        ReportJob.objects.all().delete()
+
+    def _time(self, repeat, func, cold=True):
+        """Run func repeat times; it returns the response size in bytes."""
+        if not cold:
+            self._cold()
+            func()
+        runs = []
+        for _ in range(max(1, repeat)):
+            if cold:
+                self._cold()
+            recorder = QueryRecorder(float('inf'))
+            with connection.execute_wrapper(recorder):
+                started = time.perf_counter()
+                size = func()
+                elapsed = time.perf_counter() - started
+            runs.append(round(elapsed * 1000, 1))
+        return {
+            "ms": runs,
+            "best_ms": min(runs),
+            "median_ms": statistics.median(runs),
+            "bytes": size,
+            "queries": recorder.count,
+        }
+
+    def _line(self, name, case, before):
+        if "skipped" in case:
+            self.stdout.write(f"{name:<26}  skipped: {case['skipped']}")
+            return
+        change = ''
+        if before.get("best_ms"):
+            change = f"{(case['best_ms'] - before['best_ms']) / before['best_ms']:+.0%}"
+        self.stdout.write(
+            f"{name:<26}{case['best_ms']:>10.1f}{case['median_ms']:>11.1f}{case['queries']:>9}"
+            f"{case['bytes'] / 1024:>10.1f}{change:>11}"
+        )
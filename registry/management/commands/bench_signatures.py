@@ -0,0 +1,98 @@
+import math
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageDraw
+
+from registry.signatures import layout_strokes, render_signature
+
+
+def synthetic_signature(points, strokes=3, seed=0):
+    """
+    A pen capture of roughly points samples split over strokes: looping
+    cursive-like curves sampled densely, with sub-pixel sensor jitter.
+    """
+    rng = np.random.default_rng(seed)
+    per_stroke = max(2, points // strokes)
+    data = []
+    for index in range(strokes):
+        t = np.linspace(0, 2 * math.pi, per_stroke)
+        x = 120 * index + 40 * t + 18 * np.sin(3 * t) + rng.normal(0, 0.1, per_stroke)
+        y = 60 + 35 * np.sin(2 * t + index) + 10 * np.cos(5 * t) + rng.normal(0, 0.1, per_stroke)
+        data.append({"points": [{"x": float(a), "y": float(b)} for a, b in zip(x, y)]})
+    return data
+
+
+def legacy_flat(signature_data):
+    # The per-segment loop registry/utils.py used before the engine
+    all_x = [point['x'] for point in signature_data]
+    all_y = [point['y'] for point in signature_data]
+    min_x, min_y = min(all_x), min(all_y)
+    img = Image.new('RGB', (int(max(all_x) - min_x) + 20, int(max(all_y) - min_y) + 20), 'white')
+    draw = ImageDraw.Draw(img)
+    for i in range(len(signature_data) - 1):
+        a, b = signature_data[i], signature_data[i + 1]
+        draw.line([(a['x'] - min_x + 10, a['y'] - min_y + 10), (b['x'] - min_x + 10, b['y'] - min_y + 10)],
+                  fill='black', width=2)
+    return img
+
+
+def legacy_strokes(signature_data, output_size=(300, 100)):
+    # The stroke-list version registry/views.py used before the engine
+    img = Image.new('RGBA', output_size, (255, 255, 255, 0))
+    draw = ImageDraw.Draw(img)
+    all_x = [point['x'] for stroke in signature_data for point in stroke['points']]
+    all_y = [point['y'] for stroke in signature_data for point in stroke['points']]
+    min_x, min_y = min(all_x), min(all_y)
+    scale = min((output_size[0] - 10) / (max(all_x) - min_x), (output_size[1] - 10) / (max(all_y) - min_y))
+    for stroke in signature_data:
+        points = [((p['x'] - min_x) * scale + 5, (p['y'] - min_y) * scale + 5) for p in stroke['points']]
+        if len(points) > 1:
+            draw.line(points, fill='black', width=2)
+    return img
+
+
+def best_of(repeat, func, *args, **kwargs):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+class Command(BaseCommand):
+    help = "Time signature rendering, old per-segment code against registry.signatures, for 10 to 10,000 points."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,100,1000,10000', help="Comma-separated point counts.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per case; the best time is reported.")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        repeat = max(1, options['repeat'])
+
+        self.stdout.write(f"best of {repeat} runs, times in ms")
+        self.stdout.write(
+            f"{'points':>7}{'drawn@300px':>13}"
+            f"{'flat old':>11}{'flat new':>10}{'stroke old':>12}{'stroke new':>12}{'speed-up':>10}"
+        )
+        for size in sizes:
+            strokes = synthetic_signature(size)
+            flat = [point for stroke in strokes for point in stroke['points']]
+
+            # Points actually drawn on the 300x100 canvas
+            _, laid_out = layout_strokes(strokes, output_size=(300, 100), padding=5)
+            kept = sum(len(stroke) for stroke in laid_out)
+
+            flat_old = best_of(repeat, legacy_flat, flat)
+            flat_new = best_of(repeat, render_signature, flat, padding=10)
+            stroke_old = best_of(repeat, legacy_strokes, strokes)
+            stroke_new = best_of(repeat, render_signature, strokes, output_size=(300, 100), padding=5, transparent=True)
+            speedup = (flat_old + stroke_old) / (flat_new + stroke_new)
+            self.stdout.write(
+                f"{len(flat):>7}{kept:>13}"
+                f"{flat_old:>11.2f}{flat_new:>10.2f}{stroke_old:>12.2f}{stroke_new:>12.2f}{speedup:>9.1f}x"
+            )
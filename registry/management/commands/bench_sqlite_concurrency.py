@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test.utils import override_settings
+
+from registry.database import DEFAULT_PRAGMAS
+from registry.models import RegistryEntry
+from registry.stats import stats_payload
+from registry.writer import run_write
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Write entries from N threads while M threads read the dashboard and the "
+        "first list page, on a copy of the SQLite database, and report throughput, "
+        "latency and 'database is locked' errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument(
+            '--serialize', action='store_true',
+            help="Send writes through the single-writer queue (REGISTRY_SERIALIZE_WRITES).",
+        )
+        parser.add_argument(
+            '--baseline', action='store_true',
+            help="Use Django's stock SQLite setup: rollback journal, bare autocommit saves, no PRAGMAs.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("This benchmark is for the SQLite backend.")
+        copy = self._copy_database(options['baseline'])
+        pragmas = dict.fromkeys(DEFAULT_PRAGMAS) if options['baseline'] else {}
+        try:
+            with override_settings(
+                REGISTRY_SQLITE_PRAGMAS=pragmas,
+                REGISTRY_SERIALIZE_WRITES=options['serialize'],
+            ):
+                results = self._run(options['writers'], options['readers'], options['seconds'], options['baseline'])
+        finally:
+            connections.close_all()
+            for suffix in ('', '-wal', '-shm', '-journal'):
+                if os.path.exists(copy + suffix):
+                    os.unlink(copy + suffix)
+
+        seconds = options['seconds']
+        mode = "baseline" if options['baseline'] else "tuned"
+        if options['serialize']:
+            mode += ", serialized writes"
+        self.stdout.write(f"{options['writers']} writer(s), {options['readers']} reader(s), {seconds:g}s ({mode})")
+        self.stdout.write(f"{'':<8}{'ops':>8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'locked':>8}")
+        for label, (times, locked) in results.items():
+            self.stdout.write(
+                f"{label:<8}{len(times):>8}{len(times) / seconds:>10.1f}"
+                f"{_percentile(times, 0.5) * 1000:>10.1f}{_percentile(times, 0.95) * 1000:>10.1f}"
+                f"{(max(times) if times else 0) * 1000:>10.1f}{locked:>8}"
+            )
+
+    def _copy_database(self, baseline):
+        """Point the default connection at a copy, so the benchmark's writes are thrown away."""
+        source = str(connection.settings_dict['NAME'])
+        fd, copy = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        with sqlite3.connect(source) as src, sqlite3.connect(copy) as dst:
+            src.backup(dst)
+            if baseline:
+                dst.execute("PRAGMA journal_mode = DELETE")
+        connections.close_all()
+        # Connections in every thread are built from this settings dict
+        connection.settings_dict['NAME'] = copy
+        return copy
+
+    def _run(self, writers, readers, seconds, baseline):
+        results = {'write': ([], 0), 'read': ([], 0)}
+        lock = threading.Lock()
+        stop = time.perf_counter() + seconds
+        template = RegistryEntry.objects.values(
+            'names', 'surname', 'gender', 'race', 'tish_area', 'ward_no', 'social_grant',
+        ).first() or {'names': 'Bench', 'surname': 'Writer', 'tish_area': 'Hostel'}
+
+        def record(label, elapsed, locked):
+            with lock:
+                times, count = results[label]
+                if elapsed is not None:
+                    times.append(elapsed)
+                results[label] = (times, count + locked)
+
+        def write(number):
+            sequence = 0
+            while time.perf_counter() < stop:
+                sequence += 1
+                entry = RegistryEntry(**template, id_no_or_dob=f"BENCH{number:03d}{sequence:07d}")
+                started = time.perf_counter()
+                try:
+                    if baseline:
+                        # Stock Django: a bare save in autocommit
+                        entry.save()
+                    else:
+                        run_write(entry.save)
+                except OperationalError:
+                    record('write', None, 1)
+                else:
+                    record('write', time.perf_counter() - started, 0)
+            connection.close()
+
+        def read():
+            while time.perf_counter() < stop:
+                started = time.perf_counter()
+                try:
+                    stats_payload()
+                    list(RegistryEntry.objects.for_listing().order_by('surname', 'id')[:50])
+                except OperationalError:
+                    record('read', None, 1)
+                else:
+                    record('read', time.perf_counter() - started, 0)
+            connection.close()
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+        threads += [threading.Thread(target=read) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
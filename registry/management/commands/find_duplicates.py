@@ -0,0 +1,58 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from registry.duplicates import DUPLICATE_THRESHOLD, PAIR_FIELDS, WINDOW, duplicate_pairs
+from registry.models import RegistryEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "List likely duplicate beneficiaries across the whole registry. Rows "
+        "are only compared within their ID and name-sound blocks, so the scan "
+        "grows roughly linearly with the registry."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=DUPLICATE_THRESHOLD,
+                            help="Minimum score (0-1) for a pair to be reported.")
+        parser.add_argument('--window', type=int, default=WINDOW,
+                            help="Neighbours each row is compared with inside a block.")
+        parser.add_argument('--output', metavar='CSV', help="Write the pairs here instead of to stdout.")
+        parser.add_argument('--mark', action='store_true',
+                            help="Set possible_duplicate on every row in a pair and clear it on all others.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = RegistryEntry.objects.values(*PAIR_FIELDS).iterator(chunk_size=options['chunk_size'])
+        pairs = sorted(
+            duplicate_pairs(rows, threshold=options['threshold'], window=max(1, options['window'])),
+            key=lambda pair: -pair[2],
+        )
+        elapsed = time.perf_counter() - started
+
+        out = open(options['output'], 'w', newline='') if options['output'] else self.stdout
+        try:
+            writer = csv.writer(out)
+            writer.writerow(['score', 'id', 'names', 'surname', 'id_no_or_dob',
+                             'other_id', 'other_names', 'other_surname', 'other_id_no_or_dob'])
+            for a, b, score in pairs:
+                writer.writerow([f"{score:.2f}", a['id'], a['names'], a['surname'], a['id_no_or_dob'],
+                                 b['id'], b['names'], b['surname'], b['id_no_or_dob']])
+        finally:
+            if options['output']:
+                out.close()
+
+        if options['mark']:
+            flagged = sorted({row['id'] for a, b, _ in pairs for row in (a, b)})
+            with transaction.atomic():
+                RegistryEntry.objects.filter(possible_duplicate=True).update(possible_duplicate=False)
+                # Chunked to stay under the database's parameter limit
+                for start in range(0, len(flagged), 900):
+                    RegistryEntry.objects.filter(pk__in=flagged[start:start + 900]).update(possible_duplicate=True)
+            self.stderr.write(f"Marked {len(flagged)} entries as possible duplicates")
+
+        self.stderr.write(self.style.SUCCESS(f"{len(pairs)} likely duplicate pair(s) found in {elapsed:.1f}s"))
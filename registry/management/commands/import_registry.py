@@ -0,0 +1,45 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from registry.importer import IMPORT_BATCH_SIZE, error_rows, import_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Import beneficiaries from a .csv or .xlsx spreadsheet with a header "
+        "row. Rows are validated like the entry form; rejected rows are "
+        "listed with their row number and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                            help="Rows per bulk insert and transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Validate only; write nothing.")
+        parser.add_argument('--errors', metavar='CSV',
+                            help="Write the per-row error report here instead of to stderr.")
+
+    def handle(self, *args, **options):
+        try:
+            source = open(options['path'], 'rb')
+        except OSError as exc:
+            raise CommandError(exc)
+        with source:
+            result = import_file(
+                source, options['path'], batch_size=max(1, options['batch_size']), dry_run=options['dry_run'],
+            )
+
+        if result.unknown_columns:
+            self.stdout.write(f"Ignored column(s): {', '.join(result.unknown_columns)}")
+        if result.errors:
+            if options['errors']:
+                with open(options['errors'], 'w', newline='') as out:
+                    csv.writer(out).writerows(error_rows(result))
+                self.stdout.write(f"Error report written to {options['errors']}")
+            else:
+                for number, name, message in list(error_rows(result))[1:]:
+                    self.stderr.write(f"row {number}: {name}: {message}")
+
+        prefix = "Dry run: " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(prefix + result.summary()))
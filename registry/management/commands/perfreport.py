@@ -0,0 +1,94 @@
+import json
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from registry.profiling import profile_log_path
+
+SORT_KEYS = {
+    "p95": lambda row: row["p95"],
+    "total": lambda row: row["total"],
+    "max": lambda row: row["max"],
+    "queries": lambda row: row["queries"],
+}
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def _mean(values):
+    values = [value for value in values if value is not None]
+    return sum(values) / len(values) if values else None
+
+
+class Command(BaseCommand):
+    help = "Summarize the request profile log written by registry.profiling.ProfilingMiddleware."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', help="Profile log to read (default: REGISTRY_PROFILE_LOG).")
+        parser.add_argument('--limit', type=int, default=15, help="Endpoints and slow queries to show.")
+        parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='p95')
+        parser.add_argument('--since', help="Only requests at or after this time (YYYY-MM-DD[THH:MM]).")
+
+    def handle(self, *args, **options):
+        path = options['log'] or profile_log_path()
+        try:
+            log = open(path, encoding='utf-8')
+        except FileNotFoundError:
+            raise CommandError(f"No profile log at {path}; set REGISTRY_PROFILING = True to collect one.")
+
+        requests = defaultdict(list)
+        slow = defaultdict(list)
+        with log:
+            for line in log:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if options['since'] and record['at'] < options['since']:
+                    continue
+                requests[record['view']].append(record)
+                for query in record.get('slow', []):
+                    slow[query['origin'], query['sql']].append(query['ms'])
+        if not requests:
+            self.stdout.write("No requests recorded.")
+            return
+
+        rows = []
+        for view, records in requests.items():
+            times = [record['ms'] for record in records]
+            rows.append({
+                "view": view,
+                "count": len(records),
+                "p50": _percentile(times, 0.5),
+                "p95": _percentile(times, 0.95),
+                "max": max(times),
+                "total": sum(times),
+                "queries": _mean(record['queries'] for record in records),
+                "sql_ms": _mean(record['sql_ms'] for record in records),
+                "bytes": _mean(record['bytes'] for record in records),
+                "peak_kb": max((record['peak_kb'] for record in records if record['peak_kb'] is not None), default=None),
+            })
+        rows.sort(key=SORT_KEYS[options['sort']], reverse=True)
+
+        width = max(len(row['view']) for row in rows[:options['limit']]) + 2
+        self.stdout.write(
+            f"{'view':<{width}}{'n':>6}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'total s':>9}"
+            f"{'queries':>9}{'sql ms':>9}{'KB out':>9}{'peak KB':>9}"
+        )
+        for row in rows[:options['limit']]:
+            kilobytes = f"{row['bytes'] / 1024:.1f}" if row['bytes'] is not None else '-'
+            peak = row['peak_kb'] if row['peak_kb'] is not None else '-'
+            self.stdout.write(
+                f"{row['view']:<{width}}{row['count']:>6}{row['p50']:>9.0f}{row['p95']:>9.0f}{row['max']:>9.0f}"
+                f"{row['total'] / 1000:>9.1f}{row['queries']:>9.1f}{row['sql_ms']:>9.1f}{kilobytes:>9}{peak:>9}"
+            )
+
+        if slow:
+            self.stdout.write("\nSlowest queries (by total time):")
+            ranked = sorted(slow.items(), key=lambda item: sum(item[1]), reverse=True)
+            for (origin, sql), times in ranked[:options['limit']]:
+                self.stdout.write(f"  {len(times)}x, max {max(times):.0f} ms, total {sum(times):.0f} ms  {origin}")
+                self.stdout.write(f"    {' '.join(sql.split())[:200]}")
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from registry.models import RegistryEntry
+from registry.thumbnails import is_stale, make_thumbnail, thumbnail_name
+from registry.version import bump_registry_version
+
+
+class Command(BaseCommand):
+    help = (
+        "Make the signature thumbnails used by the list page and the PDF "
+        "exports. Only missing or stale ones are made unless --all is given. "
+        "Run it after changing REGISTRY_THUMBNAIL_FORMAT, or when "
+        "REGISTRY_JOB_WORKERS is 0 and nothing makes them after save."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Remake every thumbnail, even up-to-date ones.")
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        names = (
+            RegistryEntry.objects
+            .exclude(signature_image__isnull=True).exclude(signature_image='')
+            .values_list('signature_image', flat=True)
+            .iterator(chunk_size=options['chunk_size'])
+        )
+
+        made = skipped = failed = 0
+        for name in names:
+            if not options['all'] and not is_stale(name):
+                skipped += 1
+                continue
+            try:
+                make_thumbnail(name)
+            except (OSError, ValueError) as exc:
+                # Missing or unreadable originals are reported, not fatal
+                failed += 1
+                self.stderr.write(f"{thumbnail_name(name)}: {exc}")
+                continue
+            made += 1
+
+        if made:
+            bump_registry_version()
+        self.stdout.write(self.style.SUCCESS(f"{made} thumbnail(s) made, {skipped} skipped as up to date or missing, {failed} failed"))
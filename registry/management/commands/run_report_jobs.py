@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from registry.jobs import run_job
+from registry.models import ReportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background PDF jobs in this process. Use it when "
+        "REGISTRY_JOB_WORKERS is 0, or to finish jobs left behind by a web "
+        "process that exited before its pool got to them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requeue-stale', type=int, default=0, metavar='MINUTES',
+            help="First put jobs that have been 'running' for longer than this back in the queue.",
+        )
+        parser.add_argument(
+            '--purge-days', type=int, default=0, metavar='DAYS',
+            help="Also delete finished job rows older than this (files are left to the report cache).",
+        )
+
+    def handle(self, *args, **options):
+        if options['requeue_stale']:
+            cutoff = timezone.now() - timedelta(minutes=options['requeue_stale'])
+            requeued = ReportJob.objects.filter(status=ReportJob.RUNNING, started_at__lt=cutoff).update(
+                status=ReportJob.QUEUED, started_at=None
+            )
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+        done = failed = 0
+        for job_id in ReportJob.objects.filter(status=ReportJob.QUEUED).order_by('created_at').values_list('pk', flat=True):
+            run_job(job_id)
+            status = ReportJob.objects.filter(pk=job_id).values_list('status', flat=True).first()
+            if status == ReportJob.DONE:
+                done += 1
+            elif status == ReportJob.FAILED:
+                failed += 1
+                self.stderr.write(f"Job {job_id} failed")
+        self.stdout.write(self.style.SUCCESS(f"{done} job(s) done, {failed} failed"))
+
+        if options['purge_days']:
+            cutoff = timezone.now() - timedelta(days=options['purge_days'])
+            old = ReportJob.objects.filter(status__in=[ReportJob.DONE, ReportJob.FAILED], finished_at__lt=cutoff)
+            deleted, _ = old.delete()
+            self.stdout.write(f"Purged {deleted} old job(s)")
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from registry.seeding import SEED_BATCH_SIZE, seed_entries
+
+
+class Command(BaseCommand):
+    help = (
+        "Add synthetic registry entries with realistic wards, grants, TISH areas, "
+        "ID numbers and signature strokes (see registry/seeding.py). For load testing only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, required=True)
+        parser.add_argument('--seed', type=int, default=0, help="The same seed gives the same entries.")
+        parser.add_argument('--days', type=int, default=3 * 365, help="Spread registrations over this many past days.")
+        parser.add_argument('--batch-size', type=int, default=SEED_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        if rows < 1 or options['days'] < 1:
+            raise CommandError("--rows and --days must be positive.")
+        started = time.perf_counter()
+
+        def progress(done):
+            if self.verbosity > 1 or done == rows:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{done:,}/{rows:,} entries ({done / elapsed:,.0f}/s)")
+
+        self.verbosity = options['verbosity']
+        seed_entries(rows, seed=options['seed'], days=options['days'], batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"Seeded {rows:,} entries in {time.perf_counter() - started:.1f}s."))
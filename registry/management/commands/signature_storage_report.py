@@ -0,0 +1,69 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from registry.models import RegistryEntry
+from registry.signatures import decode_strokes, encode_signature
+
+
+def _json_size(value):
+    return len(json.dumps(value, separators=(",", ":")).encode())
+
+
+def _as_point_json(strokes):
+    # What the same strokes cost as the old {"x": .., "y": ..} JSON
+    return [{"points": [{"x": x, "y": y} for x, y in stroke.tolist()]} for stroke in strokes]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the size of signatures stored as JSON with the packed "
+        "signature_blob format, for rows already packed and rows still in JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        rows = (
+            RegistryEntry.objects
+            .filter(Q(signature_data__isnull=False) | Q(signature_blob__isnull=False))
+            .values_list('signature_data', 'signature_blob')
+            .iterator(chunk_size=chunk_size)
+        )
+
+        packed = {"rows": 0, "points": 0, "blob": 0, "json": 0}
+        unpacked = {"rows": 0, "points": 0, "json": 0, "blob": 0, "unpackable": 0}
+        for data, blob in rows:
+            if blob:
+                strokes = decode_strokes(blob)
+                packed["rows"] += 1
+                packed["points"] += sum(len(stroke) for stroke in strokes)
+                packed["blob"] += len(blob)
+                packed["json"] += _json_size(_as_point_json(strokes))
+            elif data:
+                unpacked["rows"] += 1
+                unpacked["json"] += _json_size(data)
+                try:
+                    would_be = encode_signature(data)
+                except ValueError:
+                    would_be = None
+                if would_be is None:
+                    unpacked["unpackable"] += 1
+                else:
+                    unpacked["blob"] += len(would_be)
+                    unpacked["points"] += sum(len(stroke) for stroke in decode_strokes(would_be))
+
+        def line(label, rows, points, json_bytes, blob_bytes):
+            ratio = json_bytes / blob_bytes if blob_bytes else 0
+            self.stdout.write(
+                f"{label:<26}{rows:>8}{points:>10}{json_bytes:>14,}{blob_bytes:>12,}{ratio:>9.1f}x"
+            )
+
+        self.stdout.write(f"{'':<26}{'rows':>8}{'points':>10}{'JSON bytes':>14}{'packed':>12}{'ratio':>10}")
+        line("packed (as point JSON)", packed["rows"], packed["points"], packed["json"], packed["blob"])
+        line("still JSON (if packed)", unpacked["rows"], unpacked["points"], unpacked["json"], unpacked["blob"])
+        if unpacked["unpackable"]:
+            self.stdout.write(f"{unpacked['unpackable']} JSON row(s) could not be packed and stay as JSON")
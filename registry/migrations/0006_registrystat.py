@@ -0,0 +1,70 @@
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+# The dashboard dimensions as they were when RegistryStat was added;
+# registry.stats keeps the live copies
+GROUPED_DIMENSIONS = (
+    ('gender_counts', 'gender'),
+    ('grant_counts', 'social_grant'),
+    ('tish_counts', 'tish_area'),
+    ('race_counts', 'race'),
+    ('ward_counts', 'ward_no'),
+)
+BOOLEAN_DIMENSIONS = (
+    ('disability_counts', 'disability'),
+    ('recovering_counts', 'recovering_service_user'),
+    ('cooperative_counts', 'cooperative_member'),
+)
+PRESENCE_DIMENSIONS = (
+    ('contact_counts', 'contact_number', 'Has Contact', 'No Contact'),
+    ('signature_counts', 'signature_image', 'Signed', 'Not Signed'),
+    ('address_counts', 'physical_address', 'Has Address', 'No Address'),
+)
+
+
+def populate_stats(apps, schema_editor):
+    RegistryEntry = apps.get_model('registry', 'RegistryEntry')
+    RegistryStat = apps.get_model('registry', 'RegistryStat')
+    entries = RegistryEntry.objects.order_by()
+
+    counts = {('total_participants', ''): entries.count()}
+    for key, field in GROUPED_DIMENSIONS:
+        for value, count in entries.values_list(field).annotate(count=Count('id')):
+            if value not in (None, ''):
+                counts[key, value] = count
+    for key, field in BOOLEAN_DIMENSIONS:
+        counts[key, 'Yes'] = entries.filter(**{field: True}).count()
+        counts[key, 'No'] = entries.filter(**{field: False}).count()
+    for key, field, filled, blank in PRESENCE_DIMENSIONS:
+        empty = Q(**{f'{field}__isnull': True}) | Q(**{field: ''})
+        counts[key, filled] = entries.exclude(empty).count()
+        counts[key, blank] = entries.filter(empty).count()
+
+    RegistryStat.objects.all().delete()
+    RegistryStat.objects.bulk_create(
+        RegistryStat(dimension=dimension, value=value, count=count)
+        for (dimension, value), count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registry', '0005_registryentry_signature_data_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistryStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=50)),
+                ('value', models.CharField(blank=True, default='', max_length=255)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'value'), name='registry_stat_dimension_value')],
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
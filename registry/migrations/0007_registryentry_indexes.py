@@ -0,0 +1,47 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registry', '0006_registrystat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registryentry',
+            index=models.Index(fields=['tish_area', 'gender', 'surname'], name='registry_tish_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registryentry',
+            index=models.Index(fields=['gender', 'social_grant', 'surname'], name='registry_gender_grant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registryentry',
+            index=models.Index(fields=['social_grant'], name='registry_grant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registryentry',
+            index=models.Index(fields=['ward_no'], name='registry_ward_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registryentry',
+            index=models.Index(fields=['created_at'], name='registry_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registryentry',
+            index=models.Index(fields=['surname', 'id'], name='registry_surname_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registryentry',
+            index=models.Index(condition=models.Q(('disability', True)), fields=['created_at'], name='registry_disability_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registryentry',
+            index=models.Index(condition=models.Q(('recovering_service_user', True)), fields=['created_at'], name='registry_recovering_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registryentry',
+            index=models.Index(condition=models.Q(('cooperative_member', True)), fields=['created_at'], name='registry_cooperative_idx'),
+        ),
+    ]
@@ -0,0 +1,98 @@
+from django.db import OperationalError, migrations
+
+# The search structures as first created; registry.search keeps the live
+# copies (and restores the triggers after migrate, see ensure_search_index)
+ENTRY_TABLE = 'registry_registryentry'
+FTS_TABLE = 'registry_registryentry_fts'
+PG_DOCUMENT = (
+    "to_tsvector('simple', coalesce(names, '') || ' ' || coalesce(surname, '') "
+    "|| ' ' || coalesce(id_no_or_dob, ''))"
+)
+
+SQLITE_TABLE = f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    names, surname, id_no_or_dob,
+    content='{ENTRY_TABLE}', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+)"""
+
+# Also run by 0012 and 0014, whose table rebuilds drop them
+SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, names, surname, id_no_or_dob)
+        VALUES (new.id, new.names, new.surname, new.id_no_or_dob);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, names, surname, id_no_or_dob)
+        VALUES ('delete', old.id, old.names, old.surname, old.id_no_or_dob);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF names, surname, id_no_or_dob ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, names, surname, id_no_or_dob)
+        VALUES ('delete', old.id, old.names, old.surname, old.id_no_or_dob);
+        INSERT INTO {FTS_TABLE}(rowid, names, surname, id_no_or_dob)
+        VALUES (new.id, new.names, new.surname, new.id_no_or_dob);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRES_SCHEMA = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS registry_search_tsv_idx ON {ENTRY_TABLE} USING gin ({PG_DOCUMENT})",
+    f"CREATE INDEX IF NOT EXISTS registry_id_no_trgm_idx ON {ENTRY_TABLE} USING gin (id_no_or_dob gin_trgm_ops)",
+]
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS registry_search_tsv_idx",
+    "DROP INDEX IF EXISTS registry_id_no_trgm_idx",
+]
+
+
+def _execute(connection, statements):
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def create_sqlite_triggers(connection):
+    """(Re)create the FTS triggers and reindex, if the FTS table exists."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        exists = cursor.fetchone() is not None
+    if exists:
+        _execute(connection, SQLITE_TRIGGERS)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        try:
+            _execute(connection, [SQLITE_TABLE])
+        except OperationalError:
+            # SQLite built without FTS5: search keeps using icontains
+            return
+        create_sqlite_triggers(connection)
+    elif connection.vendor == 'postgresql':
+        _execute(connection, POSTGRES_SCHEMA)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    statements = {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP}.get(connection.vendor, [])
+    _execute(connection, statements)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registry', '0007_registryentry_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+def create_version_row(apps, schema_editor):
+    RegistryVersion = apps.get_model('registry', 'RegistryVersion')
+    RegistryVersion.objects.get_or_create(pk=1, defaults={'counter': 0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registry', '0009_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistryVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counter', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version_row, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,172 @@
+import base64
+import json
+import re
+import struct
+import zlib
+from xml.etree import ElementTree
+
+import numpy as np
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+# Version 1 of the packed signature format, and the signature_data shapes
+# it was packed from, as registry.signatures defined them here. Layout: a
+# 6-byte header (magic b"SG", version, quantisation steps per pixel,
+# stroke count), then zlib of the uint32 stroke lengths and the int16
+# per-stroke point deltas.
+BLOB_MAGIC = b'SG'
+BLOB_VERSION = 1
+HEADER = struct.Struct('<2sBBH')
+QUANTISATION_STEPS = (4, 2, 1)
+INT16 = np.iinfo(np.int16)
+NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+SVG_PATH = '{http://www.w3.org/2000/svg}path'
+
+
+def points_array(points):
+    coords = [
+        (point['x'], point['y']) if isinstance(point, dict) else (point[0], point[1])
+        for point in points
+        if (isinstance(point, dict) and 'x' in point and 'y' in point)
+        or (isinstance(point, (list, tuple)) and len(point) >= 2)
+    ]
+    return np.asarray(coords, dtype=float).reshape(-1, 2)
+
+
+def svg_strokes(data_url):
+    _, _, encoded = data_url.partition(';base64,')
+    root = ElementTree.fromstring(base64.b64decode(encoded))
+    strokes = []
+    for path in root.iter(SVG_PATH):
+        for subpath in re.split(r'[Mm]', path.get('d', '')):
+            numbers = NUMBER.findall(subpath)
+            if len(numbers) >= 2:
+                strokes.append(np.asarray(numbers[:len(numbers) // 2 * 2], dtype=float).reshape(-1, 2))
+    return strokes
+
+
+def parse_strokes(data):
+    """signature_data as a list of (n, 2) arrays; [] if unrecognised."""
+    if isinstance(data, str):
+        if data.startswith('data:image/svg+xml'):
+            try:
+                return svg_strokes(data)
+            except (ValueError, ElementTree.ParseError):
+                return []
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return []
+    if not data or not isinstance(data, list):
+        return []
+    first = data[0]
+    try:
+        if isinstance(first, dict) and 'points' in first:
+            strokes = [points_array(stroke.get('points') or []) for stroke in data if isinstance(stroke, dict)]
+        elif isinstance(first, list) and first and isinstance(first[0], (dict, list, tuple)):
+            strokes = [points_array(stroke) for stroke in data if isinstance(stroke, list)]
+        else:
+            strokes = [points_array(data)]
+    except (TypeError, ValueError):
+        return []
+    return [stroke for stroke in strokes if len(stroke)]
+
+
+def encode_strokes(strokes):
+    """Pack strokes; None for no strokes, ValueError if they do not fit."""
+    if not strokes:
+        return None
+    if len(strokes) > 0xFFFF:
+        raise ValueError('too many strokes to pack')
+    lengths = np.array([len(stroke) for stroke in strokes], dtype='<u4')
+    everything = np.concatenate(strokes)
+    starts = np.cumsum(lengths) - lengths
+    for steps in QUANTISATION_STEPS:
+        fixed = np.rint(everything * steps)
+        deltas = np.diff(fixed, axis=0, prepend=0)
+        deltas[starts] = fixed[starts]
+        if deltas.min() >= INT16.min and deltas.max() <= INT16.max:
+            break
+    else:
+        raise ValueError('signature coordinates too large to pack')
+    payload = lengths.tobytes() + deltas.astype('<i2').tobytes()
+    return HEADER.pack(BLOB_MAGIC, BLOB_VERSION, steps, len(strokes)) + zlib.compress(payload)
+
+
+def decode_strokes(blob):
+    blob = bytes(blob)
+    magic, version, steps, count = HEADER.unpack_from(blob)
+    if magic != BLOB_MAGIC or version != BLOB_VERSION:
+        raise ValueError('not a packed signature')
+    payload = zlib.decompress(blob[HEADER.size:])
+    lengths = np.frombuffer(payload, dtype='<u4', count=count)
+    deltas = np.frombuffer(payload, dtype='<i2', offset=4 * count).reshape(-1, 2).astype(float)
+    ends = np.cumsum(lengths)
+    totals = np.cumsum(deltas, axis=0)
+    before = np.vstack([np.zeros((1, 2)), totals[ends[:-1] - 1]])
+    points = (totals - np.repeat(before, lengths, axis=0)) / steps
+    return np.split(points, ends[:-1])
+
+
+def pack_signatures(apps, schema_editor):
+    RegistryEntry = apps.get_model('registry', 'RegistryEntry')
+    pending = (
+        RegistryEntry.objects.filter(signature_data__isnull=False)
+        .only('id', 'signature_data', 'signature_blob')
+        .order_by('id')
+    )
+    batch = []
+    for entry in pending.iterator(chunk_size=BATCH_SIZE):
+        if not entry.signature_data:
+            # The form posted "" when nothing was drawn
+            entry.signature_data = None
+        else:
+            try:
+                blob = encode_strokes(parse_strokes(entry.signature_data))
+            except ValueError:
+                blob = None
+            if blob is None:
+                # Left as JSON; the renderer still reads it
+                continue
+            entry.signature_blob = blob
+            entry.signature_data = None
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            RegistryEntry.objects.bulk_update(batch, ['signature_data', 'signature_blob'])
+            batch = []
+    if batch:
+        RegistryEntry.objects.bulk_update(batch, ['signature_data', 'signature_blob'])
+
+
+def unpack_signatures(apps, schema_editor):
+    RegistryEntry = apps.get_model('registry', 'RegistryEntry')
+    packed = RegistryEntry.objects.filter(signature_blob__isnull=False).only('id', 'signature_blob').order_by('id')
+    batch = []
+    for entry in packed.iterator(chunk_size=BATCH_SIZE):
+        entry.signature_data = [
+            {'points': [{'x': x, 'y': y} for x, y in stroke.tolist()]}
+            for stroke in decode_strokes(entry.signature_blob)
+        ]
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            RegistryEntry.objects.bulk_update(batch, ['signature_data'])
+            batch = []
+    if batch:
+        RegistryEntry.objects.bulk_update(batch, ['signature_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registry', '0010_registryversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registryentry',
+            name='signature_blob',
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(pack_signatures, unpack_signatures),
+    ]
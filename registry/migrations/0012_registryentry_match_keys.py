@@ -0,0 +1,103 @@
+import re
+from importlib import import_module
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+# registry.duplicates' blocking keys as they were defined here; the live
+# code keeps its own copy
+MIN_ID_LENGTH = 6
+SOUNDEX_CODES = {
+    **dict.fromkeys('BFPV', '1'), **dict.fromkeys('CGJKQSXZ', '2'),
+    **dict.fromkeys('DT', '3'), 'L': '4', **dict.fromkeys('MN', '5'), 'R': '6',
+}
+
+
+def normalize_id(value):
+    key = re.sub(r'[^0-9A-Z]', '', str(value or '').upper())
+    return key if len(key) >= MIN_ID_LENGTH else ''
+
+
+def soundex(value):
+    """American Soundex of the first word of value ("" if it has no letters)."""
+    words = re.sub(r'[^a-z ]', ' ', str(value or '').lower()).split()
+    letters = re.sub(r'[^A-Z]', '', (words or [''])[0].upper())
+    if not letters:
+        return ''
+    code, last = letters[0], SOUNDEX_CODES.get(letters[0], '')
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter, '')
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        # H and W do not separate letters with the same code; vowels do
+        if letter not in 'HW':
+            last = digit
+    return code.ljust(4, '0')
+
+
+def fill_match_keys(apps, schema_editor):
+    RegistryEntry = apps.get_model('registry', 'RegistryEntry')
+    entries = RegistryEntry.objects.only('id', 'names', 'surname', 'id_no_or_dob').order_by('id')
+    fields = ['id_key', 'surname_key', 'names_key']
+    batch = []
+    for entry in entries.iterator(chunk_size=BATCH_SIZE):
+        entry.id_key = normalize_id(entry.id_no_or_dob)
+        entry.surname_key = soundex(entry.surname)
+        entry.names_key = soundex(entry.names)
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            RegistryEntry.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        RegistryEntry.objects.bulk_update(batch, fields)
+
+
+def recreate_search_index(apps, schema_editor):
+    # Adding NOT NULL columns makes SQLite rebuild the table, which drops
+    # the FTS triggers from 0008; put them back and reindex
+    if schema_editor.connection.vendor == 'sqlite':
+        search_index = import_module('registry.migrations.0008_registryentry_search_index')
+        search_index.create_sqlite_triggers(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registry', '0011_registryentry_signature_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registryentry',
+            name='id_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='registryentry',
+            name='surname_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=4),
+        ),
+        migrations.AddField(
+            model_name='registryentry',
+            name='names_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=4),
+        ),
+        migrations.AddField(
+            model_name='registryentry',
+            name='possible_duplicate',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(fill_match_keys, migrations.RunPython.noop),
+        migrations.RunPython(recreate_search_index, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='registryentry',
+            index=models.Index(fields=['id_key'], name='registry_id_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registryentry',
+            index=models.Index(fields=['surname_key', 'names_key'], name='registry_name_keys_idx'),
+        ),
+    ]
@@ -0,0 +1,90 @@
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+# The dashboard dimensions as they were when the daily rollups were
+# added; registry.stats keeps the live copies
+GROUPED_DIMENSIONS = (
+    ('gender_counts', 'gender'),
+    ('grant_counts', 'social_grant'),
+    ('tish_counts', 'tish_area'),
+    ('race_counts', 'race'),
+    ('ward_counts', 'ward_no'),
+)
+BOOLEAN_DIMENSIONS = (
+    ('disability_counts', 'disability'),
+    ('recovering_counts', 'recovering_service_user'),
+    ('cooperative_counts', 'cooperative_member'),
+)
+PRESENCE_DIMENSIONS = (
+    ('contact_counts', 'contact_number', 'Has Contact', 'No Contact'),
+    ('signature_counts', 'signature_image', 'Signed', 'Not Signed'),
+    ('address_counts', 'physical_address', 'Has Address', 'No Address'),
+)
+
+
+def populate_daily_stats(apps, schema_editor):
+    RegistryEntry = apps.get_model('registry', 'RegistryEntry')
+    RegistryDailyStat = apps.get_model('registry', 'RegistryDailyStat')
+    entries = RegistryEntry.objects.order_by().annotate(day=TruncDate('created_at'))
+
+    # One conditional count per (dimension, label), grouped by day
+    aggregates = {'total_participants': Count('id')}
+    labels = {}
+
+    def add(key, label, condition):
+        alias = f'c{len(labels)}'
+        aggregates[alias] = Count('id', filter=condition)
+        labels[alias] = (key, label)
+
+    for key, field in BOOLEAN_DIMENSIONS:
+        add(key, 'Yes', Q(**{field: True}))
+        add(key, 'No', Q(**{field: False}))
+    for key, field, filled, blank in PRESENCE_DIMENSIONS:
+        empty = Q(**{f'{field}__isnull': True}) | Q(**{field: ''})
+        add(key, filled, ~empty)
+        add(key, blank, empty)
+
+    counts = Counter()
+    for totals in entries.values('day').annotate(**aggregates):
+        counts[totals['day'], 'total_participants', ''] += totals['total_participants']
+        for alias, (key, label) in labels.items():
+            counts[totals['day'], key, label] += totals[alias]
+    # Blank choices are counted under ""
+    for key, field in GROUPED_DIMENSIONS:
+        for day, value, count in entries.values_list('day', field).annotate(count=Count('id')):
+            counts[day, key, value or ''] += count
+
+    RegistryDailyStat.objects.all().delete()
+    RegistryDailyStat.objects.bulk_create(
+        (RegistryDailyStat(day=day, dimension=dimension, value=value, count=count)
+         for (day, dimension, value), count in (+counts).items()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registry', '0012_registryentry_match_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistryDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('dimension', models.CharField(max_length=50)),
+                ('value', models.CharField(blank=True, default='', max_length=255)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'dimension', 'value'), name='registry_daily_stat_key')],
+                'indexes': [models.Index(fields=['dimension', 'day'], name='registry_daily_dim_day_idx')],
+            },
+        ),
+        migrations.RunPython(populate_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+from importlib import import_module
+
+from django.db import migrations, models
+
+
+def recreate_search_index(apps, schema_editor):
+    # A unique column makes SQLite rebuild the table, which drops the FTS
+    # triggers from 0008; put them back and reindex
+    if schema_editor.connection.vendor == 'sqlite':
+        search_index = import_module('registry.migrations.0008_registryentry_search_index')
+        search_index.create_sqlite_triggers(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registry', '0013_registrydailystat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registryentry',
+            name='client_uuid',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(recreate_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registry', '0014_registryentry_client_uuid'),
+    ]
+
+    operations = [
+        # State only: the FTS table itself is created by 0008
+        migrations.CreateModel(
+            name='RegistryEntrySearch',
+            fields=[
+                ('entry', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='registry.registryentry')),
+                ('query', models.TextField(db_column='registry_registryentry_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'registry_registryentry_fts',
+                'managed': False,
+            },
+        ),
+    ]
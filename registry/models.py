@@ -1,4 +1,33 @@
+import uuid
+
 from django.db import models
+from django.db.models.functions import Substr
+
+# Signature payloads: only the form and the thumbnail/render code read them
+HEAVY_FIELDS = ('signature_data', 'signature_blob')
+
+# What registry_list.html and the admin changelist show. The address is
+# replaced by a short physical_address_preview annotation.
+LISTING_FIELDS = (
+    'id', 'names', 'surname', 'id_no_or_dob', 'gender', 'race', 'tish_area',
+    'ward_no', 'contact_number', 'social_grant', 'disability',
+    'recovering_service_user', 'cooperative_member', 'signature_image',
+    'possible_duplicate',
+)
+ADDRESS_PREVIEW_LENGTH = 80
+
+
+class RegistryEntryQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Only the columns the list pages render."""
+        return self.only(*LISTING_FIELDS).annotate(
+            physical_address_preview=Substr('physical_address', 1, ADDRESS_PREVIEW_LENGTH)
+        )
+
+    def for_export(self):
+        """Every column the PDF and CSV exporters write; no signature payloads."""
+        return self.defer(*HEAVY_FIELDS)
+
 
 class RegistryEntry(models.Model):
     GENDER_CHOICES = [
@@ -58,6 +87,163 @@ class RegistryEntry(models.Model):
     except ImportError:
         from django.contrib.postgres.fields import JSONField
     signature_data = JSONField(blank=True, null=True)
+    # Packed strokes (registry.signatures.encode_strokes); registry.signals
+    # moves signature_data in here on save and clears the JSON
+    signature_blob = models.BinaryField(blank=True, null=True, editable=False)
+
+    # Blocking keys for registry.duplicates, set by registry.signals
+    id_key = models.CharField(max_length=50, blank=True, default='', editable=False)
+    surname_key = models.CharField(max_length=4, blank=True, default='', editable=False)
+    names_key = models.CharField(max_length=4, blank=True, default='', editable=False)
+    # Set when the entry was created looking like someone already registered
+    possible_duplicate = models.BooleanField(default=False, editable=False)
+    # Generated by field devices (registry.batch) so a batch sent twice is stored once
+    client_uuid = models.UUIDField(blank=True, null=True, unique=True, editable=False)
+
+    objects = RegistryEntryQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # registry_list / registry_export / admin list_filter
+            models.Index(fields=['tish_area', 'gender', 'surname'], name='registry_tish_gender_idx'),
+            models.Index(fields=['gender', 'social_grant', 'surname'], name='registry_gender_grant_idx'),
+            models.Index(fields=['social_grant'], name='registry_grant_idx'),
+            models.Index(fields=['ward_no'], name='registry_ward_idx'),
+            # Period reports and exports filter on created_at
+            models.Index(fields=['created_at'], name='registry_created_idx'),
+            # registry_list ordering and keyset pagination
+            models.Index(fields=['surname', 'id'], name='registry_surname_id_idx'),
+            # The flags are mostly False; only index the rows that are set
+            models.Index(fields=['created_at'], condition=models.Q(disability=True), name='registry_disability_idx'),
+            models.Index(fields=['created_at'], condition=models.Q(recovering_service_user=True), name='registry_recovering_idx'),
+            models.Index(fields=['created_at'], condition=models.Q(cooperative_member=True), name='registry_cooperative_idx'),
+            # Duplicate candidate lookups (registry.duplicates)
+            models.Index(fields=['id_key'], name='registry_id_key_idx'),
+            models.Index(fields=['surname_key', 'names_key'], name='registry_name_keys_idx'),
+        ]
 
     def __str__(self):
         return f"{self.names} {self.surname}"
+
+    def signature_strokes(self):
+        """The signature as a list of (n, 2) point arrays, packed or not."""
+        from .signatures import parse_strokes
+        if self.signature_blob:
+            return parse_strokes(self.signature_blob)
+        return parse_strokes(self.signature_data)
+
+    @property
+    def signature_thumbnail_url(self):
+        """URL of the small signature derivative, or None until it is made."""
+        from .thumbnails import thumbnail_url
+        return thumbnail_url(self.signature_image.name)
+
+
+class RegistryEntrySearch(models.Model):
+    """
+    Read-only view of the SQLite FTS5 table registry.search keeps (not
+    created by Django; absent on other databases). Lets rank_entries join
+    it through entry__search to order matches by bm25 rank.
+    """
+    entry = models.OneToOneField(
+        RegistryEntry, primary_key=True, db_column='rowid', db_constraint=False,
+        on_delete=models.DO_NOTHING, related_name='search',
+    )
+    # FTS5's hidden column named after the table: "= query" is a MATCH
+    query = models.TextField(db_column='registry_registryentry_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'registry_registryentry_fts'
+
+
+class RegistryStat(models.Model):
+    """
+    Materialized dashboard count: how many entries fall under one
+    value of one dashboard dimension (e.g. gender_counts / Female).
+    Kept current by registry.signals and rebuilt by the
+    rebuild_registry_stats management command.
+    """
+    dimension = models.CharField(max_length=50)
+    value = models.CharField(max_length=255, blank=True, default='')
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'value'], name='registry_stat_dimension_value'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}: {self.value} = {self.count}"
+
+
+
+class RegistryDailyStat(models.Model):
+    """
+    Per-day version of RegistryStat: how many entries created on day fall
+    under one value of one dimension. Blank values are counted too (as
+    ""), so a period's breakdown adds up to its total. Kept current by
+    registry.signals; the period reports and the trend endpoint sum these
+    rows instead of scanning the registry.
+    """
+    day = models.DateField()
+    dimension = models.CharField(max_length=50)
+    value = models.CharField(max_length=255, blank=True, default='')
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'dimension', 'value'], name='registry_daily_stat_key'),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'day'], name='registry_daily_dim_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.dimension}: {self.value} = {self.count}"
+
+
+class RegistryVersion(models.Model):
+    """
+    Single-row write counter for the registry, bumped by registry.signals
+    on every save and delete. Cached reports are keyed on it.
+    """
+    counter = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"registry version {self.counter}"
+
+class ReportJob(models.Model):
+    """
+    A PDF render queued by pdf_preview, registry_export or the admin
+    export action and run by registry.jobs in a worker process.
+    """
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    # Report cache key (kind + params + registry version); see report_cache
+    params_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    result = models.FileField(upload_to='reports/', blank=True, null=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['params_hash', 'status'], name='registry_job_hash_idx'),
+            models.Index(fields=['status', 'created_at'], name='registry_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} ({self.status})"
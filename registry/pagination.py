@@ -0,0 +1,105 @@
+# registry/pagination.py
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+# Stable order shared by both modes; keyset seeks rely on it
+LIST_ORDERING = ("surname", "id")
+
+
+def get_page_size(request):
+    """
+    Read ?page_size= from the request, falling back to REGISTRY_PAGE_SIZE
+    and never exceeding REGISTRY_MAX_PAGE_SIZE.
+    """
+    default = getattr(settings, "REGISTRY_PAGE_SIZE", 50)
+    limit = getattr(settings, "REGISTRY_MAX_PAGE_SIZE", 500)
+    try:
+        size = int(request.GET.get("page_size", default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, limit))
+
+
+class KeysetPage:
+    """
+    One page of a seek-paginated queryset. Instead of OFFSET it filters
+    on (surname, id) relative to a cursor row, so a deep page costs the
+    same as the first one. The cursor is just the id of the boundary row.
+    """
+    keyset = True
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def next_cursor(self):
+        return self.object_list[-1].pk if self.object_list else None
+
+    def previous_cursor(self):
+        return self.object_list[0].pk if self.object_list else None
+
+
+def _seek(queryset, cursor_id, forward):
+    surname = queryset.model.objects.filter(pk=cursor_id).values_list("surname", flat=True).first()
+    if surname is None:
+        return queryset
+    if forward:
+        return queryset.filter(Q(surname__gt=surname) | Q(surname=surname, id__gt=cursor_id))
+    return queryset.filter(Q(surname__lt=surname) | Q(surname=surname, id__lt=cursor_id))
+
+
+def keyset_page(queryset, page_size, after=None, before=None):
+    """Return the KeysetPage after (or before) the given cursor id."""
+    if before:
+        rows = list(_seek(queryset, before, forward=False).order_by("-surname", "-id")[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        return KeysetPage(rows, has_next=True, has_previous=has_more)
+
+    if after:
+        queryset = _seek(queryset, after, forward=True)
+    rows = list(queryset.order_by(*LIST_ORDERING)[:page_size + 1])
+    return KeysetPage(rows[:page_size], has_next=len(rows) > page_size, has_previous=bool(after))
+
+
+def paginate_entries(request, queryset, ordering=LIST_ORDERING):
+    """
+    Paginate the registry list. Returns (page, page_range); page_range is
+    None in keyset mode (?after=<id>, ?before=<id> or ?mode=keyset),
+    which always seeks in LIST_ORDERING. Numbered pages use ordering, or
+    the queryset's own order when ordering is None.
+    """
+    page_size = get_page_size(request)
+    after = request.GET.get("after", "")
+    before = request.GET.get("before", "")
+
+    if after.isdigit() or before.isdigit() or request.GET.get("mode") == "keyset":
+        page = keyset_page(
+            queryset, page_size,
+            after=int(after) if after.isdigit() else None,
+            before=int(before) if before.isdigit() else None,
+        )
+        return page, None
+
+    if ordering is not None:
+        queryset = queryset.order_by(*ordering)
+    paginator = Paginator(queryset, page_size)
+    page = paginator.get_page(request.GET.get("page"))
+    return page, paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1)
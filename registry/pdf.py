@@ -0,0 +1,165 @@
+# registry/pdf.py
+"""
+Multi-page ReportLab register built from platypus flowables.
+
+Rows are streamed from the database and laid out one page at a time:
+every row has a fixed height (long text is cut to fit its column), so
+the number of rows per page, and therefore the page count used in the
+"Page X of Y" footer, is known before anything is drawn. Each page's
+table is drawn straight onto the canvas and then dropped, so no more
+than one page of rows and flowables exists at a time. The canvas itself
+keeps every finished page's content (about 24 KB a page) until it
+writes the file, so peak memory still grows with the page count: under
+tracemalloc, 14 MB for 10,000 rows (358 pages) and 135 MB for 100,000
+(3,572 pages).
+"""
+import math
+
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import mm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Flowable, Image, Table, TableStyle
+
+from .exports import queryset_rows, yes_no
+from .thumbnails import thumbnail_path
+
+PAGE_SIZE = landscape(A4)
+MARGIN = 10 * mm
+HEADER_SPACE = 18 * mm
+FOOTER_SPACE = 10 * mm
+ROW_HEIGHT = 5.5 * mm
+HEADER_ROW_HEIGHT = 7 * mm
+FONT, FONT_BOLD, FONT_SIZE = "Helvetica", "Helvetica-Bold", 7
+CELL_PADDING = 2
+SIGN_WIDTH = 15 * mm
+
+
+def signature_cell(name):
+    """The signature's thumbnail scaled into its cell, or a text marker."""
+    path = thumbnail_path(name)
+    if path is None:
+        return "Signed" if name else "Not signed"
+    return Image(path, width=SIGN_WIDTH - 2 * CELL_PADDING, height=ROW_HEIGHT - 2, kind="proportional")
+
+
+# (header, width, field, formatter) in register order
+COLUMNS = [
+    ("No.", 10 * mm, None, None),
+    ("Names", 25 * mm, "names", None),
+    ("Surname", 25 * mm, "surname", None),
+    ("ID No./DoB", 25 * mm, "id_no_or_dob", None),
+    ("Gender", 14 * mm, "gender", None),
+    ("Disability", 14 * mm, "disability", yes_no),
+    ("Address", 30 * mm, "physical_address", None),
+    ("TISH Area", 22 * mm, "tish_area", None),
+    ("Ward", 11 * mm, "ward_no", None),
+    ("Contact", 20 * mm, "contact_number", None),
+    ("Race", 14 * mm, "race", None),
+    ("Recovering", 15 * mm, "recovering_service_user", yes_no),
+    ("Grant", 22 * mm, "social_grant", None),
+    ("Cooperative", 15 * mm, "cooperative_member", yes_no),
+    ("Sign", SIGN_WIDTH, "signature_image", signature_cell),
+]
+
+TABLE_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, 0), FONT_BOLD),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#1f2937")),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 1), (-1, -1), FONT),
+    ('FONTSIZE', (0, 0), (-1, -1), FONT_SIZE),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('LEFTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+    ('RIGHTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+    ('TOPPADDING', (0, 0), (-1, -1), 1),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor("#f3f4f6")]),
+])
+
+
+def _frame_height():
+    return PAGE_SIZE[1] - 2 * MARGIN - HEADER_SPACE - FOOTER_SPACE
+
+
+def rows_per_page():
+    # Leave a point of slack so a full page never spills onto the next
+    return int((_frame_height() - HEADER_ROW_HEIGHT - 1) // ROW_HEIGHT)
+
+
+def fit_text(value, width, font=FONT, size=FONT_SIZE):
+    """Cut value down (with an ellipsis) so it fits on one line of width points."""
+    text = "" if value is None else " ".join(str(value).split())
+    available = width - 2 * CELL_PADDING
+    if stringWidth(text, font, size) <= available:
+        return text
+    while text and stringWidth(text + "…", font, size) > available:
+        text = text[:-1]
+    return text + "…"
+
+
+def _page_tables(rows, per_page):
+    """One Table per page of rows; an empty register still gets its header."""
+    header = [heading for heading, _, _, _ in COLUMNS]
+    widths = [width for _, width, _, _ in COLUMNS]
+    chunk, number = [], 0
+    first = True
+
+    def table(chunk):
+        return Table(
+            [header] + chunk, colWidths=widths,
+            rowHeights=[HEADER_ROW_HEIGHT] + [ROW_HEIGHT] * len(chunk),
+            style=TABLE_STYLE,
+        )
+
+    for row in rows:
+        number += 1
+        cells = [str(number)]
+        for (_, width, _, formatter), value in zip(COLUMNS[1:], row):
+            cell = formatter(value) if formatter else value
+            cells.append(cell if isinstance(cell, Flowable) else fit_text(cell, width))
+        chunk.append(cells)
+        if len(chunk) == per_page:
+            yield table(chunk)
+            chunk, first = [], False
+
+    if chunk or first:
+        yield table(chunk)
+
+
+def build_register_pdf(queryset, out, title="Registry Report"):
+    """
+    Write the register for queryset to the file-like out as a multi-page
+    landscape A4 PDF. Returns the number of pages written.
+    """
+    per_page = rows_per_page()
+    total = queryset.count()
+    total_pages = max(1, math.ceil(total / per_page))
+    generated = timezone.localtime().strftime("%Y-%m-%d %H:%M")
+    width, height = PAGE_SIZE
+    frame_width, frame_height = width - 2 * MARGIN, _frame_height()
+
+    canv = Canvas(out, pagesize=PAGE_SIZE)
+    canv.setTitle(title)
+    fields = [field for _, _, field, _ in COLUMNS[1:]]
+    # Capped at the counted total so the "of Y" footer stays true
+    rows = queryset_rows(queryset.order_by("surname", "id")[:total], fields)
+    pages = 0
+    for pages, table in enumerate(_page_tables(rows, per_page), start=1):
+        canv.setFont(FONT_BOLD, 14)
+        canv.drawString(MARGIN, height - MARGIN - 8 * mm, title)
+        canv.setFont(FONT, 8)
+        canv.drawRightString(width - MARGIN, height - MARGIN - 8 * mm, f"Generated {generated}")
+        canv.drawRightString(width - MARGIN, MARGIN, f"Page {pages} of {total_pages}")
+        # Top of the frame, centred across it
+        table_width, table_height = table.wrapOn(canv, frame_width, frame_height)
+        table.drawOn(
+            canv, MARGIN + (frame_width - table_width) / 2,
+            MARGIN + FOOTER_SPACE + frame_height - table_height,
+        )
+        canv.showPage()
+    canv.save()
+    return pages
@@ -0,0 +1,210 @@
+# registry/profiling.py
+"""
+Opt-in request profiling (REGISTRY_PROFILING).
+
+ProfilingMiddleware appends one JSON line per request to
+REGISTRY_PROFILE_LOG with the view (and the admin action, if any), wall
+time, number and total time of SQL queries, response size and peak
+Python memory. A streamed response is measured until its last chunk is
+sent, including the queries run while streaming. Queries slower than
+REGISTRY_SLOW_QUERY_MS are logged to the "registry.slow_queries" logger
+with their SQL and the line of project code that ran them, and kept in
+the request's line. The perfreport command summarizes the log.
+
+The middleware is sync and async capable, so under ASGI the async views
+(dashboard_events) run as they would unprofiled. Their streamed bodies
+are not followed: the line is written when the response starts.
+
+Peak memory comes from tracemalloc, which slows Python down noticeably
+(REGISTRY_PROFILE_MEMORY = False leaves it off). Its peak is process
+wide, counting every thread's allocations, so peak_kb is only recorded
+for a request that had the process to itself from start to finish; it
+is null in the line of any request that overlapped another.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+import tracemalloc
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import StreamingHttpResponse
+
+logger = logging.getLogger("registry.slow_queries")
+
+# SQL kept per slow query in the profile log
+SQL_PREVIEW_LENGTH = 500
+
+_log_lock = threading.Lock()
+
+# Requests being profiled right now, and how many have started in all;
+# a request's memory peak counts only if nothing else ran alongside it
+_flight_lock = threading.Lock()
+_in_flight = 0
+_started = 0
+
+
+def profile_log_path():
+    return str(getattr(settings, "REGISTRY_PROFILE_LOG", os.path.join(settings.BASE_DIR, "perf.log")))
+
+
+def _origin():
+    """file:line (function) of the innermost project frame outside this module."""
+    base = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        filename = frame.filename
+        if filename.startswith(base) and "site-packages" not in filename and not filename.endswith("profiling.py"):
+            return f"{os.path.relpath(filename, base)}:{frame.lineno} ({frame.name})"
+    return "?"
+
+
+class QueryRecorder:
+    """A connection.execute_wrapper that times every query."""
+
+    def __init__(self, slow_seconds):
+        self.slow_seconds = slow_seconds
+        self.count = 0
+        self.seconds = 0.0
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if elapsed >= self.slow_seconds:
+                origin = _origin()
+                logger.warning("Slow query (%.0f ms) from %s: %s", elapsed * 1000, origin, sql)
+                self.slow.append({
+                    "ms": round(elapsed * 1000, 1),
+                    "origin": origin,
+                    "sql": sql[:SQL_PREVIEW_LENGTH],
+                })
+
+
+class _RequestProfile:
+    """What one request's line is measured with, from start to finish."""
+
+    def __init__(self, slow_seconds, memory):
+        global _in_flight, _started
+        self.recorder = QueryRecorder(slow_seconds)
+        self.stack = ExitStack()
+        for connection in connections.all():
+            self.stack.enter_context(connection.execute_wrapper(self.recorder))
+        with _flight_lock:
+            _in_flight += 1
+            _started += 1
+            self.sequence = _started
+            self.alone = _in_flight == 1
+        self.baseline = None
+        if memory and self.alone:
+            tracemalloc.reset_peak()
+            self.baseline = tracemalloc.get_traced_memory()[0]
+        self.started = time.perf_counter()
+
+    def close(self):
+        """Stop measuring; returns (seconds, peak_kb or None)."""
+        global _in_flight
+        seconds = time.perf_counter() - self.started
+        peak_kb = None
+        if self.baseline is not None:
+            peak_kb = round((tracemalloc.get_traced_memory()[1] - self.baseline) / 1024)
+        self.stack.close()
+        with _flight_lock:
+            _in_flight -= 1
+            # Another request started after this one: the peak may be theirs
+            if _started != self.sequence:
+                peak_kb = None
+        return seconds, peak_kb
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REGISTRY_PROFILING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_seconds = getattr(settings, "REGISTRY_SLOW_QUERY_MS", 100) / 1000
+        self.memory = getattr(settings, "REGISTRY_PROFILE_MEMORY", True)
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        profile = _RequestProfile(self.slow_seconds, self.memory)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            profile.close()
+            raise
+        return self._finish(request, response, profile)
+
+    async def __acall__(self, request):
+        profile = _RequestProfile(self.slow_seconds, self.memory)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            profile.close()
+            raise
+        return self._finish(request, response, profile)
+
+    def _finish(self, request, response, profile):
+        def finish(size):
+            seconds, peak_kb = profile.close()
+            self._write(request, response, profile.recorder, seconds, size, peak_kb)
+
+        if isinstance(response, StreamingHttpResponse) and not response.is_async:
+            # Rows are still being read while the body streams
+            response.streaming_content = self._counted(response.streaming_content, finish)
+        else:
+            finish(None if response.streaming else len(response.content))
+        return response
+
+    def _counted(self, chunks, finish):
+        size = 0
+        try:
+            for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            finish(size)
+
+    def _write(self, request, response, recorder, seconds, size, peak_kb):
+        match = request.resolver_match
+        if match is None:
+            view = "<unresolved>"
+        else:
+            # Function names for the registry's own routes, whose URL names repeat
+            view = match.view_name if match.namespace else match.func.__name__
+        action = request.POST.get("action") if request.method == "POST" and view.startswith("admin:") else None
+        record = {
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "method": request.method,
+            "path": request.path,
+            "view": f"{view} [{action}]" if action else view,
+            "status": response.status_code,
+            "ms": round(seconds * 1000, 1),
+            "queries": recorder.count,
+            "sql_ms": round(recorder.seconds * 1000, 1),
+            "bytes": size,
+            "peak_kb": peak_kb,
+            "slow": recorder.slow,
+        }
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with _log_lock, open(profile_log_path(), "a", encoding="utf-8") as log:
+            log.write(line)
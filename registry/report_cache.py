@@ -0,0 +1,207 @@
+# registry/report_cache.py
+"""
+On-disk cache of rendered reports.
+
+A report's key is the sha256 of its kind, its parameters and the
+registry write counter (registry.version), so any change to the register
+gives every report a new key and stale files are simply never asked for
+again. The key doubles as the file name and the ETag. Files live in
+MEDIA_ROOT/reports/ and the least recently served ones are deleted once
+the directory grows past REGISTRY_REPORT_CACHE_MAX_BYTES.
+
+Small JSON payloads (cached_json) are also kept in process memory, so a
+poll that misses the browser's copy usually costs one version query.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from .version import registry_version
+
+CACHE_SUBDIR = "reports"
+CONTENT_TYPES = {"pdf": "application/pdf", "csv": "text/csv", "json": "application/json"}
+# Most recently served cached_json bodies kept per process
+MEMORY_ENTRIES = 64
+
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def report_key(kind, params, version=None):
+    if version is None:
+        version = registry_version()
+    payload = json.dumps([kind, params, version], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def cache_dir():
+    path = os.path.join(settings.MEDIA_ROOT, CACHE_SUBDIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cache_name(key, ext):
+    """Storage name (relative to MEDIA_ROOT) for key, as used by FileFields."""
+    return f"{CACHE_SUBDIR}/{key}.{ext}"
+
+
+def lookup(key, ext):
+    """Path of the cached file for key, or None. A hit counts as a use."""
+    path = os.path.join(cache_dir(), f"{key}.{ext}")
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def store(key, ext, write):
+    """
+    Create the cache file for key by calling write(file) on a temporary
+    file, then move it into place. Returns the file's path.
+    """
+    directory = cache_dir()
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=f".{ext}")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            write(out)
+        path = os.path.join(directory, f"{key}.{ext}")
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    evict()
+    return path
+
+
+def evict(max_bytes=None):
+    """Delete least recently used reports until the cache fits max_bytes."""
+    if max_bytes is None:
+        max_bytes = getattr(settings, "REGISTRY_REPORT_CACHE_MAX_BYTES", 500 * 1024 * 1024)
+    files = []
+    with os.scandir(cache_dir()) as entries:
+        for entry in entries:
+            if entry.is_file() and not entry.name.startswith(".tmp-"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def _headers(response, key, filename=None, disposition="attachment"):
+    response["ETag"] = f'"{key}"'
+    if filename:
+        response["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+    # Clients may keep a copy but must revalidate; the ETag makes that a 304
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def not_modified(request, key):
+    """A 304 response if the client's If-None-Match already names key."""
+    return get_conditional_response(request, etag=f'"{key}"')
+
+
+def file_response(request, key, path, filename, disposition="attachment"):
+    ext = path.rsplit(".", 1)[-1]
+    response = not_modified(request, key) or FileResponse(open(path, "rb"), content_type=CONTENT_TYPES[ext])
+    return _headers(response, key, filename, disposition)
+
+
+def cached_report(request, kind, params, ext, filename, write, disposition="attachment"):
+    """
+    Serve report kind/params from the cache, rendering it with write(file)
+    on a miss. Answers If-None-Match with 304 without touching the file.
+    """
+    key = report_key(kind, params)
+    response = not_modified(request, key)
+    if response is not None:
+        return _headers(response, key, filename, disposition)
+    path = lookup(key, ext) or store(key, ext, write)
+    return file_response(request, key, path, filename, disposition)
+
+
+def streamed_report(request, kind, params, filename, chunks, disposition="attachment"):
+    """
+    Like cached_report for CSV exports that stream: on a miss the chunks
+    are sent to the client and copied into the cache as they go; the file
+    only becomes visible once the whole export has been written.
+    """
+    key = report_key(kind, params)
+    response = not_modified(request, key)
+    if response is not None:
+        return _headers(response, key, filename, disposition)
+    path = lookup(key, "csv")
+    if path:
+        return file_response(request, key, path, filename, disposition)
+    response = StreamingHttpResponse(_tee(key, "csv", chunks), content_type=CONTENT_TYPES["csv"])
+    return _headers(response, key, filename, disposition)
+
+
+def _tee(key, ext, chunks):
+    directory = cache_dir()
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=f".{ext}")
+    complete = False
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in chunks:
+                data = chunk.encode() if isinstance(chunk, str) else chunk
+                out.write(data)
+                yield data
+        os.replace(tmp, os.path.join(directory, f"{key}.{ext}"))
+        complete = True
+    finally:
+        # Client went away or the query failed: drop the partial copy
+        if not complete:
+            os.unlink(tmp)
+    evict()
+
+
+def cached_json(request, kind, params, build):
+    """
+    JsonResponse-alike for kind/params that only calls build() when the
+    registry has changed: the body comes from process memory, then from
+    the file cache, and If-None-Match is answered with 304.
+    """
+    key = report_key(kind, params)
+    response = not_modified(request, key)
+    if response is None:
+        response = HttpResponse(_json_body(key, build), content_type=CONTENT_TYPES["json"])
+    return _headers(response, key)
+
+
+def _json_body(key, build):
+    with _memory_lock:
+        body = _memory.get(key)
+        if body is not None:
+            _memory.move_to_end(key)
+            return body
+
+    path = lookup(key, "json")
+    if path:
+        with open(path, "rb") as cached:
+            body = cached.read()
+    else:
+        body = json.dumps(build(), cls=DjangoJSONEncoder).encode()
+        store(key, "json", lambda out: out.write(body))
+
+    with _memory_lock:
+        _memory[key] = body
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+    return body
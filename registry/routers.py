@@ -0,0 +1,84 @@
+# registry/routers.py
+"""
+Read-replica routing.
+
+When settings.DATABASES has a "replica" alias, reads of registry data
+made inside read_from_replica() (or a view wrapped in replica_reads) go
+to it: the dashboard endpoints, the register list, exports, background
+report renders (and the version their cache keys are taken from) and the
+admin reports. Everything else reads from the primary, and every write
+goes there. That includes the ReportJob rows and sessions, which must
+see their own writes at once. Without a replica alias nothing changes.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+
+PRIMARY_ALIAS = "default"
+REPLICA_ALIAS = "replica"
+# Registry data a lagging copy may serve
+REPLICA_MODELS = {
+    "registry.registryentry", "registry.registrystat",
+    "registry.registrydailystat", "registry.registryversion",
+}
+
+_use_replica = ContextVar("registry_use_replica", default=False)
+
+
+def has_replica():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def read_from_replica():
+    previous = _use_replica.get()
+    _use_replica.set(True)
+    try:
+        yield
+    finally:
+        # set() rather than reset(token): a streamed body may be finished
+        # in a different context from the one it started in
+        _use_replica.set(previous)
+
+
+def _stream_from_replica(chunks):
+    with read_from_replica():
+        yield from chunks
+
+
+def replica_reads(func):
+    """
+    Run a view or admin action with its registry reads on the replica,
+    including those made while a streamed response is being sent.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with read_from_replica():
+            response = func(*args, **kwargs)
+        # File responses (cached reports) read no rows while streaming
+        if isinstance(response, StreamingHttpResponse) and not isinstance(response, FileResponse) \
+                and not response.is_async and has_replica():
+            response.streaming_content = _stream_from_replica(response.streaming_content)
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and model._meta.label_lower in REPLICA_MODELS and has_replica():
+            return REPLICA_ALIAS
+        return PRIMARY_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is migrated by replication, not by manage.py migrate
+        return db == PRIMARY_ALIAS
@@ -0,0 +1,209 @@
+# registry/search.py
+"""
+Full-text search over names, surname and ID/DOB.
+
+SQLite uses an external-content FTS5 table kept in sync by triggers;
+PostgreSQL uses a tsvector GIN index plus a pg_trgm index for substring
+ID lookups. Both are created by migration 0008, which keeps its own
+copy of the SQL below. Any other database, or a SQLite build without
+FTS5, falls back to the old icontains chain.
+
+Words match as prefixes of whole tokens. On SQLite that means part of an
+ID number is only found from its start ("8001" finds 8001015009087, but
+"5009" does not), unlike the old icontains; PostgreSQL still finds it
+anywhere through the trigram index.
+
+SQLite drops a table's triggers whenever Django rebuilds the table, as it
+does for most AddField/AlterField migrations. ensure_search_index runs
+after every migrate (RegistryConfig.ready) and puts them back.
+"""
+import re
+
+from django.db import OperationalError, connections
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+ENTRY_TABLE = "registry_registryentry"
+FTS_TABLE = "registry_registryentry_fts"
+
+# Must match the expression the PostgreSQL GIN index is built on
+PG_DOCUMENT = (
+    "to_tsvector('simple', coalesce(names, '') || ' ' || coalesce(surname, '') "
+    "|| ' ' || coalesce(id_no_or_dob, ''))"
+)
+
+SQLITE_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        names, surname, id_no_or_dob,
+        content='{ENTRY_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, names, surname, id_no_or_dob)
+        VALUES (new.id, new.names, new.surname, new.id_no_or_dob);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, names, surname, id_no_or_dob)
+        VALUES ('delete', old.id, old.names, old.surname, old.id_no_or_dob);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF names, surname, id_no_or_dob ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, names, surname, id_no_or_dob)
+        VALUES ('delete', old.id, old.names, old.surname, old.id_no_or_dob);
+        INSERT INTO {FTS_TABLE}(rowid, names, surname, id_no_or_dob)
+        VALUES (new.id, new.names, new.surname, new.id_no_or_dob);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_TRIGGERS = [f"{FTS_TABLE}_ai", f"{FTS_TABLE}_ad", f"{FTS_TABLE}_au"]
+
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRES_SCHEMA = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS registry_search_tsv_idx ON {ENTRY_TABLE} USING gin ({PG_DOCUMENT})",
+    f"CREATE INDEX IF NOT EXISTS registry_id_no_trgm_idx ON {ENTRY_TABLE} USING gin (id_no_or_dob gin_trgm_ops)",
+]
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS registry_search_tsv_idx",
+    "DROP INDEX IF EXISTS registry_id_no_trgm_idx",
+]
+
+
+def search_terms(search):
+    """Split user input into word tokens, dropping FTS syntax characters."""
+    return re.findall(r"\w+", search or "")
+
+
+def _has_fts(connection):
+    # Looked up once per connection; absent when SQLite lacks FTS5
+    if not hasattr(connection, "_registry_fts"):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+            connection._registry_fts = cursor.fetchone() is not None
+    return connection._registry_fts
+
+
+def _icontains(queryset, search):
+    return queryset.filter(
+        Q(names__icontains=search) |
+        Q(surname__icontains=search) |
+        Q(id_no_or_dob__icontains=search)
+    )
+
+
+def search_entries(queryset, search):
+    """
+    Filter queryset to entries matching every word of search as a
+    prefix of a name, surname or ID token.
+    """
+    terms = search_terms(search)
+    if not terms:
+        return queryset
+
+    connection = connections[queryset.db]
+    if connection.vendor == "sqlite" and _has_fts(connection):
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [_fts_match(terms)]
+        ))
+    if connection.vendor == "postgresql":
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT id FROM {ENTRY_TABLE} WHERE {PG_DOCUMENT} @@ to_tsquery('simple', %s) "
+            f"OR id_no_or_dob ILIKE %s", [_pg_tsquery(terms), f"%{_like_escape(search.strip())}%"]
+        ))
+    return _icontains(queryset, search)
+
+
+def rank_entries(queryset, search):
+    """
+    Order already-searched entries by relevance, best first, through a
+    search_rank annotation (lower is better). Unranked backends keep the
+    surname order.
+    """
+    terms = search_terms(search)
+    if not terms:
+        return queryset
+
+    connection = connections[queryset.db]
+    if connection.vendor == "sqlite" and _has_fts(connection):
+        # Join the FTS table once (models.RegistryEntrySearch) so bm25 is
+        # computed in the same pass as the MATCH; a correlated bm25()
+        # subquery re-runs the match per row
+        return queryset.filter(search__query=_fts_match(terms)).annotate(
+            search_rank=F("search__rank")
+        ).order_by("search_rank", "id")
+    if connection.vendor == "postgresql":
+        # ts_rank is higher-is-better; negate to share the SQLite ordering
+        rank = RawSQL(f"-ts_rank({PG_DOCUMENT}, to_tsquery('simple', %s))", [_pg_tsquery(terms)])
+        return queryset.annotate(search_rank=rank).order_by("search_rank", "id")
+    return queryset.order_by("surname", "id")
+
+
+def _fts_match(terms):
+    return " AND ".join(f'"{term}"*' for term in terms)
+
+
+def _pg_tsquery(terms):
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def _like_escape(text):
+    # Backslash is ILIKE's default escape character
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def create_search_index(connection):
+    """Create the vendor's search structures, or put back missing triggers."""
+    if connection.vendor == "sqlite":
+        try:
+            with connection.cursor() as cursor:
+                for statement in SQLITE_SCHEMA:
+                    cursor.execute(statement)
+        except OperationalError:
+            # SQLite built without FTS5: search keeps using icontains
+            pass
+    elif connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            for statement in POSTGRES_SCHEMA:
+                cursor.execute(statement)
+    if hasattr(connection, "_registry_fts"):
+        del connection._registry_fts
+
+
+def ensure_search_index(connection):
+    """
+    Recreate the SQLite FTS triggers if a table rebuild dropped them, and
+    reindex what was written meanwhile. Returns whether anything was missing.
+    """
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+        )
+        if cursor.fetchone() is None:
+            # Before migration 0008, or no FTS5
+            return False
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+            SQLITE_TRIGGERS,
+        )
+        if cursor.fetchone()[0] == len(SQLITE_TRIGGERS):
+            return False
+    create_search_index(connection)
+    return True
+
+
+def drop_search_index(connection):
+    statements = {"sqlite": SQLITE_DROP, "postgresql": POSTGRES_DROP}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    if hasattr(connection, "_registry_fts"):
+        del connection._registry_fts
@@ -0,0 +1,207 @@
+# registry/seeding.py
+"""
+Synthetic registrations for load testing (seed_registry, bench_registry).
+
+The mix roughly follows the registers collected so far. Most entries are
+African women and men from informal settlements and townships. Wards
+are skewed, so a few of them hold much of the register. About half
+receive a grant, and four in five have signed. ID numbers are valid
+13-digit South African IDs; a few entries give a date of birth instead,
+and about one in a hundred re-registers someone already entered, with a
+typo. Signatures are generated pen captures of a few hundred points per
+stroke, about the size the signature pad records, stored packed in
+signature_blob; no signature_image files are written.
+
+Entries are written through importer.bulk_insert, so the counters, the
+daily rollups, the match keys and the version stay correct. bulk_create
+always stamps created_at with the current time. Each batch's dates are
+therefore set afterwards, spread evenly over the last `days` days in
+registration order, and the daily rollups are recounted once at the end;
+moving them batch by batch costs a query per day and value.
+"""
+import math
+import random
+from datetime import timedelta
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .importer import bulk_insert
+from .models import RegistryEntry
+from .signatures import encode_strokes
+from .stats import rebuild_daily_stats
+from .version import bump_registry_version
+
+SEED_BATCH_SIZE = 2000
+
+FIRST_NAMES = (
+    "Thandeka", "Nomvula", "Sipho", "Themba", "Lerato", "Bongani", "Zanele", "Mandla",
+    "Nokuthula", "Sibusiso", "Palesa", "Thabo", "Ayanda", "Lindiwe", "Sizwe", "Nompumelelo",
+    "Kagiso", "Precious", "Mpho", "Busisiwe", "Lungile", "Tshepo", "Nandi", "Jabulani",
+    "Refilwe", "Xolani", "Thulani", "Dineo", "Siphesihle", "Andile", "Hlengiwe", "Vusi",
+    "Fatima", "Priya", "Charmaine", "Johannes", "Maria", "Pieter", "Ayesha", "Gift",
+)
+SURNAMES = (
+    "Dlamini", "Nkosi", "Ndlovu", "Khumalo", "Mokoena", "Mahlangu", "Zulu", "Mthembu",
+    "Sithole", "Ngcobo", "Buthelezi", "Mkhize", "Shabalala", "Molefe", "Cele", "Radebe",
+    "Zungu", "Mbatha", "Gumede", "Ntuli", "Maseko", "Hadebe", "Xaba", "Mazibuko",
+    "Naidoo", "Pillay", "Govender", "Adams", "Jacobs", "Botha", "Van Wyk", "Petersen",
+)
+STREETS = (
+    "Main Road", "Church Street", "Station Road", "Mandela Drive", "Hostel Block",
+    "Extension", "Phase 2", "Section", "Zone", "Khumalo Street",
+)
+
+GENDERS = {"Female": 52, "Male": 45, "LGBTQ+": 2, "Other": 1}
+RACES = {"African": 88, "Coloured": 6, "Indian": 3, "White": 3}
+TISH_AREAS = {"Informal Settlement": 45, "Township": 40, "Hostel": 15}
+GRANTS = {"": 30, "None": 15, "SRD": 20, "Child Grant": 15, "CSG": 8, "Old Age Pension": 8, "Disability Grant": 4}
+WARD_COUNT = 40
+
+RATES = {
+    "disability": 0.06,
+    "recovering_service_user": 0.04,
+    "cooperative_member": 0.12,
+    "contact": 0.85,
+    "address": 0.9,
+    "signed": 0.8,
+    "date_of_birth": 0.1,
+    "duplicate": 0.01,
+}
+
+
+def _weighted(rng, weights):
+    values, counts = zip(*weights.items())
+    return lambda: rng.choices(values, counts)[0]
+
+
+def sa_id_number(rng, birth, gender):
+    """A 13-digit South African ID number for birth date and gender, with its Luhn digit."""
+    sequence = rng.randrange(5000, 10000) if gender == "Male" else rng.randrange(0, 5000)
+    digits = f"{birth:%y%m%d}{sequence:04d}08"
+    total = 0
+    for position, digit in enumerate(reversed(digits)):
+        value = int(digit) * (2 if position % 2 == 0 else 1)
+        total += value - 9 if value > 9 else value
+    return digits + str((10 - total % 10) % 10)
+
+
+def synthetic_strokes(rng, strokes=None):
+    """2-5 pen strokes of 150-450 jittered points each, as (n, 2) arrays."""
+    generator = np.random.default_rng(rng.randrange(2 ** 32))
+    strokes = strokes or rng.randint(2, 5)
+    result = []
+    for index in range(strokes):
+        points = rng.randint(150, 450)
+        t = np.linspace(0, 2 * math.pi, points)
+        x = 20 + 110 * index + 35 * t + 15 * np.sin(3 * t + index) + generator.normal(0, 0.3, points)
+        y = 70 + 30 * np.sin(2 * t + index) + 8 * np.cos(5 * t) + generator.normal(0, 0.3, points)
+        result.append(np.column_stack([x, y]))
+    return result
+
+
+def _typo(rng, text):
+    if len(text) < 3:
+        return text
+    position = rng.randrange(1, len(text) - 1)
+    return text[:position] + text[position + 1] + text[position] + text[position + 2:]
+
+
+class EntryFactory:
+    """Builds unsaved RegistryEntry objects; the same seed gives the same entries."""
+
+    def __init__(self, seed=0):
+        self.rng = rng = random.Random(seed)
+        self.gender = _weighted(rng, GENDERS)
+        self.race = _weighted(rng, RACES)
+        self.tish_area = _weighted(rng, TISH_AREAS)
+        self.grant = _weighted(rng, GRANTS)
+        self.ward = _weighted(rng, {str(ward): 1 / ward ** 0.8 for ward in range(1, WARD_COUNT + 1)})
+        self.recent = []
+
+    def make(self):
+        rng = self.rng
+        if self.recent and rng.random() < RATES["duplicate"]:
+            entry = self._again(rng.choice(self.recent))
+        else:
+            entry = self._new()
+            self.recent = (self.recent + [entry])[-1000:]
+        if rng.random() < RATES["signed"]:
+            entry.signature_blob = encode_strokes(synthetic_strokes(rng))
+        return entry
+
+    def _new(self):
+        rng = self.rng
+        gender = self.gender()
+        birth = timezone.localdate() - timedelta(days=rng.randint(18 * 365, 80 * 365))
+        if rng.random() < RATES["date_of_birth"]:
+            id_no = birth.strftime(rng.choice(("%Y-%m-%d", "%d/%m/%Y")))
+        else:
+            id_no = sa_id_number(rng, birth, gender)
+        ward = self.ward()
+        first = rng.choice(FIRST_NAMES)
+        names = f"{first} {rng.choice(FIRST_NAMES)}" if rng.random() < 0.3 else first
+        return RegistryEntry(
+            names=names,
+            surname=rng.choice(SURNAMES),
+            id_no_or_dob=id_no,
+            physical_address=(
+                f"{rng.randint(1, 9999)} {rng.choice(STREETS)}, Ward {ward}"
+                if rng.random() < RATES["address"] else None
+            ),
+            ward_no=ward,
+            contact_number=f"0{rng.choice('678')}{rng.randrange(10 ** 7, 10 ** 8)}" if rng.random() < RATES["contact"] else None,
+            gender=gender,
+            race=self.race(),
+            tish_area=self.tish_area(),
+            social_grant=self.grant() or None,
+            disability=rng.random() < RATES["disability"],
+            recovering_service_user=rng.random() < RATES["recovering_service_user"],
+            cooperative_member=rng.random() < RATES["cooperative_member"],
+        )
+
+    def _again(self, original):
+        """original registering a second time, with a slip in the names or ID."""
+        entry = RegistryEntry(**{
+            field.attname: getattr(original, field.attname)
+            for field in RegistryEntry._meta.concrete_fields if not field.primary_key
+        })
+        slip = self.rng.choice(("names", "surname", "id_no_or_dob"))
+        setattr(entry, slip, _typo(self.rng, getattr(entry, slip)))
+        entry.signature_blob = None
+        return entry
+
+
+def _backdate(entries, times):
+    # executemany rather than bulk_update, whose CASE per row is slow to build
+    field = RegistryEntry._meta.get_field("created_at")
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {RegistryEntry._meta.db_table} SET {field.column} = %s WHERE id = %s",
+            [(field.get_db_prep_value(when, connection), entry.pk) for entry, when in zip(entries, times)],
+        )
+    for entry, when in zip(entries, times):
+        entry.created_at = when
+
+
+def seed_entries(rows, seed=0, days=3 * 365, batch_size=SEED_BATCH_SIZE, progress=None):
+    """
+    Insert rows synthetic entries registered over the last `days` days,
+    oldest first. progress(done) is called after each batch.
+    """
+    factory = EntryFactory(seed)
+    end = timezone.now()
+    step = timedelta(days=days) / max(rows, 1)
+    done = 0
+    while done < rows:
+        entries = [factory.make() for _ in range(min(batch_size, rows - done))]
+        with transaction.atomic():
+            bulk_insert(entries)
+            _backdate(entries, [end - step * (rows - number) for number in range(done, done + len(entries))])
+        done += len(entries)
+        if progress:
+            progress(done)
+    rebuild_daily_stats()
+    bump_registry_version()
+    return done
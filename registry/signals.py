@@ -0,0 +1,96 @@
+# registry/signals.py
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .duplicates import likely_duplicates, set_match_keys
+from .models import RegistryEntry
+from .stats import (
+    BOOLEAN_DIMENSIONS, GROUPED_DIMENSIONS, PRESENCE_DIMENSIONS,
+    apply_daily_delta, apply_stat_delta, entry_daily_keys, entry_stat_keys,
+)
+from .signatures import pack_signature
+from .thumbnails import is_stale, schedule_thumbnail
+from .version import bump_registry_version
+
+STAT_FIELDS = (
+    [field for _, field in GROUPED_DIMENSIONS]
+    + [field for _, field in BOOLEAN_DIMENSIONS]
+    + [field for _, field, _, _ in PRESENCE_DIMENSIONS]
+    + ['created_at']
+)
+
+
+@receiver(pre_save, sender=RegistryEntry)
+def pack_signature_data(sender, instance, raw=False, **kwargs):
+    # A deferred signature (for_listing/for_export rows) is not being saved
+    if not raw and 'signature_data' not in instance.get_deferred_fields():
+        pack_signature(instance)
+
+
+@receiver(pre_save, sender=RegistryEntry)
+def update_match_keys(sender, instance, raw=False, **kwargs):
+    if raw or instance.get_deferred_fields().intersection(('names', 'surname', 'id_no_or_dob')):
+        return
+    if instance._state.adding:
+        # Two indexed lookups; see registry.duplicates
+        instance.possible_duplicate = bool(likely_duplicates(instance))
+    else:
+        set_match_keys(instance)
+
+
+@receiver(pre_save, sender=RegistryEntry)
+def remember_old_stat_keys(sender, instance, raw=False, **kwargs):
+    """Snapshot the counters and rollups an existing row contributed to before it changes."""
+    instance._old_stat_keys = []
+    instance._old_daily_keys = []
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    old = sender.objects.filter(pk=instance.pk).only(*STAT_FIELDS).first()
+    if old is not None:
+        instance._old_stat_keys = entry_stat_keys(old)
+        instance._old_daily_keys = entry_daily_keys(old)
+
+
+@receiver(post_save, sender=RegistryEntry)
+def update_stats_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    delta = Counter(entry_stat_keys(instance))
+    delta.subtract(getattr(instance, '_old_stat_keys', []))
+    apply_stat_delta(delta)
+    daily = Counter(entry_daily_keys(instance))
+    daily.subtract(getattr(instance, '_old_daily_keys', []))
+    apply_daily_delta(daily)
+    instance._old_stat_keys = []
+    instance._old_daily_keys = []
+    bump_registry_version()
+
+
+@receiver(post_save, sender=RegistryEntry)
+def queue_signature_thumbnail(sender, instance, raw=False, **kwargs):
+    if raw or 'signature_image' in instance.get_deferred_fields():
+        return
+    name = instance.signature_image.name
+    if name and is_stale(name):
+        schedule_thumbnail(name)
+
+
+@receiver(pre_delete, sender=RegistryEntry)
+def load_stat_fields_before_delete(sender, instance, **kwargs):
+    # A deferred field can no longer be fetched once the row is gone
+    deferred = instance.get_deferred_fields().intersection(STAT_FIELDS)
+    if deferred:
+        instance.refresh_from_db(fields=deferred)
+
+
+@receiver(post_delete, sender=RegistryEntry)
+def update_stats_on_delete(sender, instance, **kwargs):
+    delta = Counter()
+    delta.subtract(entry_stat_keys(instance))
+    apply_stat_delta(delta)
+    daily = Counter()
+    daily.subtract(entry_daily_keys(instance))
+    apply_daily_delta(daily)
+    bump_registry_version()
@@ -0,0 +1,330 @@
+# registry/signatures.py
+"""
+Signature rendering engine.
+
+Accepts every shape signature_data arrives in:
+
+* a flat list of {"x": .., "y": ..} points (one continuous stroke),
+* a list of strokes, each {"points": [{"x": .., "y": ..}, ...]} or a
+  bare list of points,
+* the SVG data URL posted by registry_form.html (one stroke per path),
+* any of the above as a JSON string,
+* the packed binary form stored in RegistryEntry.signature_blob.
+
+Strokes become NumPy arrays and are scaled onto the canvas in one vector
+operation. Points that fall on the same pixel as their predecessor are
+dropped and the rest simplified with Ramer-Douglas-Peucker in output
+pixels, so detail the pen cannot show is lost. Each stroke is then drawn
+with one ImageDraw.line polyline call.
+
+Packed format (encode_strokes / decode_strokes): a 6-byte header (magic
+b"SG", format version, quantisation steps per pixel, stroke count as
+uint16), then zlib of the little-endian uint32 stroke lengths followed by
+int16 coordinates, each point stored as its delta from the previous point
+of the same stroke (the first point of a stroke from the origin).
+"""
+import base64
+import json
+import re
+import struct
+import zlib
+from xml.etree import ElementTree
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Max distance (output pixels) a dropped point may lie from the kept
+# line; a quarter of the default 2px pen width
+DEFAULT_TOLERANCE = 0.5
+# Below this many snapped points simplifying costs more than it saves
+SIMPLIFY_MIN_POINTS = 256
+
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_SVG_PATH = "{http://www.w3.org/2000/svg}path"
+
+
+def _points_array(points):
+    """(n, 2) float array from a list of {"x", "y"} dicts or [x, y] pairs."""
+    try:
+        # Fast path: every point well formed
+        if points and isinstance(points[0], dict):
+            return np.column_stack((
+                np.array([point["x"] for point in points], dtype=float),
+                np.array([point["y"] for point in points], dtype=float),
+            ))
+        return np.array([(point[0], point[1]) for point in points], dtype=float).reshape(-1, 2)
+    except (KeyError, IndexError, TypeError):
+        coords = [
+            (point["x"], point["y"]) if isinstance(point, dict) else (point[0], point[1])
+            for point in points
+            if (isinstance(point, dict) and "x" in point and "y" in point)
+            or (isinstance(point, (list, tuple)) and len(point) >= 2)
+        ]
+        return np.asarray(coords, dtype=float).reshape(-1, 2)
+
+
+def _svg_strokes(data_url):
+    _, _, encoded = data_url.partition(";base64,")
+    root = ElementTree.fromstring(base64.b64decode(encoded))
+    strokes = []
+    for path in root.iter(_SVG_PATH):
+        # Paths are written as absolute "M x y L x y ..."; each M starts a stroke
+        for subpath in re.split(r"[Mm]", path.get("d", "")):
+            numbers = _NUMBER.findall(subpath)
+            if len(numbers) >= 2:
+                strokes.append(np.asarray(numbers[:len(numbers) // 2 * 2], dtype=float).reshape(-1, 2))
+    return strokes
+
+
+BLOB_MAGIC = b"SG"
+BLOB_VERSION = 1
+_HEADER = struct.Struct("<2sBBH")
+# Steps per pixel tried in order; a quarter pixel is well under the pen width
+QUANTISATION_STEPS = (4, 2, 1)
+_INT16 = np.iinfo(np.int16)
+
+
+def encode_strokes(strokes):
+    """
+    Pack a list of (n, 2) arrays into bytes. Coordinates are rounded to
+    the finest quantisation whose deltas fit in int16. Returns None for
+    no strokes; raises ValueError if even whole pixels overflow.
+    """
+    strokes = [np.asarray(stroke, dtype=float).reshape(-1, 2) for stroke in strokes]
+    strokes = [stroke for stroke in strokes if len(stroke)]
+    if not strokes:
+        return None
+    if len(strokes) > 0xFFFF:
+        raise ValueError("too many strokes to pack")
+    lengths = np.array([len(stroke) for stroke in strokes], dtype="<u4")
+    everything = np.concatenate(strokes)
+    starts = np.cumsum(lengths) - lengths
+
+    for steps in QUANTISATION_STEPS:
+        fixed = np.rint(everything * steps)
+        deltas = np.diff(fixed, axis=0, prepend=0)
+        deltas[starts] = fixed[starts]
+        if deltas.min() >= _INT16.min and deltas.max() <= _INT16.max:
+            break
+    else:
+        raise ValueError("signature coordinates too large to pack")
+
+    payload = lengths.tobytes() + deltas.astype("<i2").tobytes()
+    return _HEADER.pack(BLOB_MAGIC, BLOB_VERSION, steps, len(strokes)) + zlib.compress(payload)
+
+
+def decode_strokes(blob):
+    """Unpack bytes from encode_strokes into a list of (n, 2) float arrays."""
+    blob = bytes(blob)
+    magic, version, steps, count = _HEADER.unpack_from(blob)
+    if magic != BLOB_MAGIC or version != BLOB_VERSION:
+        raise ValueError("not a packed signature")
+    payload = zlib.decompress(blob[_HEADER.size:])
+    lengths = np.frombuffer(payload, dtype="<u4", count=count)
+    deltas = np.frombuffer(payload, dtype="<i2", offset=4 * count).reshape(-1, 2).astype(float)
+    ends = np.cumsum(lengths)
+    # Undo the deltas with one running sum, then take off what the
+    # earlier strokes added so each stroke restarts from the origin
+    totals = np.cumsum(deltas, axis=0)
+    before = np.vstack([np.zeros((1, 2)), totals[ends[:-1] - 1]])
+    points = (totals - np.repeat(before, lengths, axis=0)) / steps
+    return np.split(points, ends[:-1])
+
+
+def encode_signature(signature_data):
+    """encode_strokes for any format parse_strokes accepts."""
+    return encode_strokes(parse_strokes(signature_data))
+
+
+def pack_signature(entry):
+    """
+    Move entry.signature_data into entry.signature_blob, leaving the JSON
+    empty. Data that cannot be packed is left as it is. Returns True if
+    anything changed. Used by the pre_save signal and by bulk writers
+    that bypass it.
+    """
+    data = entry.signature_data
+    if data is None:
+        return False
+    if not data:
+        # The form posts "" when nothing was drawn
+        entry.signature_data = None
+        return True
+    try:
+        blob = encode_signature(data)
+    except ValueError:
+        return False
+    if blob is None:
+        return False
+    entry.signature_blob = blob
+    entry.signature_data = None
+    return True
+
+
+def parse_strokes(signature_data):
+    """
+    Return signature_data as a list of (n, 2) float arrays, one per
+    stroke. Unrecognised or empty input gives an empty list.
+    """
+    data = signature_data
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        try:
+            return decode_strokes(data)
+        except (ValueError, struct.error, zlib.error):
+            return []
+    if isinstance(data, str):
+        if data.startswith("data:image/svg+xml"):
+            try:
+                return _svg_strokes(data)
+            except (ValueError, ElementTree.ParseError):
+                return []
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return []
+    if not data or not isinstance(data, list):
+        return []
+
+    first = data[0]
+    try:
+        if isinstance(first, dict) and "points" in first:
+            strokes = [_points_array(stroke.get("points") or []) for stroke in data if isinstance(stroke, dict)]
+        elif isinstance(first, list) and first and isinstance(first[0], (dict, list, tuple)):
+            strokes = [_points_array(stroke) for stroke in data if isinstance(stroke, list)]
+        else:
+            strokes = [_points_array(data)]
+    except (TypeError, ValueError):
+        return []
+    return [stroke for stroke in strokes if len(stroke)]
+
+
+def _snap(pixels, starts):
+    """
+    Drop points that land on the same whole pixel as the point before
+    them in the same stroke. Dense captures collapse to
+    a few points per pixel of stroke length before simplification.
+    Returns the new (pixels, starts).
+    """
+    grid = np.rint(pixels)
+    moved = np.ones(len(pixels), dtype=bool)
+    np.any(grid[1:] != grid[:-1], axis=1, out=moved[1:])
+    moved[starts] = True
+    counts = np.add.reduceat(moved, starts)
+    return pixels[moved], np.cumsum(counts) - counts
+
+
+def _rdp_mask(points, starts, tolerance):
+    """
+    Ramer-Douglas-Peucker over several strokes packed into one array
+    (starts gives each stroke's first index); returns a mask of the
+    points to keep, the same points the textbook recursion keeps. Every
+    open segment of every stroke is split in the same handful of array
+    operations, so the loop runs once per level rather than per point.
+    """
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    ends = np.append(starts[1:], n) - 1
+    keep[starts] = keep[ends] = True
+    if tolerance <= 0:
+        keep[:] = True
+        return keep
+    while len(starts):
+        inner = ends - starts - 1
+        open_ = inner > 0
+        starts, ends, inner = starts[open_], ends[open_], inner[open_]
+        if not len(starts):
+            break
+        # Flatten the interior points of every segment into one array
+        first = np.cumsum(inner) - inner
+        segment = np.repeat(np.arange(len(starts)), inner)
+        index = np.arange(len(segment)) - first[segment] + starts[segment] + 1
+        origin = points[starts][segment]
+        chord = points[ends][segment] - origin
+        offset = points[index] - origin
+        length = np.hypot(chord[:, 0], chord[:, 1])
+        # Distance to the chord, or to its start when the chord is a point
+        distance = np.hypot(offset[:, 0], offset[:, 1])
+        line = length > 0
+        distance[line] = np.abs(
+            chord[line, 0] * offset[line, 1] - chord[line, 1] * offset[line, 0]
+        ) / length[line]
+        # First farthest point of each segment
+        peak = np.maximum.reduceat(distance, first)
+        at_peak = np.flatnonzero(distance == peak[segment])
+        peak_segment = segment[at_peak]
+        leading = np.ones(len(at_peak), dtype=bool)
+        np.not_equal(peak_segment[1:], peak_segment[:-1], out=leading[1:])
+        split = peak > tolerance
+        split_at = index[at_peak[leading]][split]
+        keep[split_at] = True
+        starts = np.concatenate([starts[split], split_at])
+        ends = np.concatenate([split_at, ends[split]])
+    return keep
+
+
+def simplify(points, tolerance=DEFAULT_TOLERANCE):
+    """Ramer-Douglas-Peucker on one (n, 2) stroke."""
+    if len(points) < 3:
+        return points
+    return points[_rdp_mask(points, np.array([0]), tolerance)]
+
+
+def layout_strokes(signature_data, output_size=None, padding=10, tolerance=DEFAULT_TOLERANCE):
+    """
+    Return (canvas size, strokes) with every stroke already transformed
+    to canvas pixels and simplified, or None if there is nothing to draw.
+
+    With output_size=(w, h) the signature is scaled to fit inside the
+    canvas less padding; without it the canvas is the signature's own
+    bounding box plus padding on each side.
+    """
+    strokes = parse_strokes(signature_data)
+    if not strokes:
+        return None
+
+    everything = np.concatenate(strokes)
+    lower, upper = everything.min(axis=0), everything.max(axis=0)
+    extent = upper - lower
+
+    if output_size is None:
+        scale = 1.0
+        size = (int(extent[0]) + 2 * padding, int(extent[1]) + 2 * padding)
+    else:
+        if not (extent > 0).all():
+            return None
+        available = np.asarray(output_size, dtype=float) - 2 * padding
+        scale = float(np.min(available / extent))
+        size = tuple(output_size)
+
+    # Transform, snap and simplify all strokes together
+    lengths = np.array([len(stroke) for stroke in strokes])
+    pixels, starts = _snap(everything * scale + (padding - lower * scale), np.cumsum(lengths) - lengths)
+    if len(pixels) >= SIMPLIFY_MIN_POINTS:
+        keep = _rdp_mask(pixels, starts, tolerance)
+        pixels = pixels[keep]
+        kept = np.add.reduceat(keep, starts)
+    else:
+        kept = np.diff(np.append(starts, len(pixels)))
+    return size, np.split(pixels, np.cumsum(kept)[:-1])
+
+
+def render_signature(signature_data, output_size=None, padding=10, line_width=2,
+                     tolerance=DEFAULT_TOLERANCE, transparent=False):
+    """
+    Draw signature_data (see layout_strokes for the sizing rules) and
+    return a PIL image, or None if there is nothing to draw.
+    """
+    layout = layout_strokes(signature_data, output_size, padding, tolerance)
+    if layout is None:
+        return None
+    size, strokes = layout
+
+    if transparent:
+        image = Image.new("RGBA", size, (255, 255, 255, 0))
+    else:
+        image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    for stroke in strokes:
+        if len(stroke) > 1:
+            draw.line(stroke.ravel().tolist(), fill="black", width=line_width, joint="curve")
+    return image
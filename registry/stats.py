@@ -0,0 +1,450 @@
+# registry/stats.py
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncDay, TruncMonth, TruncWeek, TruncYear
+from django.utils import timezone
+
+from .models import RegistryDailyStat, RegistryEntry, RegistryStat
+
+
+# Payload key -> model field, for the free-text / choice breakdowns
+GROUPED_DIMENSIONS = (
+    ("gender_counts", "gender"),
+    ("grant_counts", "social_grant"),
+    ("tish_counts", "tish_area"),
+    ("race_counts", "race"),
+    ("ward_counts", "ward_no"),
+)
+
+# Payload key -> boolean field, reported as Yes / No
+BOOLEAN_DIMENSIONS = (
+    ("disability_counts", "disability"),
+    ("recovering_counts", "recovering_service_user"),
+    ("cooperative_counts", "cooperative_member"),
+)
+
+# Payload key -> (nullable field, label when filled, label when blank)
+PRESENCE_DIMENSIONS = (
+    ("contact_counts", "contact_number", "Has Contact", "No Contact"),
+    ("signature_counts", "signature_image", "Signed", "Not Signed"),
+    ("address_counts", "physical_address", "Has Address", "No Address"),
+)
+
+# Key order the dashboard has always received
+PAYLOAD_KEYS = (
+    "gender_counts", "grant_counts", "tish_counts", "disability_counts",
+    "race_counts", "recovering_counts", "cooperative_counts", "ward_counts",
+    "contact_counts", "signature_counts", "address_counts", "total_participants",
+)
+
+
+def _blank(field):
+    return Q(**{f"{field}__isnull": True}) | Q(**{field: ""})
+
+
+def _conditional_aggregates():
+    """
+    Build the Count(filter=...) expressions for every boolean and
+    presence breakdown. Returns (aggregates, labels) where labels maps
+    each SQL alias back to its (payload key, label) pair.
+    """
+    aggregates = {"total_participants": Count("id")}
+    labels = {}
+
+    def add(key, label, condition):
+        alias = f"c{len(labels)}"
+        aggregates[alias] = Count("id", filter=condition)
+        labels[alias] = (key, label)
+
+    for key, field in BOOLEAN_DIMENSIONS:
+        add(key, "Yes", Q(**{field: True}))
+        add(key, "No", Q(**{field: False}))
+    for key, field, filled, blank in PRESENCE_DIMENSIONS:
+        add(key, filled, ~_blank(field))
+        add(key, blank, _blank(field))
+    return aggregates, labels
+
+
+def fold_grouped_counts(rows, fields, skip_empty=True):
+    """
+    Fold rows from values(*fields).annotate(count=...) into one
+    {value: count} dict per field, e.g. {'gender': {'Male': 3}, ...}.
+    """
+    folded = {field: {} for field in fields}
+    for row in rows:
+        for field in fields:
+            value = row[field]
+            if skip_empty and value in (None, ""):
+                continue
+            folded[field][value] = folded[field].get(value, 0) + row["count"]
+    return folded
+
+
+def registry_counts(queryset=None):
+    """
+    Return the dashboard payload for queryset (all entries by default)
+    using one conditional-aggregate scan plus one grouped scan.
+    """
+    qs = RegistryEntry.objects.all() if queryset is None else queryset
+
+    # 1) Booleans, contact / signature / address presence and the total
+    aggregates, labels = _conditional_aggregates()
+    totals = qs.aggregate(**aggregates)
+
+    # 2) All choice fields in a single GROUP BY, folded per field
+    fields = [field for _, field in GROUPED_DIMENSIONS]
+    rows = qs.order_by().values(*fields).annotate(count=Count("id"))
+    grouped = fold_grouped_counts(rows, fields)
+
+    data = {key: grouped[field] for key, field in GROUPED_DIMENSIONS}
+    for alias, (key, label) in labels.items():
+        data.setdefault(key, {})[label] = totals[alias]
+    data["total_participants"] = totals["total_participants"]
+
+    return {key: data[key] for key in PAYLOAD_KEYS}
+
+
+# ==================== MATERIALIZED COUNTERS ====================
+
+def entry_stat_keys(entry, keep_blank=False):
+    """
+    Return the (dimension, value) counters a single entry contributes
+    to, mirroring exactly what registry_counts() would count it under.
+    With keep_blank, empty choice fields count under "" (the daily rollups).
+    """
+    keys = [("total_participants", "")]
+    for key, field in GROUPED_DIMENSIONS:
+        value = getattr(entry, field)
+        if value not in (None, ""):
+            keys.append((key, value))
+        elif keep_blank:
+            keys.append((key, ""))
+    for key, field in BOOLEAN_DIMENSIONS:
+        keys.append((key, "Yes" if getattr(entry, field) else "No"))
+    for key, field, filled, blank in PRESENCE_DIMENSIONS:
+        # FieldFile is falsy when it has no name, like a blank string
+        keys.append((key, filled if getattr(entry, field) else blank))
+    return keys
+
+
+def payload_stat_rows(payload):
+    """Flatten a registry_counts() payload into {(dimension, value): count}."""
+    rows = {("total_participants", ""): payload["total_participants"]}
+    for key in PAYLOAD_KEYS:
+        if key == "total_participants":
+            continue
+        for value, count in payload[key].items():
+            rows[(key, value)] = count
+    return rows
+
+
+def apply_stat_delta(delta):
+    """
+    Add delta ({(dimension, value): +/-n}) to the RegistryStat counters,
+    creating missing rows. Callers run this inside the write transaction.
+    """
+    for (dimension, value), n in delta.items():
+        if n:
+            _add_to_counter(RegistryStat, n, dimension=dimension, value=value)
+
+
+def _add_to_counter(model, n, **key):
+    counter = model.objects.filter(**key)
+    if counter.update(count=F("count") + n):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(count=n, **key)
+    except IntegrityError:
+        # Another writer created the row first
+        counter.update(count=F("count") + n)
+
+
+def stats_payload():
+    """
+    Build the dashboard payload from the RegistryStat table: one query
+    over O(number of categories) rows instead of a scan of the registry.
+    """
+    data = {key: {} for key in PAYLOAD_KEYS if key != "total_participants"}
+    for key, _ in BOOLEAN_DIMENSIONS:
+        data[key] = {"Yes": 0, "No": 0}
+    for key, _, filled, blank in PRESENCE_DIMENSIONS:
+        data[key] = {filled: 0, blank: 0}
+    data["total_participants"] = 0
+
+    for dimension, value, count in RegistryStat.objects.values_list("dimension", "value", "count"):
+        if dimension == "total_participants":
+            data[dimension] = count
+        elif dimension in data and count > 0:
+            data[dimension][value] = count
+
+    return {key: data[key] for key in PAYLOAD_KEYS}
+
+
+def rebuild_stats(queryset=None):
+    """
+    Replace every counter row with a full recount of queryset. Returns
+    the number of counter rows written.
+    """
+    rows = payload_stat_rows(registry_counts(queryset))
+    with transaction.atomic():
+        RegistryStat.objects.all().delete()
+        RegistryStat.objects.bulk_create(
+            RegistryStat(dimension=dimension, value=value, count=count)
+            for (dimension, value), count in rows.items()
+        )
+    return len(rows)
+
+
+# ==================== DAILY ROLLUPS ====================
+
+def entry_day(entry):
+    """The local calendar day an entry was registered on."""
+    return timezone.localdate(entry.created_at)
+
+
+def entry_daily_keys(entry):
+    """(day, dimension, value) rollup keys for entry; see RegistryDailyStat."""
+    day = entry_day(entry)
+    return [(day, dimension, value) for dimension, value in entry_stat_keys(entry, keep_blank=True)]
+
+
+def apply_daily_delta(delta):
+    """Add delta ({(day, dimension, value): +/-n}) to the daily rollups."""
+    for (day, dimension, value), n in delta.items():
+        if n:
+            _add_to_counter(RegistryDailyStat, n, day=day, dimension=dimension, value=value)
+
+
+def period_counts(start, end, dimensions=None):
+    """
+    {dimension: {value: count}} for entries registered from day start to
+    day end inclusive, summed from the daily rollups: one query over
+    O(days x categories) rows. total_participants is {"": total}.
+    """
+    rows = RegistryDailyStat.objects.filter(day__gte=start, day__lte=end)
+    if dimensions is not None:
+        rows = rows.filter(dimension__in=dimensions)
+    counts = defaultdict(dict)
+    for dimension, value, count in rows.values_list("dimension", "value").annotate(count=Sum("count")).order_by():
+        if count:
+            counts[dimension][value] = count
+    return counts
+
+
+def daily_series(start, end, dimension="total_participants"):
+    """
+    Per-day counts for dimension from start to end inclusive:
+    (list of days, {value: [count per day]}), with zero-filled gaps.
+    """
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    index = {day: position for position, day in enumerate(days)}
+    series = defaultdict(lambda: [0] * len(days))
+    rows = RegistryDailyStat.objects.filter(dimension=dimension, day__gte=start, day__lte=end)
+    for day, value, count in rows.values_list("day", "value", "count"):
+        series[value][index[day]] += count
+    return days, dict(series)
+
+
+def daily_stat_rows(queryset=None):
+    """
+    Recount {(day, dimension, value): count} for queryset (all entries by
+    default) with the same per-day grouped and conditional aggregates
+    registry_counts() uses for the whole registry.
+    """
+    qs = RegistryEntry.objects.all() if queryset is None else queryset
+    qs = qs.order_by().annotate(day=TruncDate("created_at"))
+    rows = Counter()
+
+    aggregates, labels = _conditional_aggregates()
+    for totals in qs.values("day").annotate(**aggregates):
+        rows[totals["day"], "total_participants", ""] += totals["total_participants"]
+        for alias, (key, label) in labels.items():
+            rows[totals["day"], key, label] += totals[alias]
+
+    for key, field in GROUPED_DIMENSIONS:
+        for day, value, count in qs.values_list("day", field).annotate(count=Count("id")):
+            rows[day, key, value or ""] += count
+    return +rows
+
+
+def rebuild_daily_stats(queryset=None):
+    """Replace every daily rollup row with a recount. Returns the number of rows written."""
+    rows = daily_stat_rows(queryset)
+    with transaction.atomic():
+        RegistryDailyStat.objects.all().delete()
+        RegistryDailyStat.objects.bulk_create(
+            (RegistryDailyStat(day=day, dimension=dimension, value=value, count=count)
+             for (day, dimension, value), count in rows.items()),
+            batch_size=1000,
+        )
+    return len(rows)
+
+
+def covers_registry(queryset):
+    """True if queryset is every entry (no filters), so rollups can stand in for it."""
+    return queryset.model is RegistryEntry and not queryset.query.where
+
+
+def period_breakdown(queryset, start, end, fields):
+    """
+    (total, {field: {value: count}}) for the entries of queryset registered
+    from day start to day end inclusive. Choice and boolean fields only;
+    blank choices are reported under None. For the whole registry this is
+    answered from the daily rollups, otherwise with one grouped query.
+    """
+    if covers_registry(queryset):
+        dimensions = {field: key for key, field in GROUPED_DIMENSIONS + BOOLEAN_DIMENSIONS}
+        booleans = {field for _, field in BOOLEAN_DIMENSIONS}
+        counts = period_counts(start, end, ["total_participants"] + [dimensions[field] for field in fields])
+        breakdown = {}
+        for field in fields:
+            values = sorted(counts.get(dimensions[field], {}).items())
+            # "" (blank) sorts first, as None does in the grouped-query branch
+            if field in booleans:
+                breakdown[field] = {value == "Yes": count for value, count in values}
+            else:
+                breakdown[field] = {value or None: count for value, count in values}
+        return counts.get("total_participants", {}).get("", 0), breakdown
+
+    rows = list(queryset.filter(day_range(start, end)).order_by().values(*fields).annotate(count=Count("id")))
+    folded = fold_grouped_counts(rows, fields, skip_empty=False)
+    # Same order as the rollup branch: blank first, then by value
+    breakdown = {
+        field: dict(sorted(counts.items(), key=lambda item: (item[0] is not None, str(item[0]))))
+        for field, counts in folded.items()
+    }
+    return sum(row["count"] for row in rows), breakdown
+
+
+# Calendar days covered by each admin period report, today included
+REPORT_DAYS = {"daily": 1, "weekly": 7, "monthly": 30, "yearly": 365}
+
+
+def day_range(start, end):
+    """
+    Filter for entries registered from local day start to day end
+    inclusive, as a created_at range the created_at index can serve.
+    """
+    first = timezone.make_aware(datetime.combine(start, time.min))
+    after = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+    return Q(created_at__gte=first, created_at__lt=after)
+
+
+# ==================== REGISTRATION TIME SERIES ====================
+
+# Buckets are cut at Johannesburg midnight whatever the server's zone
+TIMESERIES_TZ = ZoneInfo("Africa/Johannesburg")
+# Finest first; a range is shown in the finest one that fits TIMESERIES_MAX_POINTS
+BUCKETS = {"day": TruncDay, "week": TruncWeek, "month": TruncMonth, "year": TruncYear}
+TIMESERIES_MAX_POINTS = 366
+# Further values of a grouping are summed into "Other"
+TIMESERIES_MAX_SERIES = 12
+
+
+def bucket_start(day, bucket):
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    if bucket == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def bucket_starts(start, end, bucket):
+    """The first day of every bucket from start to end inclusive."""
+    starts = []
+    current = bucket_start(start, bucket)
+    while current <= end:
+        starts.append(current)
+        if bucket == "day":
+            current += timedelta(days=1)
+        elif bucket == "week":
+            current += timedelta(weeks=1)
+        elif bucket == "month":
+            current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        else:
+            current = date(current.year + 1, 1, 1)
+    return starts
+
+
+def bucket_count(start, end, bucket):
+    if bucket == "day":
+        return (end - start).days + 1
+    if bucket == "week":
+        return (bucket_start(end, "week") - bucket_start(start, "week")).days // 7 + 1
+    if bucket == "month":
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return end.year - start.year + 1
+
+
+def choose_bucket(start, end, requested="day"):
+    """
+    The finest bucket, no finer than requested, that covers start..end in
+    at most TIMESERIES_MAX_POINTS points.
+    """
+    names = list(BUCKETS)
+    for bucket in names[names.index(requested):]:
+        if bucket_count(start, end, bucket) <= TIMESERIES_MAX_POINTS:
+            return bucket
+    return names[-1]
+
+
+def registration_timeseries(start, end, bucket="day", fields=("ward_no", "tish_area")):
+    """
+    Registrations per bucket from day start to day end, in total and per
+    value of each of fields, bucketed in SQL. Returns a dict of
+    bucket, buckets (ISO dates), total and {field: {value: counts}};
+    at most TIMESERIES_MAX_SERIES values per field, the rest as "Other".
+    The caller keeps the range within TIMESERIES_MAX_POINTS yearly buckets.
+    """
+    bucket = choose_bucket(start, end, bucket)
+    starts = bucket_starts(start, end, bucket)
+    index = {day: position for position, day in enumerate(starts)}
+    first = datetime.combine(start, time.min, tzinfo=TIMESERIES_TZ)
+    after = datetime.combine(end + timedelta(days=1), time.min, tzinfo=TIMESERIES_TZ)
+    entries = (
+        RegistryEntry.objects.filter(created_at__gte=first, created_at__lt=after)
+        .order_by()
+        .annotate(bucket=BUCKETS[bucket]("created_at", tzinfo=TIMESERIES_TZ))
+    )
+
+    # One GROUP BY over every field, folded per field in Python
+    total = [0] * len(starts)
+    series = {field: defaultdict(lambda: [0] * len(starts)) for field in fields}
+    for when, *values, count in entries.values_list("bucket", *fields).annotate(count=Count("id")):
+        position = index[_as_day(when)]
+        total[position] += count
+        for field, value in zip(fields, values):
+            series[field][value or "Unknown"][position] += count
+    groups = {field: _top_series(counts, len(starts)) for field, counts in series.items()}
+
+    return {
+        "bucket": bucket,
+        "buckets": [day.isoformat() for day in starts],
+        "total": total,
+        "series": groups,
+    }
+
+
+def _as_day(value):
+    # TruncDay and friends give aware datetimes; TruncDate-like backends a date
+    if isinstance(value, datetime):
+        return value.astimezone(TIMESERIES_TZ).date()
+    return value
+
+
+def _top_series(series, length):
+    ranked = sorted(series.items(), key=lambda item: (-sum(item[1]), str(item[0])))
+    top = dict(ranked[:TIMESERIES_MAX_SERIES])
+    if len(ranked) > TIMESERIES_MAX_SERIES:
+        other = [0] * length
+        for _, counts in ranked[TIMESERIES_MAX_SERIES:]:
+            other = [a + b for a, b in zip(other, counts)]
+        top["Other"] = other
+    return top
@@ -0,0 +1,412 @@
+import csv
+import json
+import tempfile
+import uuid
+from io import BytesIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.db.models import Count
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from pypdf import PdfReader
+
+from registry import report_cache
+from registry.jobs import run_job, submit_report, submit_task
+from registry.models import ADDRESS_PREVIEW_LENGTH, RegistryEntry, RegistryStat, ReportJob
+from registry.pdf import build_register_pdf
+from registry.profiling import ProfilingMiddleware
+from registry.routers import ReplicaRouter, read_from_replica, replica_reads
+from registry.search import SQLITE_TRIGGERS, ensure_search_index, rank_entries, search_entries
+from registry.stats import registry_counts
+
+
+def make_entry(**fields):
+    values = {
+        "names": "Thandeka", "surname": "Nkosi", "id_no_or_dob": "8001015009087", "tish_area": "Township",
+        **fields,
+    }
+    return RegistryEntry.objects.create(**values)
+
+
+def per_field_counts():
+    """The dashboard payload as dashboard_data built it before registry.stats: a query per count."""
+    qs = RegistryEntry.objects.all()
+
+    def grouped(field):
+        return {
+            row[field]: row["count"]
+            for row in qs.values(field).annotate(count=Count("id"))
+            if row[field] not in (None, "")
+        }
+
+    def yes_no(field):
+        return {"Yes": qs.filter(**{field: True}).count(), "No": qs.filter(**{field: False}).count()}
+
+    def presence(field, filled, blank):
+        return {
+            filled: qs.exclude(**{f"{field}__isnull": True}).exclude(**{field: ""}).count(),
+            blank: qs.filter(**{f"{field}__isnull": True}).count() + qs.filter(**{field: ""}).count(),
+        }
+
+    return {
+        "gender_counts": grouped("gender"),
+        "grant_counts": grouped("social_grant"),
+        "tish_counts": grouped("tish_area"),
+        "disability_counts": yes_no("disability"),
+        "race_counts": grouped("race"),
+        "recovering_counts": yes_no("recovering_service_user"),
+        "cooperative_counts": yes_no("cooperative_member"),
+        "ward_counts": grouped("ward_no"),
+        "contact_counts": presence("contact_number", "Has Contact", "No Contact"),
+        "signature_counts": presence("signature_image", "Signed", "Not Signed"),
+        "address_counts": presence("physical_address", "Has Address", "No Address"),
+        "total_participants": qs.count(),
+    }
+
+
+class DashboardCountsTests(TransactionTestCase):
+    # dashboard_data reads from the replica, a test mirror of default that
+    # only sees committed rows
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        make_entry(gender="Female", race="African", ward_no="12", social_grant="SRD",
+                   contact_number="0821234567", physical_address="1 Main Road", disability=True)
+        make_entry(names="Sipho", surname="Dlamini", gender="Male", race="African", ward_no="12",
+                   tish_area="Hostel", contact_number="", cooperative_member=True,
+                   signature_image="signatures/sipho.png")
+        make_entry(names="Priya", surname="Naidoo", gender="Female", race="Indian", ward_no="3",
+                   tish_area="Informal Settlement", social_grant="Child Grant", physical_address="",
+                   recovering_service_user=True)
+        make_entry(names="Gift", surname="Mokoena", gender=None, race=None, ward_no="")
+        # Cached bodies are keyed by registry version, which restarts per test
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        with report_cache._memory_lock:
+            report_cache._memory.clear()
+
+    def test_registry_counts_takes_two_queries(self):
+        expected = per_field_counts()
+        with self.assertNumQueries(2):
+            payload = registry_counts()
+        self.assertEqual(payload, expected)
+        self.assertEqual(list(payload), list(expected))
+
+    def test_dashboard_data_matches_per_field_counts(self):
+        expected = per_field_counts()
+        with self.assertNumQueries(2, using="replica"):
+            response = self.client.get(reverse("dashboard_data"))
+        self.assertEqual(response.status_code, 200)
+        payload = json.loads(response.content)
+        self.assertEqual(payload, expected)
+        self.assertEqual(list(payload), list(expected))
+
+
+def select_list(sql):
+    """The columns a SELECT statement reads: everything before its FROM."""
+    return sql.split(" FROM ", 1)[0]
+
+
+class ColumnSelectionTests(TransactionTestCase):
+    """The list and export pages leave the signature payloads and the full address in the table."""
+    # registry_list and the export job read from the replica test mirror
+    databases = {"default", "replica"}
+    address = "12 Long Street, " * 20
+
+    def setUp(self):
+        make_entry(physical_address=self.address, signature_data=[[{"x": 1, "y": 2}, {"x": 3, "y": 4}]])
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        with report_cache._memory_lock:
+            report_cache._memory.clear()
+
+    def assertNoSignatures(self, sql):
+        self.assertNotIn('"signature_data"', select_list(sql))
+        self.assertNotIn('"signature_blob"', select_list(sql))
+
+    def assertAddressPreviewOnly(self, sql):
+        columns = select_list(sql)
+        self.assertIn(f'"physical_address", 1, {ADDRESS_PREVIEW_LENGTH})', columns)
+        self.assertIn('"physical_address_preview"', columns)
+        # Only inside the SUBSTR() of the preview
+        self.assertEqual(columns.count('"physical_address"'), 1)
+
+    def test_for_listing(self):
+        queryset = RegistryEntry.objects.for_listing()
+        sql = str(queryset.query)
+        self.assertNoSignatures(sql)
+        self.assertAddressPreviewOnly(sql)
+        entry = queryset.get()
+        self.assertEqual(entry.physical_address_preview, self.address[:ADDRESS_PREVIEW_LENGTH])
+        self.assertIn("physical_address", entry.get_deferred_fields())
+
+    def test_for_export(self):
+        queryset = RegistryEntry.objects.for_export()
+        sql = str(queryset.query)
+        self.assertNoSignatures(sql)
+        # The exports print the whole address
+        self.assertIn('"physical_address"', select_list(sql))
+        self.assertEqual(queryset.get().physical_address, self.address)
+
+    def test_registry_list_view(self):
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            response = self.client.get(reverse("registry_list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, self.address.strip())
+        rows = [query["sql"] for query in replica.captured_queries if "physical_address_preview" in query["sql"]]
+        self.assertEqual(len(rows), 1)
+        for query in replica.captured_queries:
+            self.assertNoSignatures(query["sql"])
+        self.assertAddressPreviewOnly(rows[0])
+
+    def test_csv_export_view(self):
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            response = self.client.get("/registry/export/?export_format=csv")
+            body = b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Nkosi", body)
+        rows = [query["sql"] for query in replica.captured_queries if '"id_no_or_dob"' in query["sql"]]
+        self.assertTrue(rows)
+        for sql in rows:
+            self.assertNoSignatures(sql)
+            self.assertNotIn('"physical_address"', select_list(sql))
+
+    @override_settings(REGISTRY_JOB_WORKERS=0)
+    def test_pdf_export_job(self):
+        response = self.client.get("/registry/export/?export_format=pdf")
+        self.assertEqual(response.status_code, 302)
+        job = ReportJob.objects.get()
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.DONE, job.error)
+        rows = [query["sql"] for query in replica.captured_queries if '"id_no_or_dob"' in query["sql"]]
+        self.assertTrue(rows)
+        for sql in rows:
+            self.assertNoSignatures(sql)
+
+
+class AdminCsvExportTests(TransactionTestCase):
+    # The action reads from the replica test mirror
+    databases = {"default", "replica"}
+
+    def test_export_as_csv_writes_the_user_facing_columns(self):
+        entry = make_entry(client_uuid=uuid.uuid4(), possible_duplicate=True)
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "admin"))
+        response = self.client.post(
+            reverse("admin:registry_registryentry_changelist"),
+            {"action": "export_as_csv", "_selected_action": [entry.pk]},
+        )
+        self.assertEqual(response.status_code, 200)
+        header, row = list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(header, [
+            "id", "created_at", "names", "surname", "id_no_or_dob", "physical_address",
+            "ward_no", "contact_number", "gender", "race", "tish_area", "social_grant",
+            "disability", "recovering_service_user", "cooperative_member", "signature_image",
+        ])
+        self.assertEqual(row[header.index("surname")], "Nkosi")
+
+
+class ProfilingMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        log = self.enterContext(tempfile.NamedTemporaryFile(suffix=".log"))
+        self.log_path = log.name
+        self.enterContext(override_settings(REGISTRY_PROFILING=True, REGISTRY_PROFILE_LOG=self.log_path))
+
+    def lines(self):
+        with open(self.log_path, encoding="utf-8") as log:
+            return [json.loads(line) for line in log]
+
+    def test_sync_requests_are_profiled(self):
+        middleware = ProfilingMiddleware(lambda request: HttpResponse(b"x" * 10))
+        self.assertFalse(iscoroutinefunction(middleware))
+        middleware(RequestFactory().get("/"))
+        [line] = self.lines()
+        self.assertEqual(line["bytes"], 10)
+        self.assertIsInstance(line["peak_kb"], int)
+
+    def test_async_views_stay_async(self):
+        async def view(request):
+            return HttpResponse(b"x" * 10)
+
+        middleware = ProfilingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        async_to_sync(middleware)(RequestFactory().get("/"))
+        [line] = self.lines()
+        self.assertEqual(line["bytes"], 10)
+        self.assertEqual(line["status"], 200)
+
+    def test_overlapping_requests_have_no_memory_peak(self):
+        middleware = ProfilingMiddleware(lambda request: HttpResponse())
+        inner = []
+
+        def outer(request):
+            inner.append(middleware(RequestFactory().get("/inner/")))
+            return HttpResponse()
+
+        ProfilingMiddleware(outer)(RequestFactory().get("/outer/"))
+        self.assertEqual([line["path"] for line in self.lines()], ["/inner/", "/outer/"])
+        self.assertEqual([line["peak_kb"] for line in self.lines()], [None, None])
+        middleware(RequestFactory().get("/alone/"))
+        self.assertIsInstance(self.lines()[-1]["peak_kb"], int)
+
+
+class ReportJobDispatchTests(TransactionTestCase):
+    # submit_report keys the job on the replica test mirror
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+
+    def test_job_fails_when_the_pool_cannot_take_it(self):
+        error = RuntimeError("cannot schedule new futures after shutdown")
+        with mock.patch("registry.jobs.submit_task", side_effect=error):
+            job = submit_report("pdf_preview", {})
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.FAILED)
+        self.assertIn("cannot schedule new futures", job.error)
+        self.assertIsNotNone(job.finished_at)
+
+    @override_settings(REGISTRY_JOB_WORKERS=1)
+    def test_shut_down_pool_is_replaced(self):
+        broken = mock.Mock(submit=mock.Mock(side_effect=RuntimeError("shut down")))
+        fresh = mock.Mock()
+        with mock.patch("registry.jobs._executor", broken), \
+                mock.patch("registry.jobs.get_executor", side_effect=[broken, fresh]):
+            self.assertTrue(submit_task(print, "x"))
+        fresh.submit.assert_called_once_with(print, "x")
+
+
+class RegisterPdfTests(TestCase):
+    def test_pages_are_filled_in_order_and_numbered(self):
+        for number in range(5):
+            make_entry(surname=f"Surname{number}")
+        out = BytesIO()
+        with mock.patch("registry.pdf.rows_per_page", return_value=2):
+            pages = build_register_pdf(RegistryEntry.objects.all(), out)
+        self.assertEqual(pages, 3)
+        reader = PdfReader(out)
+        self.assertEqual(len(reader.pages), 3)
+        text = [page.extract_text() for page in reader.pages]
+        self.assertIn("Page 3 of 3", text[2])
+        self.assertIn("Surname4", text[2])
+        self.assertNotIn("Surname4", text[1])
+
+    def test_empty_register_still_has_its_header(self):
+        out = BytesIO()
+        self.assertEqual(build_register_pdf(RegistryEntry.objects.none(), out), 1)
+        self.assertIn("Page 1 of 1", PdfReader(out).pages[0].extract_text())
+
+
+class SearchIndexTests(TestCase):
+    """Search against the fully migrated schema, written through the ORM."""
+
+    def search(self, text):
+        return list(search_entries(RegistryEntry.objects.all(), text).values_list("pk", flat=True))
+
+    def test_saved_entry_is_found(self):
+        entry = make_entry()
+        make_entry(names="Sipho", surname="Dlamini", id_no_or_dob="7505055009081")
+        self.assertEqual(self.search("nkosi"), [entry.pk])
+        self.assertEqual(self.search("thand nko"), [entry.pk])
+        self.assertEqual(self.search("800101"), [entry.pk])
+
+    def test_updates_and_deletes_reach_the_index(self):
+        entry = make_entry()
+        entry.surname = "Khumalo"
+        entry.save()
+        self.assertEqual(self.search("nkosi"), [])
+        self.assertEqual(self.search("khumalo"), [entry.pk])
+        entry.delete()
+        self.assertEqual(self.search("khumalo"), [])
+
+    def test_rank_entries_orders_best_match_first(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite FTS rank")
+        partial = make_entry(names="Nkosinathi", surname="Zulu", id_no_or_dob="9002025009088")
+        exact = make_entry(names="Nkosi", surname="Nkosi")
+        queryset = search_entries(RegistryEntry.objects.for_listing(), "nkosi")
+        ranked = rank_entries(queryset, "nkosi").filter(tish_area="Township")
+        self.assertEqual([entry.pk for entry in ranked], [exact.pk, partial.pk])
+        self.assertLess(ranked[0].search_rank, ranked[1].search_rank)
+        self.assertIn("signature_blob", ranked[0].get_deferred_fields())
+        self.assertEqual(ranked.count(), 2)
+
+    def test_migrations_leave_the_triggers_in_place(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite FTS triggers")
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            triggers = {row[0] for row in cursor.fetchall()}
+        self.assertTrue(set(SQLITE_TRIGGERS) <= triggers)
+        self.assertFalse(ensure_search_index(connection))
+
+    def test_ensure_search_index_restores_dropped_triggers(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite FTS triggers")
+        with connection.cursor() as cursor:
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER {name}")
+        entry = make_entry()
+        self.assertEqual(self.search("nkosi"), [])
+        self.assertTrue(ensure_search_index(connection))
+        self.assertEqual(self.search("nkosi"), [entry.pk])
+        entry.surname = "Khumalo"
+        entry.save()
+        self.assertEqual(self.search("khumalo"), [entry.pk])
+
+
+class ReplicaRouterTests(TransactionTestCase):
+    # "replica" is a test mirror of default (myproject.test_settings)
+    databases = {"default", "replica"}
+
+    def test_registry_reads_go_to_the_replica_inside_the_context(self):
+        self.assertEqual(RegistryEntry.objects.all().db, "default")
+        with read_from_replica():
+            self.assertEqual(RegistryEntry.objects.all().db, "replica")
+            self.assertEqual(RegistryStat.objects.all().db, "replica")
+            # Jobs must see their own writes at once
+            self.assertEqual(ReportJob.objects.all().db, "default")
+        self.assertEqual(RegistryEntry.objects.all().db, "default")
+
+    def test_writes_stay_on_default(self):
+        router = ReplicaRouter()
+        with read_from_replica():
+            self.assertEqual(router.db_for_write(RegistryEntry), "default")
+            entry = make_entry()
+        self.assertEqual(entry._state.db, "default")
+        with read_from_replica(), self.assertNumQueries(1, using="replica"):
+            self.assertEqual(RegistryEntry.objects.filter(pk=entry.pk).count(), 1)
+
+    def test_context_restores_its_state(self):
+        with read_from_replica():
+            with read_from_replica():
+                pass
+            self.assertEqual(RegistryEntry.objects.all().db, "replica")
+        self.assertEqual(RegistryEntry.objects.all().db, "default")
+        with self.assertRaises(ValueError):
+            with read_from_replica():
+                raise ValueError
+        self.assertEqual(RegistryEntry.objects.all().db, "default")
+
+    def test_streamed_bodies_are_read_from_the_replica(self):
+        @replica_reads
+        def view(request):
+            return StreamingHttpResponse(RegistryEntry.objects.all().db for _ in range(2))
+
+        response = view(None)
+        self.assertEqual(RegistryEntry.objects.all().db, "default")
+        self.assertEqual(b"".join(response.streaming_content), b"replicareplica")
+
+    @override_settings(REGISTRY_JOB_WORKERS=0)
+    def test_pdf_preview_keys_its_job_on_the_replica(self):
+        # The job is rendered from the replica, so its cache key must come
+        # from the replica's registry version too
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            # By path: registry_export reuses the "pdf_preview" URL name
+            response = self.client.get("/export/pdf/preview/")
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(any("registry_registryversion" in query["sql"] for query in replica.captured_queries))
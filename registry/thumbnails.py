@@ -0,0 +1,101 @@
+# registry/thumbnails.py
+"""
+Small derivatives of uploaded signature images.
+
+Each signature_image gets one thumbnail stored next to it in the same
+storage ("signatures/abc.png" -> "signatures/abc.thumb.png"). It is made
+once in the job pool after the entry is saved, and the list page and the
+PDF exporters use it instead of opening and scaling the original on every
+render. A thumbnail older than its original is stale and is remade;
+regenerate_thumbnails rebuilds them in bulk.
+"""
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+
+THUMBNAIL_SIZE = (120, 40)
+THUMBNAIL_COLORS = 16
+SUFFIXES = {"PNG": "png", "WEBP": "webp"}
+
+
+def thumbnail_format():
+    return getattr(settings, "REGISTRY_THUMBNAIL_FORMAT", "PNG").upper()
+
+
+def thumbnail_name(name):
+    """Storage name of the thumbnail for the original stored as name."""
+    root, _ = os.path.splitext(name)
+    return f"{root}.thumb.{SUFFIXES[thumbnail_format()]}"
+
+
+def is_stale(name):
+    """True if the original exists and its thumbnail is missing or older."""
+    try:
+        original = os.stat(default_storage.path(name)).st_mtime
+    except FileNotFoundError:
+        return False
+    try:
+        return os.stat(default_storage.path(thumbnail_name(name))).st_mtime < original
+    except FileNotFoundError:
+        return True
+
+
+def thumbnail_path(name):
+    """Filesystem path of the thumbnail for name, or None if it was not made yet."""
+    if not name:
+        return None
+    path = default_storage.path(thumbnail_name(name))
+    return path if os.path.exists(path) else None
+
+
+def thumbnail_url(name):
+    if thumbnail_path(name) is None:
+        return None
+    return default_storage.url(thumbnail_name(name))
+
+
+def make_thumbnail(name):
+    """
+    Write the thumbnail for the original stored as name and return its
+    path. Transparent signatures are flattened onto white first.
+    """
+    with default_storage.open(name, "rb") as source:
+        image = Image.open(source)
+        image.load()
+    if image.mode in ("P", "LA", "PA") or "transparency" in image.info:
+        image = image.convert("RGBA")
+    if image.mode == "RGBA":
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    else:
+        image = image.convert("RGB")
+    image.thumbnail(THUMBNAIL_SIZE, Image.LANCZOS)
+    if thumbnail_format() == "PNG":
+        # Ink on white needs few colours; a palette PNG is a quarter the size
+        image = image.quantize(colors=THUMBNAIL_COLORS)
+
+    buffer = BytesIO()
+    image.save(buffer, format=thumbnail_format(), optimize=True)
+    path = default_storage.path(thumbnail_name(name))
+    # Written beside the original and moved into place, so readers never see half a file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(buffer.getvalue())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return path
+
+
+def schedule_thumbnail(name):
+    """Make the thumbnail for name in the job pool once the transaction commits."""
+    from . import jobs, workers
+    transaction.on_commit(lambda: jobs.submit_task(workers.make_thumbnail, name))
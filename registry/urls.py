@@ -8,6 +8,7 @@ from . import views
 urlpatterns = [
     path("", views.registry_list, name="registry_list"),
     path("add/", views.registry_create, name="registry_create"),
+    path("add/batch/", views.registry_batch, name="registry_batch"),
     path("edit/<int:pk>/", views.registry_update, name="registry_update"),
     path("delete/<int:pk>/", views.registry_delete, name="registry_delete"),
 
@@ -16,12 +17,20 @@ urlpatterns = [
     path("export/pdf/", views.export_pdf, name="export_pdf"),
     path("registry/export/", views.registry_export, name="pdf_preview"),
 
+    # Background report jobs
+    path("jobs/<uuid:job_id>/", views.report_job, name="report_job"),
+    path("jobs/<uuid:job_id>/status/", views.report_job_status, name="report_job_status"),
+    path("jobs/<uuid:job_id>/download/", views.report_job_download, name="report_job_download"),
+
 
     
 
     # Dashboard
    path("dashboard/", views.dashboard, name="dashboard"),          # Serves HTML page
    path("dashboard-data/", views.dashboard_data, name="dashboard_data"),  # Serves JSON data
+   path("dashboard-data/trend/", views.dashboard_trend, name="dashboard_trend"),  # Daily rollup series
+   path("dashboard-data/timeseries/", views.dashboard_timeseries, name="dashboard_timeseries"),  # By ward / TISH area
+   path("dashboard-data/events/", views.dashboard_events, name="dashboard_events"),  # SSE deltas (ASGI)
 
     # Admin site
     path("admin/", admin.site.urls),
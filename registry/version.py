@@ -0,0 +1,28 @@
+# registry/version.py
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import RegistryVersion
+
+VERSION_PK = 1
+
+
+def registry_version():
+    """The registry write counter; changes whenever any entry does."""
+    return RegistryVersion.objects.filter(pk=VERSION_PK).values_list("counter", flat=True).first() or 0
+
+
+def bump_registry_version(by=1):
+    """
+    Advance the write counter. Callers run this inside the write
+    transaction; bulk writers that skip model signals must call it too.
+    """
+    version = RegistryVersion.objects.filter(pk=VERSION_PK)
+    if version.update(counter=F("counter") + by):
+        return
+    try:
+        with transaction.atomic():
+            RegistryVersion.objects.create(pk=VERSION_PK, counter=by)
+    except IntegrityError:
+        # Another writer created the row first
+        version.update(counter=F("counter") + by)
@@ -2,7 +2,9 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.db.models import Q
 from collections import Counter
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.views.decorators.csrf import csrf_exempt
+from django.http import HttpResponse, StreamingHttpResponse
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib import colors
@@ -13,7 +15,25 @@ from .forms import RegistryForm
 import json
 from django.http import JsonResponse
 from .utils import signature_data_to_image
+from .signatures import render_signature
+from .stats import (
+    BUCKETS, PAYLOAD_KEYS, REPORT_DAYS, TIMESERIES_MAX_POINTS, daily_series, day_range,
+    fold_grouped_counts, period_breakdown, registration_timeseries, stats_payload,
+)
+from .pagination import get_page_size, paginate_entries
+from .search import rank_entries, search_entries
+from .exports import csv_lines, queryset_rows, stream_csv
+from .batch import MAX_BATCH_BYTES, BatchError, ingest as ingest_batch, read_body as read_batch
+from .live import dashboard_events as live_events
+from .report_cache import cached_json, cached_report, file_response, lookup, streamed_report
+from .pdf import build_register_pdf
+from .routers import replica_reads
+from .writer import run_write
+from .jobs import export_entries, export_params, submit_report
+from .models import ReportJob
+from django.urls import reverse
 import base64
+from datetime import date, timedelta
 from io import BytesIO
 from django.core.files.base import ContentFile
 from PIL import Image, ImageDraw
@@ -154,78 +174,49 @@ def registry_update(request, pk):
         form = RegistryForm(instance=entry)
     return render(request, 'registry/registry_form.html', {'form': form})
 
-# Your pdf_preview view rewritten
-
-
+@replica_reads
 def pdf_preview(request):
-    # ✅ Query the data for the table
-    entries = RegistryEntry.objects.all().order_by("surname")
-
-    # ✅ Load the HTML template
-    template_path = "registry/pdf_preview.html"
-    context = {
-        "request": request,
-        "entries": entries,   # This is the missing piece!
-    }
-
-    # ✅ Render the HTML with context
-    template = get_template(template_path)
-    html = template.render(context)
+    """
+    Queue the full register as a background PDF render and send the
+    browser to the job page, which polls until the file is ready.
+    """
+    job = submit_report("pdf_preview", {})
+    return redirect('report_job', job_id=job.pk)
 
-    # ✅ Generate PDF
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = 'inline; filename="beneficiary_register.pdf"'
 
-    pisa_status = pisa.CreatePDF(html, dest=response, link_callback=link_callback)
+def report_job(request, job_id):
+    job = get_object_or_404(ReportJob, pk=job_id)
+    return render(request, 'registry/report_job.html', {'job': job})
 
-    if pisa_status.err:
-        return HttpResponse("PDF generation error.<pre>" + html + "</pre>")
-    
-    return response
 
+def report_job_status(request, job_id):
+    """JSON polled by report_job.html."""
+    job = get_object_or_404(ReportJob, pk=job_id)
+    data = {
+        "id": str(job.pk),
+        "kind": job.kind,
+        "status": job.status,
+        "created_at": job.created_at.isoformat(),
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "download_url": reverse('report_job_download', args=[job.pk]) if job.status == ReportJob.DONE else None,
+    }
+    if job.status == ReportJob.FAILED:
+        data["error"] = job.error.strip().splitlines()[-1] if job.error else "Unknown error"
+    return JsonResponse(data)
 
-    # Create a PDF in memory
-    result = io.BytesIO()
-
-    pisa_status = pisa.CreatePDF(
-        src=html,
-        dest=result,
-        encoding="UTF-8",
-        default_css="""
-            @page {
-                size: A4 landscape;
-                margin: 15mm;
-            }
-            body {
-                font-family: DejaVu Sans, sans-serif;
-                font-size: 10pt;
-            }
-            table {
-                border-collapse: collapse;
-                width: 100%;
-            }
-            th, td {
-                border: 1px solid #444;
-                padding: 4px;
-                text-align: left;
-            }
-        """
-    )
 
-    if pisa_status.err:
-        return HttpResponse("Error generating PDF", status=500)
-
-    # Write PDF to response
-    response.write(result.getvalue())
-    return response
-
-    # Serve the PDF
-    response = HttpResponse(result.getvalue(), content_type="application/pdf")
-    if request.GET.get("download"):
-        response["Content-Disposition"] = 'attachment; filename="registry_report.pdf"'
-    else:
-        response["Content-Disposition"] = 'inline; filename="registry_report.pdf"'
-    return response
+@replica_reads
+def report_job_download(request, job_id):
+    job = get_object_or_404(ReportJob, pk=job_id)
+    if job.status != ReportJob.DONE:
+        return JsonResponse({"status": job.status}, status=409)
+    path = lookup(job.params_hash, "pdf")
+    if path is None:
+        # Evicted from the report cache: render it again
+        job = submit_report(job.kind, job.params)
+        return redirect('report_job', job_id=job.pk)
+    disposition = 'attachment' if request.GET.get("download") else 'inline'
+    return file_response(request, job.params_hash, path, f"{job.kind}.pdf", disposition)
 
 
 def export_pdf(request):
@@ -310,47 +301,8 @@ def export_pdf(request):
 
 # Add this function to convert signature data to an image
 def signature_data_to_image(signature_data, output_size=(300, 100)):
-    """Convert signature data to an image"""
-    if not signature_data:
-        return None
-        
-    # Create a transparent image
-    img = Image.new('RGBA', output_size, (255, 255, 255, 0))
-    draw = ImageDraw.Draw(img)
-    
-    # Scale factor to fit the signature to output size
-    # First, find the bounds of the signature
-    all_x = [point['x'] for stroke in signature_data for point in stroke['points']]
-    all_y = [point['y'] for stroke in signature_data for point in stroke['points']]
-    
-    if not all_x or not all_y:
-        return None
-        
-    min_x, max_x = min(all_x), max(all_x)
-    min_y, max_y = min(all_y), max(all_y)
-    
-    width = max_x - min_x
-    height = max_y - min_y
-    
-    if width == 0 or height == 0:
-        return None
-        
-    scale_x = (output_size[0] - 10) / width
-    scale_y = (output_size[1] - 10) / height
-    scale = min(scale_x, scale_y)
-    
-    # Draw each stroke
-    for stroke in signature_data:
-        points = []
-        for point in stroke['points']:
-            x = (point['x'] - min_x) * scale + 5  # Add 5px margin
-            y = (point['y'] - min_y) * scale + 5
-            points.append((x, y))
-        
-        if len(points) > 1:
-            draw.line(points, fill='black', width=2)
-    
-    return img
+    """Convert signature data to an image scaled into output_size"""
+    return render_signature(signature_data, output_size=output_size, padding=5, transparent=True)
 
 # Update your registry_create and registry_update views
 def registry_create(request):
@@ -471,61 +423,26 @@ from datetime import datetime, timedelta
 
 
 
+@replica_reads
 def registry_export(request):
-    # Filter entries based on query params
-    entries = RegistryEntry.objects.all()
-    search = request.GET.get("search", "")
-    gender = request.GET.get("gender", "")
-    grant = request.GET.get("grant", "")
-    tish_area = request.GET.get("tish_area", "")
-    export_format = request.GET.get("export_format", "pdf")
-
-    if search:
-        entries = entries.filter(
-            Q(names__icontains=search) |
-            Q(surname__icontains=search) |
-            Q(id_no_or_dob__icontains=search)
-        )
-    gender_filter = request.GET.get("gender")
-    if gender_filter:
-        entries = entries.filter(gender=gender_filter)
-
-    if grant:
-        entries = entries.filter(social_grant=grant)
-    if tish_area:
-        entries = entries.filter(tish_area=tish_area)
-
-    # Time-based filters
-    now = datetime.now()
-    if export_format == "day":
-        entries = entries.filter(created_at__date=now.date())
-    elif export_format == "week":
-        start_week = now - timedelta(days=now.weekday())
-        entries = entries.filter(created_at__date__gte=start_week.date())
-    elif export_format == "month":
-        entries = entries.filter(created_at__month=now.month, created_at__year=now.year)
-    elif export_format == "year":
-        entries = entries.filter(created_at__year=now.year)
+    params = export_params(request)
+    export_format = params["export_format"]
 
     if export_format in ["pdf", "day", "week", "month", "year"]:
-        template = get_template("registry/pdf_preview.html")
-        html = template.render({"entries": entries})
-        response = HttpResponse(content_type="application/pdf")
-        response["Content-Disposition"] = 'inline; filename="registry_report.pdf"'
-        pisa_status = pisa.CreatePDF(html, dest=response)
-        if pisa_status.err:
-            return HttpResponse("Error generating PDF", status=500)
-        return response
+        # Rendered in the job pool; see registry/jobs.py
+        job = submit_report("registry_export", params)
+        return redirect('report_job', job_id=job.pk)
 
     elif export_format == "csv":
-        response = HttpResponse(content_type="text/csv")
-        response['Content-Disposition'] = 'attachment; filename="registry_entries.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['Names', 'Surname', 'ID/DOB', 'Gender', 'Social Grant', 'Tish Area'])
-        for entry in entries:
-            writer.writerow([entry.names, entry.surname, entry.id_no_or_dob or '',
-                             entry.gender, entry.social_grant, entry.tish_area])
-        return response
+        def rows():
+            yield ['Names', 'Surname', 'ID/DOB', 'Gender', 'Social Grant', 'Tish Area']
+            fields = ('names', 'surname', 'id_no_or_dob', 'gender', 'social_grant', 'tish_area')
+            for names, surname, id_no, gender, grant, tish_area in queryset_rows(export_entries(params), fields):
+                yield [names, surname, id_no or '', gender, grant, tish_area]
+
+        # Cached per filter set; the date only matters for PDF periods
+        csv_params = {key: value for key, value in params.items() if key != "as_of"}
+        return streamed_report(request, "registry_export_csv", csv_params, "registry_entries.csv", csv_lines(rows()))
 
     else:
         return HttpResponse("Invalid export format", status=400)
@@ -536,58 +453,52 @@ def _generate_date_report(queryset, period_type):
     now = timezone.now()
     
     if period_type == 'daily':
-        start_date = now - timedelta(days=1)
         filename = f"daily_report_{now.strftime('%Y%m%d')}.csv"
     elif period_type == 'weekly':
-        start_date = now - timedelta(weeks=1)
         filename = f"weekly_report_{now.strftime('%Y%m%d')}.csv"
     elif period_type == 'monthly':
-        start_date = now - timedelta(days=30)
         filename = f"monthly_report_{now.strftime('%Y%m')}.csv"
     else:  # yearly
-        start_date = now - timedelta(days=365)
         filename = f"yearly_report_{now.strftime('%Y')}.csv"
-    
-    date_filtered = queryset.filter(created_at__gte=start_date) if hasattr(queryset.model, 'created_at') else queryset
 
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Whole local days ending today, so the totals can come from the
+    # daily rollups; a daily report is today alone
+    end_day = timezone.localdate(now)
+    start_day = end_day - timedelta(days=REPORT_DAYS[period_type] - 1)
+    date_filtered = queryset.filter(day_range(start_day, end_day))
 
-    writer = csv.writer(response)
-    writer.writerow([f'{period_type.capitalize()} Registry Report'])
-    writer.writerow(['Period', f'{start_date.strftime("%Y-%m-%d")} to {now.strftime("%Y-%m-%d")}'])
-    writer.writerow(['Total Entries', date_filtered.count()])
-    writer.writerow([])
-    
-    # Summary statistics
-    writer.writerow(['Summary Statistics'])
-    gender_counts = Counter([e.gender for e in date_filtered])
-    grant_counts = Counter([e.social_grant for e in date_filtered])
-    tish_counts = Counter([e.tish_area for e in date_filtered])
-    
-    writer.writerow(['Gender Distribution'])
-    for gender, count in gender_counts.items():
-        writer.writerow([f'  {gender}', count])
-    
-    writer.writerow(['Social Grant Distribution'])
-    for grant, count in grant_counts.items():
-        writer.writerow([f'  {grant}', count])
-    
-    writer.writerow(['Tish Area Distribution'])
-    for area, count in tish_counts.items():
-        writer.writerow([f'  {area}', count])
-    
-    writer.writerow([])
-    writer.writerow(['Detailed Entries'])
-    writer.writerow(['Names', 'Surname', 'ID/DOB', 'Gender', 'Social Grant', 'Tish Area'])
-    
-    for entry in date_filtered:
-        writer.writerow([
-            entry.names, entry.surname, entry.id_no_or_dob or '',
-            entry.gender, entry.social_grant, entry.tish_area
-        ])
-    
-    return response
+    def rows():
+        summary_fields = ['gender', 'social_grant', 'tish_area']
+        total, summaries = period_breakdown(queryset, start_day, end_day, summary_fields)
+
+        yield [f'{period_type.capitalize()} Registry Report']
+        yield ['Period', f'{start_day.strftime("%Y-%m-%d")} to {end_day.strftime("%Y-%m-%d")}']
+        yield ['Total Entries', total]
+        yield []
+
+        yield ['Summary Statistics']
+
+        yield ['Gender Distribution']
+        for gender, count in summaries['gender'].items():
+            yield [f'  {gender}', count]
+
+        yield ['Social Grant Distribution']
+        for grant, count in summaries['social_grant'].items():
+            yield [f'  {grant}', count]
+
+        yield ['Tish Area Distribution']
+        for area, count in summaries['tish_area'].items():
+            yield [f'  {area}', count]
+
+        yield []
+        yield ['Detailed Entries']
+        yield ['Names', 'Surname', 'ID/DOB', 'Gender', 'Social Grant', 'Tish Area']
+
+        fields = ('names', 'surname', 'id_no_or_dob', 'gender', 'social_grant', 'tish_area')
+        for names, surname, id_no, gender, grant, tish_area in queryset_rows(date_filtered, fields):
+            yield [names, surname, id_no or '', gender, grant, tish_area]
+
+    return stream_csv(filename, rows())
 
 
 def generate_daily_report(modeladmin, request, queryset):
@@ -657,83 +568,113 @@ def registry_delete(request, pk):
 from django.http import JsonResponse
 from django.db.models import Count
 
+@replica_reads
 def dashboard_data(request):
     """
     Aggregate live registry data for the dashboard.
-    All field names here match the RegistryEntry model.
+    Reads the materialized RegistryStat counters, so the cost depends on
+    the number of categories rather than the number of entries. The body
+    is cached per registry version and carries it as an ETag, so polls
+    between writes are answered from the cache or with a 304.
     """
-    qs = RegistryEntry.objects.all()
+    return cached_json(request, "dashboard_data", {}, stats_payload)
 
-    # Helper to convert annotated querysets to dict
-    def counts_from_qs(qs_vals, key_name):
-        return {item[key_name]: item["count"] for item in qs_vals if item.get(key_name) not in (None, "")}
 
-    # Text/choice fields
-    gender_counts = counts_from_qs(qs.values("gender").annotate(count=Count("id")), "gender")
-    grant_counts = counts_from_qs(qs.values("social_grant").annotate(count=Count("id")), "social_grant")
-    tish_counts = counts_from_qs(qs.values("tish_area").annotate(count=Count("id")), "tish_area")
-    race_counts = counts_from_qs(qs.values("race").annotate(count=Count("id")), "race")
-    ward_counts = counts_from_qs(qs.values("ward_no").annotate(count=Count("id")), "ward_no")
+TREND_MAX_DAYS = 366
 
-    # Boolean fields
-    disability_counts = {
-        "Yes": qs.filter(disability=True).count(),
-        "No": qs.filter(disability=False).count()
-    }
-    recovering_counts = {
-        "Yes": qs.filter(recovering_service_user=True).count(),
-        "No": qs.filter(recovering_service_user=False).count()
-    }
-    cooperative_counts = {
-        "Yes": qs.filter(cooperative_member=True).count(),
-        "No": qs.filter(cooperative_member=False).count()
-    }
 
-    # Contact info
-    contact_counts = {
-        "Has Contact": qs.exclude(contact_number__isnull=True).exclude(contact_number__exact="").count(),
-        "No Contact": qs.filter(contact_number__isnull=True).count() + qs.filter(contact_number__exact="").count(),
-    }
-
-    # Signature info (safe fallback if field doesn't exist)
+@replica_reads
+def dashboard_trend(request):
+    """
+    Registrations per day for one dashboard dimension (?dimension=, e.g.
+    gender_counts; the total by default) over the last ?days= days up to
+    ?end= (today by default). Summed from the daily rollups, so the cost
+    depends on the number of days, not entries.
+    """
+    dimension = request.GET.get("dimension") or "total_participants"
+    if dimension not in PAYLOAD_KEYS:
+        return JsonResponse({"error": f"Unknown dimension {dimension!r}"}, status=400)
     try:
-        signature_counts = {
-            "Signed": qs.exclude(signature_image__isnull=True).exclude(signature_image__exact="").count(),
-            "Not Signed": qs.filter(signature_image__isnull=True).count() + qs.filter(signature_image__exact="").count(),
+        days = min(max(int(request.GET.get("days", 30)), 1), TREND_MAX_DAYS)
+        end = date.fromisoformat(request.GET["end"]) if request.GET.get("end") else timezone.localdate()
+    except ValueError:
+        return JsonResponse({"error": "days must be a number and end a YYYY-MM-DD date"}, status=400)
+
+    start = end - timedelta(days=days - 1)
+
+    def build():
+        day_list, series = daily_series(start, end, dimension)
+        return {
+            "dimension": dimension,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "days": [day.isoformat() for day in day_list],
+            "series": series,
         }
-    except Exception:
-        signature_counts = {}
 
-    # Address info
-    address_counts = {
-        "Has Address": qs.exclude(physical_address__isnull=True).exclude(physical_address__exact="").count(),
-        "No Address": qs.filter(physical_address__isnull=True).count() + qs.filter(physical_address__exact="").count(),
-    }
+    params = {"dimension": dimension, "start": start.isoformat(), "end": end.isoformat()}
+    return cached_json(request, "dashboard_trend", params, build)
 
-    total_participants = qs.count()
 
-    # ✅ Build response
-    data = {
-        "gender_counts": gender_counts,
-        "grant_counts": grant_counts,
-        "tish_counts": tish_counts,
-        "disability_counts": disability_counts,
-        "race_counts": race_counts,
-        "recovering_counts": recovering_counts,
-        "cooperative_counts": cooperative_counts,
-        "ward_counts": ward_counts,
-        "contact_counts": contact_counts,
-        "signature_counts": signature_counts,
-        "address_counts": address_counts,
-        "total_participants": total_participants,
-    }
+TIMESERIES_FIELDS = {"ward": "ward_no", "tish_area": "tish_area"}
 
-    return JsonResponse(data)
+
+@replica_reads
+def dashboard_timeseries(request):
+    """
+    Registrations over time by ward and TISH area, bucketed in SQL.
+    ?start= and ?end= (YYYY-MM-DD) pick the range, a year up to today by
+    default; ?bucket= (day/week/month/year) is coarsened as needed to keep
+    the response to a fixed number of points; ?group= limits it to
+    "ward" or "tish_area".
+    """
+    try:
+        end = date.fromisoformat(request.GET["end"]) if request.GET.get("end") else timezone.localdate()
+        start = date.fromisoformat(request.GET["start"]) if request.GET.get("start") else end - timedelta(days=364)
+    except ValueError:
+        return JsonResponse({"error": "start and end must be YYYY-MM-DD dates"}, status=400)
+    if start > end:
+        return JsonResponse({"error": "start is after end"}, status=400)
+    bucket = request.GET.get("bucket") or "day"
+    if bucket not in BUCKETS:
+        return JsonResponse({"error": f"bucket must be one of {', '.join(BUCKETS)}"}, status=400)
+    group = request.GET.get("group")
+    if group and group not in TIMESERIES_FIELDS:
+        return JsonResponse({"error": f"group must be one of {', '.join(TIMESERIES_FIELDS)}"}, status=400)
+    fields = [TIMESERIES_FIELDS[group]] if group else list(TIMESERIES_FIELDS.values())
+
+    # Nothing is registered in the future; and even yearly buckets must
+    # fit, so very long ranges keep their most recent years
+    end = min(end, timezone.localdate())
+    start = min(max(start, date(max(1, end.year - TIMESERIES_MAX_POINTS + 1), 1, 1)), end)
+
+    def build():
+        data = registration_timeseries(start, end, bucket, fields)
+        return {"start": start.isoformat(), "end": end.isoformat(), **data}
+
+    params = {"start": start.isoformat(), "end": end.isoformat(), "bucket": bucket, "fields": fields}
+    return cached_json(request, "dashboard_timeseries", params, build)
+
+
+async def dashboard_events(request):
+    """
+    Server-sent events for the dashboard: a "snapshot" of dashboard_data,
+    then a "delta" of changed counts whenever entries are saved or
+    deleted. Needs the ASGI server (myproject.asgi); under WSGI it answers
+    204, which tells EventSource not to reconnect, and the page polls.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(live_events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 def dashboard(request):
-    entries = RegistryEntry.objects.all()
-    return render(request, 'registry/registry_dashboard.html', {'entries': entries})
+    # The page loads its numbers from dashboard_data; it needs no rows
+    return render(request, 'registry/registry_dashboard.html')
 
 
 def registry_view(request):
@@ -773,8 +714,9 @@ def registry_view(request):
     return render(request, 'registry_form.html', {'form': form})
 
 # 1️⃣ Registry List with Search + Filter + Summaries
+@replica_reads
 def registry_list(request):
-    entries = RegistryEntry.objects.all()
+    entries = RegistryEntry.objects.for_listing()
 
     
 
@@ -784,13 +726,9 @@ def registry_list(request):
     grant_filter = request.GET.get('grant', '')
     tish_filter = request.GET.get('tish_area', '')
 
-    # Apply search
+    # Apply search (full-text prefix match)
     if search:
-        entries = entries.filter(
-            Q(names__icontains=search) |
-            Q(surname__icontains=search) |
-            Q(id_no_or_dob__icontains=search)
-        )
+        entries = search_entries(entries, search)
 
     # Apply filters
     if gender_filter:
@@ -800,13 +738,26 @@ def registry_list(request):
     if tish_filter:
         entries = entries.filter(tish_area=tish_filter)
 
-    # Generate summaries (guaranteed Counter dicts)
-    gender_counts = Counter([entry.gender for entry in entries])
-    grant_counts = Counter([entry.social_grant for entry in entries])
-    tish_counts = Counter([entry.tish_area for entry in entries])
+    # Generate summaries with one grouped query over the same filters,
+    # so only the current page of rows is ever loaded
+    summary_fields = ['gender', 'social_grant', 'tish_area']
+    summary_rows = entries.order_by().values(*summary_fields).annotate(count=Count('id'))
+    summaries = fold_grouped_counts(summary_rows, summary_fields, skip_empty=False)
+    gender_counts = summaries['gender']
+    grant_counts = summaries['social_grant']
+    tish_counts = summaries['tish_area']
+
+    # Only one page of rows is loaded and rendered; search results
+    # are shown best match first
+    if search:
+        page, page_range = paginate_entries(request, rank_entries(entries, search), None)
+    else:
+        page, page_range = paginate_entries(request, entries)
 
     context = {
-        'entries': entries,
+        'entries': page,
+        'page_range': page_range,
+        'page_size': get_page_size(request),
         'gender_counts': dict(gender_counts),  # convert to dict for template safety
         'grant_counts': dict(grant_counts),
         'tish_counts': dict(tish_counts),
@@ -821,20 +772,38 @@ def registry_create(request):
     if request.method == "POST":
         form = RegistryForm(request.POST)
         if form.is_valid():
-            form.save()
+            run_write(form.save)
             return redirect('registry_list')
     else:
         form = RegistryForm()
     return render(request, 'registry/registry_form.html', {'form': form})
 
 
+@csrf_exempt
+def registry_batch(request):
+    """
+    JSON batch submission for field devices (see registry.batch). Devices
+    send no session or CSRF token; resends are made safe by the entries'
+    UUIDs instead.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST a JSON batch"}, status=405, headers={"Allow": "POST"})
+    try:
+        # Read directly: request.body stops at DATA_UPLOAD_MAX_MEMORY_SIZE,
+        # and batches with signatures are larger; read_batch has its own limit
+        payload = read_batch(request.read(MAX_BATCH_BYTES + 1), request.headers.get("Content-Encoding"))
+        return JsonResponse(ingest_batch(payload))
+    except BatchError as exc:
+        return JsonResponse({"error": str(exc)}, status=exc.status)
+
+
 # 3️⃣ Update Entry
 def registry_update(request, pk):
     entry = get_object_or_404(RegistryEntry, pk=pk)
     if request.method == "POST":
         form = RegistryForm(request.POST, instance=entry)
         if form.is_valid():
-            form.save()
+            run_write(form.save)
             return redirect('registry_list')
     else:
         form = RegistryForm(instance=entry)
@@ -845,86 +814,20 @@ def registry_update(request, pk):
 def registry_delete(request, pk):
     entry = get_object_or_404(RegistryEntry, pk=pk)
     if request.method == "POST":
-        entry.delete()
+        run_write(entry.delete)
         return redirect('registry_list')
     return render(request, 'registry/registry_confirm_delete.html', {'entry': entry})
 
 
 # 5️⃣ Export PDF (matches your Blueprint fields)
+@replica_reads
 def export_pdf(request):
-    entries = RegistryEntry.objects.all()
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="registry.pdf"'
-
-    c = canvas.Canvas(response, pagesize=A4)
-    width, height = A4
-
-    # Title
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(50, height - 40, "Registry Report")
-
-    # Prepare table data
-    table_data = []
-    headers = [
-        "No.", "Names", "Surname", "ID No./DoB", "Gender",
-        "Disability", "Address", "TISH Area", "Ward",
-        "Contact", "Race", "Recovering", "Grant",
-        "Cooperative", "Sign"
-    ]
-    table_data.append(headers)
-    for i, entry in enumerate(entries, start=1):
-        # Check if entry has a signature image
-        signature_text = "Signed" if entry.signature_image else "Not signed"
-        
-        row = [
-            str(i),
-            entry.names,
-            entry.surname,
-            entry.id_no_or_dob,
-            entry.gender,
-            "Yes" if entry.disability else "No",
-            entry.physical_address,
-            entry.tish_area,
-            entry.ward_no,
-            entry.contact_number,
-            entry.race,
-            "Yes" if entry.recovering_service_user else "No",
-            entry.social_grant,
-            "Yes" if entry.cooperative_member else "No",
-            signature_text,  # Use this instead of entry.sign
-        ]
-        table_data.append(row)
-
-    # Column widths (mm)
-    col_widths = [
-        10*mm, 25*mm, 25*mm, 25*mm, 15*mm,
-        15*mm, 45*mm, 25*mm, 15*mm,
-        25*mm, 15*mm, 15*mm, 15*mm,
-        15*mm, 25*mm
-    ]
-
-    table = Table(table_data, colWidths=col_widths)
-
-    style = TableStyle([
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 10),
-        ('ALIGN', (0,0), (-1,0), 'CENTER'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-        ('FONTSIZE', (0,1), (-1,-1), 9),
-        ('ALIGN', (0,1), (0,-1), 'CENTER'),
-        ('ALIGN', (5,1), (5,-1), 'CENTER'),
-        ('ALIGN', (11,1), (11,-1), 'CENTER'),
-        ('ALIGN', (13,1), (13,-1), 'CENTER'),
-    ])
-    table.setStyle(style)
-
-    # Place table dynamically
-    table.wrapOn(c, width, height)
-    table_height = len(table_data) * 12  # estimate row height
-    table.drawOn(c, 15*mm, height - 60*mm - table_height)
-
-    c.showPage()
-    c.save()
-    return response
-
+    """
+    Download the full register as a multi-page PDF. Rows are streamed
+    from the database page by page (see registry/pdf.py) and the file is
+    kept in the report cache until the registry changes.
+    """
+    return cached_report(
+        request, "export_pdf", {}, "pdf", "registry.pdf",
+        lambda out: build_register_pdf(RegistryEntry.objects.all(), out),
+    )
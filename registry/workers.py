@@ -0,0 +1,25 @@
+# registry/workers.py
+"""
+Entry points for the job pool (registry.jobs). Spawned workers
+unpickle references to these functions before Django is set up, so this
+module must not import models or settings at import time.
+"""
+import os
+
+
+def init_worker(settings_module):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+    django.setup()
+
+
+def run_job(job_id):
+    from .jobs import run_job
+    run_job(job_id)
+
+
+def make_thumbnail(name):
+    # No version bump: the save already made one, and a cached PDF
+    # rendered before the thumbnail existed shows the tick instead
+    from .thumbnails import make_thumbnail
+    make_thumbnail(name)
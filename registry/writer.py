@@ -0,0 +1,105 @@
+# registry/writer.py
+"""
+Optional single-writer queue for entry saves.
+
+SQLite allows one writer at a time. With REGISTRY_SERIALIZE_WRITES on,
+registry_create, registry_update and registry_delete hand their write to
+one thread per server process, and it runs the writes in order. Requests
+then wait their turn in a Python queue, not in SQLite's busy handler.
+Between processes the lock is still taken with BEGIN IMMEDIATE and
+busy_timeout (registry.database).
+
+Only write_transaction opens BEGIN IMMEDIATE; other transactions stay
+deferred, so read-only atomic blocks (admin pages, report renders) do not
+queue behind the write lock.
+
+The write runs on the writer thread's own connection, so it is not part
+of any transaction open in the calling request.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+def serialize_writes():
+    return getattr(settings, "REGISTRY_SERIALIZE_WRITES", False)
+
+
+class WriteQueue:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) and return a Future for its result."""
+        future = Future()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="registry-writer", daemon=True)
+                self._thread.start()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def _run(self):
+        while True:
+            future, func, args, kwargs = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            # Drop a connection the server closed or that outlived CONN_MAX_AGE
+            close_old_connections()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+
+writer = WriteQueue()
+
+
+@contextmanager
+def write_transaction(using=None):
+    """
+    transaction.atomic() that takes SQLite's write lock as it begins. A
+    deferred transaction that reads before it writes fails with "database
+    is locked" if another connection commits first, without waiting in
+    busy_timeout; BEGIN IMMEDIATE waits there instead. Nested blocks and
+    other databases get a plain atomic().
+    """
+    connection = transaction.get_connection(using)
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+    # The mode is read from OPTIONS when connecting, and used by BEGIN
+    connection.ensure_connection()
+    previous = connection.transaction_mode
+    connection.transaction_mode = "IMMEDIATE"
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        connection.transaction_mode = previous
+
+
+def _atomic_call(func, args, kwargs):
+    with write_transaction():
+        return func(*args, **kwargs)
+
+
+def run_write(func, *args, **kwargs):
+    """
+    func(*args, **kwargs) in one transaction, on the writer thread when
+    writes are serialized. A save and its signal handlers (counters,
+    rollups, version) then take the write lock once rather than once per
+    statement, and the counters cannot be left half updated.
+    """
+    if not serialize_writes():
+        return _atomic_call(func, args, kwargs)
+    return writer.submit(_atomic_call, func, args, kwargs).result()